@@ -0,0 +1 @@
+"""Reproducible scanner benchmarks against a local test fleet"""
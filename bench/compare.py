@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import sys
+
+def load_results(path):
+    with open(path) as f:
+        data = json.load(f)
+    # Instrumented runs compare against their own kind, e.g. "concurrent+trace"
+    return {(_label(row), row["concurrency"]): row for row in data["results"]}
+
+def _label(row):
+    instrument = row.get("instrument", "off")
+    return row["engine"] if instrument == "off" else f"{row['engine']}+{instrument}"
+
+def compare(baseline, candidate, threshold=10.0):
+    """Return (rows, regressions) comparing candidate figures against a baseline
+
+    A throughput drop or p99 latency rise of more than threshold percent is a regression.
+    """
+    rows = []
+    regressions = []
+    for key in sorted(set(baseline) & set(candidate)):
+        old, new = baseline[key], candidate[key]
+        throughput_change = _pct_change(old["probes_per_sec"], new["probes_per_sec"])
+        p99_change = _pct_change(old["p99_ms"], new["p99_ms"])
+        row = {
+            "engine": key[0],
+            "concurrency": key[1],
+            "probes_per_sec": (old["probes_per_sec"], new["probes_per_sec"], throughput_change),
+            "p99_ms": (old["p99_ms"], new["p99_ms"], p99_change),
+        }
+        rows.append(row)
+        if throughput_change < -threshold or p99_change > threshold:
+            regressions.append(row)
+    return rows, regressions
+
+def _pct_change(old, new):
+    if not old:
+        return 0.0
+    return (new - old) / old * 100
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline", help="JSON results from the reference version")
+    parser.add_argument("candidate", help="JSON results from the version under test")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Percent slowdown that counts as a regression (default: 10)")
+    args = parser.parse_args(argv)
+    
+    rows, regressions = compare(load_results(args.baseline), load_results(args.candidate),
+                                args.threshold)
+    
+    for row in rows:
+        flag = "REGRESSION" if row in regressions else "ok"
+        old_rate, new_rate, rate_change = row["probes_per_sec"]
+        old_p99, new_p99, p99_change = row["p99_ms"]
+        print(f"{row['engine']:>10s} c={row['concurrency']:<4d} "
+              f"{old_rate:10.1f} -> {new_rate:10.1f} probes/s ({rate_change:+.1f}%)  "
+              f"p99 {old_p99:.2f} -> {new_p99:.2f}ms ({p99_change:+.1f}%)  {flag}")
+    
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0f}%")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
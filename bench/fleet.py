@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import os
+import random
+import socket
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from test_server import TestServer
+
+class BenchFleet:
+    """A contiguous block of localhost ports with a mix of open, closed and blackholed ports"""
+    
+    def __init__(self, open_count=20, closed_count=200, blackhole_count=2,
+                 base_port=20000, seed=0):
+        self.open_count = open_count
+        self.closed_count = closed_count
+        self.blackhole_count = blackhole_count
+        self.base_port = base_port
+        self.seed = seed
+        self.server = TestServer(verbose=False)
+        self.roles = {}
+    
+    @property
+    def start_port(self):
+        return self.base_port
+    
+    @property
+    def end_port(self):
+        return self.base_port + len(self.roles) - 1
+    
+    def config(self):
+        return {
+            "open": self.open_count,
+            "closed": self.closed_count,
+            "blackhole": self.blackhole_count,
+            "base_port": self.base_port,
+            "seed": self.seed,
+        }
+    
+    def _port_is_free(self, port):
+        probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            probe.bind(('127.0.0.1', port))
+            return True
+        except OSError:
+            return False
+        finally:
+            probe.close()
+    
+    def start(self):
+        """Assign a role to every port in the block and start its listeners"""
+        roles = (["open"] * self.open_count + ["blackhole"] * self.blackhole_count +
+                 ["closed"] * self.closed_count)
+        random.Random(self.seed).shuffle(roles)
+        ports = range(self.base_port, self.base_port + len(roles))
+        
+        busy = [port for port in ports if not self._port_is_free(port)]
+        if busy:
+            raise RuntimeError(f"Ports already in use: {busy[:5]}; choose another base port")
+        
+        self.server.running = True
+        for port, role in zip(ports, roles):
+            if role == "open":
+                started = self.server.start_server(port, "Bench")
+            elif role == "blackhole":
+                started = self.server.start_blackhole_server(port)
+            else:
+                started = True
+            if not started:
+                self.stop()
+                raise RuntimeError(f"Failed to start {role} listener on port {port}")
+            self.roles[port] = role
+        return self
+    
+    def stop(self):
+        self.server.stop_all_servers()
+    
+    def ports_with_role(self, role):
+        return sorted(port for port, port_role in self.roles.items() if port_role == role)
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
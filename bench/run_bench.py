@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from port_scanner import PortScanner
+from scan_engine import ScanEngine
+from scan_log import TraceRing, configure_logging
+from bench.fleet import BenchFleet
+
+TARGET = "127.0.0.1"
+
+def run_serial(scanner, start_port, end_port, timeout, concurrency):
+    scanner.scanning = True
+    return len(scanner.scan_range(
+        TARGET, start_port, end_port, timeout,
+        lambda progress: None, lambda port, service: None
+    ))
+
+def run_concurrent(scanner, start_port, end_port, timeout, concurrency):
+    scanner.scanning = True
+    engine = ScanEngine(scanner, max_in_flight=concurrency, linger_reset=scanner.linger_reset)
+    return len(engine.scan_range(
+        TARGET, start_port, end_port, timeout,
+        lambda progress: None, lambda port, service: None
+    ))
+
+# name -> (runner, honours the concurrency setting)
+ENGINES = {
+    "serial": (run_serial, False),
+    "concurrent": (run_concurrent, True),
+}
+
+# off: no instrumentation; trace: a TraceRing on the hooks; debug: per-probe debug logging
+INSTRUMENTS = ("off", "trace", "debug")
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered), math.ceil(pct / 100 * len(ordered))) - 1)
+    return ordered[rank]
+
+def measure_case(engine, start_port, end_port, timeout, concurrency, linger_reset=False,
+                 instrument="off"):
+    """Run one scan and return throughput, latency, CPU and memory figures"""
+    runner = ENGINES[engine][0]
+    scanner = PortScanner()
+    scanner.linger_reset = linger_reset
+    logs = None
+    if instrument == "trace":
+        TraceRing().attach(scanner)
+    elif instrument == "debug":
+        # Formatted and written by the listener thread, whose CPU time counts too
+        logs = configure_logging("warning,engine=debug", stream=open(os.devnull, "w"))
+    started = {}
+    latencies = []
+    
+    def on_probe(target, port):
+        started[(target, port)] = time.perf_counter()
+    
+    def on_classify(target, port, is_open):
+        latencies.append(time.perf_counter() - started.pop((target, port), time.perf_counter()))
+    
+    scanner.add_hook("pre_probe", on_probe)
+    scanner.add_hook("post_classify", on_classify)
+    
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    wall_start = time.perf_counter()
+    open_found = runner(scanner, start_port, end_port, timeout, concurrency)
+    if logs is not None:
+        logs.close()
+    elapsed = time.perf_counter() - wall_start
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    
+    probes = end_port - start_port + 1
+    return {
+        "probes": probes,
+        "open_found": open_found,
+        "elapsed_s": elapsed,
+        "probes_per_sec": probes / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "cpu_s": (usage_after.ru_utime - usage_before.ru_utime) +
+                 (usage_after.ru_stime - usage_before.ru_stime),
+        "peak_rss_kb": usage_after.ru_maxrss,
+    }
+
+def _child(conn, args):
+    try:
+        conn.send(measure_case(*args))
+    finally:
+        conn.close()
+
+def measure_isolated(*args):
+    """Measure a case in a forked child so CPU and peak RSS belong to the scan alone"""
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return measure_case(*args)
+    ctx = multiprocessing.get_context("fork")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child, args=(child_conn, args))
+    process.start()
+    child_conn.close()
+    try:
+        result = parent_conn.recv()
+    except EOFError:
+        raise RuntimeError(f"Benchmark child for {args[0]} exited with code {process.exitcode}")
+    finally:
+        process.join()
+    return result
+
+def summarize(engine, concurrency, runs, instrument="off"):
+    summary = {"engine": engine, "concurrency": concurrency, "instrument": instrument,
+               "repeats": len(runs)}
+    for key in ("probes_per_sec", "p50_ms", "p99_ms", "cpu_s", "elapsed_s"):
+        summary[key] = statistics.median(run[key] for run in runs)
+    summary["peak_rss_kb"] = max(run["peak_rss_kb"] for run in runs)
+    summary["probes"] = runs[0]["probes"]
+    summary["open_found"] = runs[0]["open_found"]
+    return summary
+
+def run_benchmarks(fleet, timeout=0.2, concurrency_levels=(1,), repeat=3,
+                   engines=None, progress=None, linger_reset=False, instruments=("off",)):
+    """Run every engine/concurrency/instrument combination against a started fleet"""
+    results = []
+    for engine in engines or ENGINES:
+        levels = concurrency_levels if ENGINES[engine][1] else (1,)
+        for concurrency in levels:
+            # Instrument modes take turns within each repeat, so drift over the
+            # run (TIME_WAIT build-up, CPU frequency) hits them all alike
+            runs = {instrument: [] for instrument in instruments}
+            for _ in range(repeat):
+                for instrument in instruments:
+                    runs[instrument].append(measure_isolated(
+                        engine, fleet.start_port, fleet.end_port, timeout, concurrency,
+                        linger_reset, instrument))
+            for instrument in instruments:
+                summary = summarize(engine, concurrency, runs[instrument], instrument)
+                results.append(summary)
+                if progress:
+                    progress(summary)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timeout": timeout,
+            "linger_reset": linger_reset,
+            "fleet": fleet.config(),
+        },
+        "results": results,
+    }
+
+def overhead(results):
+    """Percent change in throughput and CPU of each instrumented case against its 'off' run"""
+    plain = {(row["engine"], row["concurrency"]): row
+             for row in results if row.get("instrument", "off") == "off"}
+    rows = []
+    for row in results:
+        base = plain.get((row["engine"], row["concurrency"]))
+        if base is None or row.get("instrument", "off") == "off":
+            continue
+        rows.append({
+            "engine": row["engine"],
+            "concurrency": row["concurrency"],
+            "instrument": row["instrument"],
+            "probes_per_sec": _pct_change(base["probes_per_sec"], row["probes_per_sec"]),
+            "cpu_s": _pct_change(base["cpu_s"], row["cpu_s"]),
+        })
+    return rows
+
+def _pct_change(old, new):
+    return (new - old) / old * 100 if old else 0.0
+
+def parse_int_list(value):
+    return tuple(int(part) for part in value.split(",") if part)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scan engines against a local test fleet")
+    parser.add_argument("--open", type=int, default=20, help="Open ports in the fleet")
+    parser.add_argument("--closed", type=int, default=200, help="Closed ports in the fleet")
+    parser.add_argument("--blackhole", type=int, default=2, help="Ports that silently drop SYNs")
+    parser.add_argument("--base-port", type=int, default=20000, help="First port of the fleet block")
+    parser.add_argument("--timeout", type=float, default=0.2, help="Probe timeout in seconds")
+    parser.add_argument("--concurrency", type=parse_int_list, default=(1, 16, 64),
+                        help="Comma-separated concurrency levels for concurrent engines")
+    parser.add_argument("--engines", type=lambda v: v.split(","), default=None,
+                        help=f"Comma-separated subset of: {', '.join(ENGINES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (median reported)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for port role placement")
+    parser.add_argument("--linger-reset", action="store_true",
+                        help="Close open ports with a RST (no TIME_WAIT) in every engine")
+    parser.add_argument("--instrument", type=lambda v: v.split(","), default=["off"],
+                        help=f"Comma-separated instrumentation modes to run ({', '.join(INSTRUMENTS)}); "
+                             "overhead against 'off' is reported")
+    parser.add_argument("-o", "--output", help="Write JSON results to this file")
+    args = parser.parse_args(argv)
+    
+    for engine in args.engines or ():
+        if engine not in ENGINES:
+            parser.error(f"Unknown engine: {engine}")
+    for instrument in args.instrument:
+        if instrument not in INSTRUMENTS:
+            parser.error(f"Unknown instrument: {instrument}")
+    if "off" not in args.instrument:
+        args.instrument.insert(0, "off")
+    
+    def report(summary):
+        print(f"{summary['engine']:>10s} c={summary['concurrency']:<4d} "
+              f"{summary['instrument']:>5s} "
+              f"{summary['probes_per_sec']:10.1f} probes/s  "
+              f"p50 {summary['p50_ms']:7.2f}ms  p99 {summary['p99_ms']:7.2f}ms  "
+              f"cpu {summary['cpu_s']:.3f}s  rss {summary['peak_rss_kb']}KB", file=sys.stderr)
+    
+    fleet = BenchFleet(args.open, args.closed, args.blackhole, args.base_port, args.seed)
+    with fleet:
+        report_data = run_benchmarks(fleet, args.timeout, args.concurrency, args.repeat,
+                                     args.engines, report, args.linger_reset, args.instrument)
+    for row in overhead(report_data["results"]):
+        print(f"{row['engine']:>10s} c={row['concurrency']:<4d} {row['instrument']:>5s} overhead: "
+              f"throughput {row['probes_per_sec']:+.1f}%  cpu {row['cpu_s']:+.1f}%", file=sys.stderr)
+    
+    output = json.dumps(report_data, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,9 +23,6 @@ def demo_with_test_servers():
         print("❌ Failed to start test servers")
         return
     
-    # Give servers time to start
-    time.sleep(1)
-    
     try:
         # Initialize scanner
         scanner = PortScanner()
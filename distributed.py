@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+
+import argparse
+import itertools
+import json
+import logging
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from exporters import EXPORTERS, open_output
+from port_scanner import PortScanner
+from scan_engine import ProbeResult, ScanEngine
+from targets import iter_targets, unique_targets
+
+log = logging.getLogger("port_scanner.distributed")
+
+# Protocol: one JSON object per line in each direction.
+#   worker -> coordinator: hello {worker}, request, heartbeat,
+#                          results {lease, results: [[host, port, status, latency, service, protocol]]},
+#                          complete {lease}
+#   coordinator -> worker: lease {lease, targets, start_port, end_port, timeout, open_only},
+#                          wait {seconds}, done
+
+def partition(targets, start_port, end_port, hosts_per_lease=16, ports_per_lease=1024):
+    """Split the (host, port) space into (targets, start_port, end_port) leases"""
+    for first in range(0, len(targets), hosts_per_lease):
+        hosts = targets[first:first + hosts_per_lease]
+        for low in range(start_port, end_port + 1, ports_per_lease):
+            yield hosts, low, min(end_port, low + ports_per_lease - 1)
+
+def send_message(stream, message):
+    stream.write((json.dumps(message, separators=(",", ":")) + "\n").encode())
+    stream.flush()
+
+class _WorkerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.server.coordinator.serve_worker(self.rfile, self.wfile, self.client_address)
+
+class _CoordinatorServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+class Lease:
+    def __init__(self, lease_id, targets, start_port, end_port):
+        self.id = lease_id
+        self.targets = targets
+        self.start_port = start_port
+        self.end_port = end_port
+        self.worker = None
+        self.deadline = None
+        self.attempts = 0
+        self.results = []
+
+class Coordinator:
+    """Hands out leases of the (host, port) space to workers and collects their results
+
+    A lease's results are held back until the worker reports it complete,
+    so a lease that is reassigned after its worker disconnects or misses
+    lease_ttl (no message in that time) is reported exactly once.
+    """
+
+    def __init__(self, targets, start_port, end_port, timeout=1.0, hosts_per_lease=16,
+                 ports_per_lease=1024, lease_ttl=30.0, open_only=True, on_result=None,
+                 host="127.0.0.1", port=0):
+        self.timeout = timeout
+        self.lease_ttl = lease_ttl
+        self.open_only = open_only
+        self.on_result = on_result
+        self.address = (host, port)
+        ids = itertools.count(1)
+        self.pending = deque(Lease(next(ids), hosts, low, high) for hosts, low, high
+                             in partition(list(targets), start_port, end_port,
+                                          hosts_per_lease, ports_per_lease))
+        self.total = len(self.pending)
+        self.active = {}
+        self.completed = 0
+        self.stats = {"leases": self.total, "reassigned": 0, "workers": 0, "results": 0}
+        self._lock = threading.Lock()
+        # Notified as workers disconnect, for drain()
+        self._left = threading.Condition(self._lock)
+        self.connected = 0
+        self._output_lock = threading.Lock()
+        self._finished = threading.Event()
+        self._server = None
+        if not self.total:
+            self._finished.set()
+
+    def start(self):
+        """Listen for workers in a background thread; returns the bound (host, port)"""
+        self._server = _CoordinatorServer(self.address, _WorkerHandler)
+        self._server.coordinator = self
+        self.address = self._server.server_address
+        threading.Thread(target=self._server.serve_forever, daemon=True,
+                         name="coordinator").start()
+        return self.address
+
+    def wait(self, timeout=None):
+        """Block until every lease is complete; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._finished.is_set():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._finished.wait(min(1.0, remaining) if remaining is not None else 1.0)
+            with self._lock:
+                self.expire_leases()
+        return True
+
+    def drain(self, grace=2.0):
+        """After wait(), keep answering "done" until every worker has left or grace seconds pass
+
+        Workers between leases poll for work, so stopping the moment the
+        last lease completes would cut them off before they hear "done".
+        Returns False if some worker was still connected at the deadline.
+        """
+        deadline = time.monotonic() + grace
+        with self._left:
+            while self.connected:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._left.wait(remaining)
+        return True
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def serve_worker(self, rfile, wfile, client_address):
+        worker = f"{client_address[0]}:{client_address[1]}"
+        with self._lock:
+            self.stats["workers"] += 1
+            self.connected += 1
+        try:
+            for line in rfile:
+                message = json.loads(line)
+                kind = message.get("type")
+                if kind == "hello":
+                    worker = f"{message.get('worker', 'worker')}@{worker}"
+                    log.info("Worker %s connected", worker)
+                elif kind == "request":
+                    send_message(wfile, self.assign(worker))
+                    continue
+                elif kind == "results":
+                    self.add_results(worker, message["lease"], message["results"])
+                elif kind == "complete":
+                    self.complete(worker, message["lease"])
+                self.touch(worker)
+        except (OSError, ValueError) as e:
+            log.warning("Worker %s dropped: %s", worker, e)
+        finally:
+            self.release(worker)
+            with self._left:
+                self.connected -= 1
+                self._left.notify_all()
+
+    def assign(self, worker):
+        with self._lock:
+            self.expire_leases()
+            if self.pending:
+                lease = self.pending.popleft()
+                lease.worker = worker
+                lease.deadline = time.monotonic() + self.lease_ttl
+                lease.attempts += 1
+                lease.results = []
+                self.active[lease.id] = lease
+                return {"type": "lease", "lease": lease.id, "targets": lease.targets,
+                        "start_port": lease.start_port, "end_port": lease.end_port,
+                        "timeout": self.timeout, "open_only": self.open_only}
+            if self.active:
+                return {"type": "wait", "seconds": 0.2}
+            return {"type": "done"}
+
+    def touch(self, worker):
+        with self._lock:
+            deadline = time.monotonic() + self.lease_ttl
+            for lease in self.active.values():
+                if lease.worker == worker:
+                    lease.deadline = deadline
+
+    def add_results(self, worker, lease_id, results):
+        with self._lock:
+            lease = self.active.get(lease_id)
+            if lease is not None and lease.worker == worker:
+                lease.results.extend(ProbeResult(*fields) for fields in results)
+
+    def complete(self, worker, lease_id):
+        with self._lock:
+            lease = self.active.get(lease_id)
+            if lease is None or lease.worker != worker:
+                return
+            del self.active[lease_id]
+            self.completed += 1
+            self.stats["results"] += len(lease.results)
+            results, lease.results = lease.results, []
+            finished = self.completed == self.total
+        if self.on_result:
+            with self._output_lock:
+                for result in results:
+                    self.on_result(result)
+        if finished:
+            self._finished.set()
+
+    def release(self, worker):
+        """Requeue the leases of a worker that went away"""
+        with self._lock:
+            for lease in [lease for lease in self.active.values() if lease.worker == worker]:
+                self._requeue(lease)
+
+    def expire_leases(self):
+        now = time.monotonic()
+        for lease in [lease for lease in self.active.values() if lease.deadline < now]:
+            self._requeue(lease)
+
+    def _requeue(self, lease):
+        log.warning("Lease %d taken back from %s and requeued", lease.id, lease.worker)
+        del self.active[lease.id]
+        lease.worker = None
+        lease.results = []
+        self.pending.appendleft(lease)
+        self.stats["reassigned"] += 1
+
+class Worker:
+    """Connects to a Coordinator and scans leases with one reused ScanEngine"""
+
+    def __init__(self, host, port, name=None, scanner=None, max_in_flight=256,
+                 batch_size=256, heartbeat=5.0):
+        self.address = (host, port)
+        self.name = name or socket.gethostname()
+        self.scanner = scanner or PortScanner()
+        self.engine = ScanEngine(self.scanner, max_in_flight=max_in_flight)
+        self.batch_size = batch_size
+        self.heartbeat = heartbeat
+        self.leases = 0
+
+    def run(self):
+        """Work until the coordinator says done; returns the number of leases scanned"""
+        with socket.create_connection(self.address) as sock:
+            rfile = sock.makefile("rb")
+            wfile = sock.makefile("wb")
+            send_message(wfile, {"type": "hello", "worker": self.name})
+            while True:
+                send_message(wfile, {"type": "request"})
+                line = rfile.readline()
+                if not line:
+                    raise ConnectionError("Coordinator closed the connection")
+                message = json.loads(line)
+                if message["type"] == "done":
+                    return self.leases
+                if message["type"] == "wait":
+                    time.sleep(message["seconds"])
+                    continue
+                self.scan_lease(message, wfile)
+                send_message(wfile, {"type": "complete", "lease": message["lease"]})
+                self.leases += 1
+
+    def scan_lease(self, lease, wfile):
+        batch = []
+        last_sent = time.monotonic()
+
+        def send_batch():
+            nonlocal batch, last_sent
+            send_message(wfile, {"type": "results", "lease": lease["lease"], "results": batch})
+            batch = []
+            last_sent = time.monotonic()
+
+        def on_result(result):
+            batch.append(list(result))
+            if len(batch) >= self.batch_size:
+                send_batch()
+
+        def on_progress(value):
+            nonlocal last_sent
+            # Long stretches without results still need to keep the lease alive
+            if time.monotonic() - last_sent >= self.heartbeat:
+                if batch:
+                    send_batch()
+                else:
+                    send_message(wfile, {"type": "heartbeat"})
+                    last_sent = time.monotonic()
+
+        targets = [target.address for target in unique_targets(iter_targets(lease["targets"]))]
+        self.scanner.scanning = True
+        self.engine.scan(targets, range(lease["start_port"], lease["end_port"] + 1),
+                         lease["timeout"], progress_callback=on_progress,
+                         result_callback=on_result, open_only=lease["open_only"], collect=False)
+        if batch:
+            send_batch()
+
+def parse_address(value):
+    host, _, port = value.rpartition(":")
+    return host.strip("[]") or "127.0.0.1", int(port)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Spread a scan over several worker processes")
+    roles = parser.add_subparsers(dest="role", required=True)
+    coordinator_parser = roles.add_parser("coordinator", help="Partition a scan and collect results")
+    coordinator_parser.add_argument("targets", nargs="+", metavar="target")
+    coordinator_parser.add_argument("-p", "--ports", default="1-1000", help="START-END")
+    coordinator_parser.add_argument("-t", "--timeout", type=float, default=1.0)
+    coordinator_parser.add_argument("--listen", type=parse_address, default=("127.0.0.1", 9700),
+                                    help="HOST:PORT for workers (default: 127.0.0.1:9700)")
+    coordinator_parser.add_argument("--hosts-per-lease", type=int, default=16)
+    coordinator_parser.add_argument("--ports-per-lease", type=int, default=1024)
+    coordinator_parser.add_argument("--lease-ttl", type=float, default=30.0,
+                                    help="Seconds of worker silence before a lease is reassigned")
+    coordinator_parser.add_argument("--grace", type=float, default=2.0,
+                                    help="Seconds to keep telling workers the scan is done "
+                                         "before exiting (default: 2)")
+    coordinator_parser.add_argument("--all", action="store_true",
+                                    help="Also report closed and filtered ports")
+    coordinator_parser.add_argument("-f", "--format", choices=sorted(EXPORTERS), default="jsonl")
+    coordinator_parser.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    worker_parser = roles.add_parser("worker", help="Scan leases from a coordinator")
+    worker_parser.add_argument("coordinator", type=parse_address, help="HOST:PORT")
+    worker_parser.add_argument("--name")
+    worker_parser.add_argument("-c", "--concurrency", type=int, default=256)
+    args = parser.parse_args(argv)
+
+    if args.role == "worker":
+        worker = Worker(*args.coordinator, name=args.name, max_in_flight=args.concurrency)
+        try:
+            leases = worker.run()
+        except OSError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(f"Worker finished after {leases} leases", file=sys.stderr)
+        return 0
+
+    try:
+        start, _, end = args.ports.partition("-")
+        start_port, end_port = int(start), int(end or start)
+        targets = [target.address for target in unique_targets(iter_targets(args.targets))]
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    with EXPORTERS[args.format](open_output(args.output)) as exporter:
+        coordinator = Coordinator(targets, start_port, end_port, args.timeout,
+                                  args.hosts_per_lease, args.ports_per_lease, args.lease_ttl,
+                                  not args.all, exporter.write, *args.listen)
+        host, port = coordinator.start()
+        print(f"Coordinator on {host}:{port} with {coordinator.total} leases", file=sys.stderr)
+        try:
+            coordinator.wait()
+            coordinator.drain(args.grace)
+        except KeyboardInterrupt:
+            return 130
+        finally:
+            coordinator.stop()
+    print(f"Done: {coordinator.stats}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import struct
+import sys
+import time
+from scan_engine import CLOSED, ERROR, FILTERED, OPEN, ProbeResult
+
+COMPRESSORS = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+
+# Binary stream: MAGIC, then tagged records. A host record (b"H", length byte,
+# UTF-8 address) assigns the next host index; a result record is b"R" + RECORD.
+MAGIC = b"PSCAN\x01"
+RECORD = struct.Struct("<IHBBI")  # host index, port, status, flags, latency in microseconds
+STATUS_CODES = {OPEN: 0, CLOSED: 1, FILTERED: 2, ERROR: 3, "open|filtered": 4}
+STATUSES = {code: status for status, code in STATUS_CODES.items()}
+FLAG_UDP = 0x01
+
+def open_output(path, compression=None, buffer_size=1 << 16):
+    """Open a binary stream for results; '-' is stdout, compression defaults from the extension"""
+    if compression is None:
+        compression = next((name for ext, name in EXTENSIONS.items() if path.endswith(ext)), None)
+    if path == "-":
+        stream = sys.stdout.buffer
+        if compression:
+            return COMPRESSORS[compression](stream, "wb")
+        return stream
+    if compression:
+        return COMPRESSORS[compression](path, "wb")
+    return open(path, "wb", buffering=buffer_size)
+
+def open_input(path):
+    """Open a result file for reading, decompressing by extension; '-' is stdin"""
+    if path == "-":
+        return sys.stdin.buffer
+    for ext, name in EXTENSIONS.items():
+        if path.endswith(ext):
+            return COMPRESSORS[name](path, "rb")
+    return open(path, "rb")
+
+class ResultExporter:
+    """Writes ProbeResults to a binary stream as they arrive
+
+    Writes go through the stream's buffer and are flushed at most every
+    flush_interval seconds (0 flushes every result), so a consumer like jq
+    sees results promptly without a syscall per line. A closed pipe sets
+    broken and calls on_broken instead of raising.
+    """
+
+    def __init__(self, stream, flush_interval=1.0, on_broken=None):
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self.on_broken = on_broken
+        self.broken = False
+        self.count = 0
+        self._next_flush = time.monotonic() + flush_interval
+        self._safe(self.write_header)
+
+    def write_header(self):
+        pass
+
+    def encode(self, result):
+        raise NotImplementedError
+
+    def _safe(self, action, *args):
+        if self.broken:
+            return
+        try:
+            action(*args)
+        except BrokenPipeError:
+            self.broken = True
+            if self.on_broken:
+                self.on_broken()
+
+    def _write(self, result):
+        self.stream.write(self.encode(result))
+        self.count += 1
+        now = time.monotonic()
+        if now >= self._next_flush:
+            self.stream.flush()
+            self._next_flush = now + self.flush_interval
+
+    def write(self, result):
+        self._safe(self._write, result)
+
+    def flush(self):
+        self._safe(self.stream.flush)
+
+    def close(self):
+        """Flush and close the stream (stdout itself is only flushed)"""
+        self.flush()
+        if self.stream is not sys.stdout.buffer:
+            try:
+                self.stream.close()
+            except BrokenPipeError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class JsonlExporter(ResultExporter):
+    """One JSON object per line"""
+
+    def encode(self, result):
+        return (json.dumps(result._asdict(), separators=(",", ":")) + "\n").encode()
+
+class CsvExporter(ResultExporter):
+    """CSV with a header row"""
+
+    def write_header(self):
+        self._text = io.StringIO()
+        self._csv = csv.writer(self._text, lineterminator="\n")
+        self._csv.writerow(ProbeResult._fields)
+        self.stream.write(self._take())
+
+    def _take(self):
+        data = self._text.getvalue().encode()
+        self._text.seek(0)
+        self._text.truncate()
+        return data
+
+    def encode(self, result):
+        self._csv.writerow((result.host, result.port, result.status,
+                            f"{result.latency:.6f}", result.service, result.protocol))
+        return self._take()
+
+class BinaryExporter(ResultExporter):
+    """Compact tagged records: 13 bytes per result plus one host record per address"""
+
+    def write_header(self):
+        self._hosts = {}
+        self.stream.write(MAGIC)
+
+    def encode(self, result):
+        prefix = b""
+        index = self._hosts.get(result.host)
+        if index is None:
+            index = self._hosts[result.host] = len(self._hosts)
+            name = result.host.encode()
+            prefix = b"H" + bytes((len(name),)) + name
+        flags = FLAG_UDP if result.protocol == "udp" else 0
+        latency_us = min(round(result.latency * 1e6), 0xFFFFFFFF)
+        return prefix + b"R" + RECORD.pack(index, result.port, STATUS_CODES[result.status],
+                                           flags, latency_us)
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated binary scan result stream")
+    return data
+
+def read_binary(stream, service_name=None):
+    """Yield ProbeResults from a BinaryExporter stream; service_name(port, protocol) fills service
+
+    Raises ValueError if the stream is not one, or is truncated or corrupt.
+    """
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a binary scan result stream")
+    hosts = []
+    while True:
+        tag = stream.read(1)
+        if not tag:
+            return
+        if tag == b"H":
+            length = _read_exact(stream, 1)[0]
+            hosts.append(_read_exact(stream, length).decode())
+        elif tag == b"R":
+            index, port, status, flags, latency_us = RECORD.unpack(_read_exact(stream, RECORD.size))
+            if index >= len(hosts) or status not in STATUSES:
+                raise ValueError("Corrupt binary scan result stream (unknown host or status)")
+            protocol = "udp" if flags & FLAG_UDP else "tcp"
+            service = service_name(port, protocol) if service_name else ""
+            yield ProbeResult(hosts[index], port, STATUSES[status], latency_us / 1e6,
+                              service, protocol)
+        else:
+            raise ValueError(f"Corrupt binary scan result stream (tag {tag!r})")
+
+def read_jsonl(stream):
+    for line in stream:
+        if line.strip():
+            yield ProbeResult(**json.loads(line))
+
+def read_csv(stream):
+    for row in csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8", newline="")):
+        yield ProbeResult(row["host"], int(row["port"]), row["status"], float(row["latency"]),
+                          row["service"], row["protocol"])
+
+def read_results(stream):
+    """Yield ProbeResults from any exporter's output, detecting the format from its first bytes"""
+    stream = io.BufferedReader(stream) if not hasattr(stream, "peek") else stream
+    head = stream.peek(len(MAGIC))[:len(MAGIC)]
+    if head == MAGIC:
+        return read_binary(stream)
+    if head.startswith(b"{"):
+        return read_jsonl(stream)
+    if head.startswith(b"host,"):
+        return read_csv(stream)
+    if not head:
+        return iter(())
+    raise ValueError("Unrecognised scan result format")
+
+EXPORTERS = {"jsonl": JsonlExporter, "csv": CsvExporter, "binary": BinaryExporter}
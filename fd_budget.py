@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import errno
+import os
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# socket() errors that mean "out of descriptors", not anything about the port
+FD_EXHAUSTED = (errno.EMFILE, errno.ENFILE)
+
+def get_fd_limits():
+    """Return (soft, hard) RLIMIT_NOFILE, or (None, None) where it is unknown"""
+    if resource is None:
+        return None, None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    return (None if soft == resource.RLIM_INFINITY else soft,
+            None if hard == resource.RLIM_INFINITY else hard)
+
+def raise_soft_limit(needed=None):
+    """Raise the soft RLIMIT_NOFILE to needed (or the hard limit) and return the new soft limit"""
+    if resource is None:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = hard if needed is None else needed
+    if hard != resource.RLIM_INFINITY:
+        target = min(target, hard)
+    if target == resource.RLIM_INFINITY or soft == resource.RLIM_INFINITY or target > soft:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            soft = target
+        except (ValueError, OSError):
+            pass
+    return None if soft == resource.RLIM_INFINITY else soft
+
+def count_open_fds():
+    """Count descriptors currently open in this process, or None if it can't be told"""
+    for path in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(path))
+        except OSError:
+            continue
+    return None
+
+class FdBudget:
+    """Sizes in-flight socket windows to what RLIMIT_NOFILE has left"""
+
+    def __init__(self, reserve=64, raise_limit=False, max_wait=5.0):
+        self.reserve = reserve
+        self.max_wait = max_wait
+        if raise_limit:
+            raise_soft_limit()
+
+    def available(self):
+        """Descriptors that can still be opened, keeping reserve spare for everything else"""
+        soft, hard = get_fd_limits()
+        in_use = count_open_fds()
+        if soft is None or in_use is None:
+            return None
+        return max(0, soft - in_use - self.reserve)
+
+    def window(self, requested):
+        """Clamp a requested concurrency to the remaining descriptor budget (minimum 1)"""
+        available = self.available()
+        if available is None:
+            return max(1, requested)
+        return max(1, min(requested, available))
+
+    def backoffs(self):
+        """Yield sleep intervals for waiting out descriptor exhaustion, up to max_wait in total"""
+        delay, waited = 0.01, 0.0
+        while waited < self.max_wait:
+            delay = min(delay, self.max_wait - waited)
+            yield delay
+            waited += delay
+            delay = min(delay * 2, 0.5)
+
+    def wait(self, backoffs):
+        """Sleep for the next backoff interval; returns False once the wait budget is spent"""
+        delay = next(backoffs, None)
+        if delay is None:
+            return False
+        time.sleep(delay)
+        return True
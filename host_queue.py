@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+from collections import deque
+
+class _Host:
+    __slots__ = ("address", "index", "rounds", "requeued", "in_flight", "window", "active")
+
+    def __init__(self, address, rounds, window):
+        self.address = address
+        self.index = 0
+        # A target listed n times is scanned n times, as one host
+        self.rounds = rounds
+        self.requeued = deque()
+        self.in_flight = 0
+        self.window = window
+        self.active = True
+
+class HostQueue:
+    """Hands out (host, port) probes round-robin across hosts, each within its own window
+
+    A host starts with initial_window probes in flight. Every answer widens
+    its window by one and every timeout halves it, so a host that stops
+    answering is soon down to one slot while hosts that answer fast take
+    the rest. Slots nobody else can use still go to slow hosts, up to
+    max_per_host, so a slow host is deprioritised rather than left for last.
+    At most max_hosts hosts are interleaved at once; the next target is
+    admitted as one runs out of ports.
+    """
+
+    def __init__(self, targets, ports, max_per_host=None, initial_window=4, max_window=256,
+                 max_hosts=256):
+        targets = list(targets)
+        self.ports = list(ports)
+        self.total = len(targets) * len(self.ports)
+        self.targets = iter(targets)
+        self.max_per_host = max_per_host or float("inf")
+        self.initial_window = min(initial_window, self.max_per_host)
+        self.max_window = min(max_window, self.max_per_host)
+        self.max_hosts = max_hosts
+        self.hosts = {}
+        self.rotation = deque()
+        # Probes not yet handed out, counting targets not yet admitted
+        self.remaining = self.total
+        self._more_targets = True
+
+    def _admit(self):
+        while self._more_targets and len(self.rotation) < self.max_hosts:
+            address = next(self.targets, None)
+            if address is None:
+                self._more_targets = False
+                break
+            host = self.hosts.get(address)
+            if host is None:
+                host = self.hosts[address] = _Host(address, 1, self.initial_window)
+                self.rotation.append(host)
+                continue
+            host.rounds += 1
+            if not host.active:
+                host.active = True
+                self.rotation.append(host)
+
+    def _has_work(self, host):
+        return host.requeued or host.index < host.rounds * len(self.ports)
+
+    def _take(self, host):
+        host.in_flight += 1
+        self.remaining -= 1
+        if host.requeued:
+            return host.address, host.requeued.popleft()
+        port = self.ports[host.index % len(self.ports)]
+        host.index += 1
+        return host.address, port
+
+    def _retire(self, host):
+        if not host.active and not host.in_flight and not self._has_work(host):
+            del self.hosts[host.address]
+
+    def pop(self):
+        """The next probe to start, or None if every host with work is at its limit"""
+        # First pass respects each host's window; the second only max_per_host
+        for strict in (True, False):
+            self._admit()
+            for _ in range(len(self.rotation)):
+                host = self.rotation.popleft()
+                if not self._has_work(host):
+                    host.active = False
+                    self._retire(host)
+                    continue
+                self.rotation.append(host)
+                if host.in_flight < (host.window if strict else self.max_per_host):
+                    return self._take(host)
+        return None
+
+    def push(self, item):
+        """Queue a probe again, ahead of its host's remaining ports"""
+        address, port = item
+        host = self.hosts.get(address)
+        if host is None:
+            host = self.hosts[address] = _Host(address, 0, self.initial_window)
+            host.active = False
+        host.requeued.append(port)
+        self.remaining += 1
+        if not host.active:
+            host.active = True
+            self.rotation.append(host)
+
+    def done(self, address, responded):
+        """An in-flight probe finished; responded is False for a timeout"""
+        host = self.hosts[address]
+        host.in_flight -= 1
+        if responded:
+            host.window = min(self.max_window, host.window + 1)
+        else:
+            host.window = max(1, host.window // 2)
+        self._retire(host)
+
+    def release(self, address):
+        """An in-flight probe was abandoned (requeued or failed locally) without a verdict"""
+        host = self.hosts[address]
+        host.in_flight -= 1
+        self._retire(host)
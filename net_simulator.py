@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+import errno
+import os
+import random
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from unittest.mock import patch
+
+class PortBehavior:
+    """How a simulated port answers a connection attempt"""
+
+    def __init__(self, state="closed", latency=0.0, jitter=0.0, drop_rate=0.0):
+        if state not in ("open", "closed", "filtered"):
+            raise ValueError(f"Unknown port state: {state}")
+        self.state = state
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+
+class SimulatedNetwork:
+    """A seeded, root-free stand-in for socket.socket that simulates faulty networks
+
+    Outcomes are decided in simulated time from a seeded RNG, so a given seed
+    always produces the same results. Real sleeps are multiplied by time_scale,
+    which lets tests model one-second timeouts in milliseconds.
+    """
+
+    def __init__(self, seed=0, default=None, time_scale=1.0, rst_rate=0.0):
+        self.random = random.Random(seed)
+        self.default = default or PortBehavior("closed")
+        self.time_scale = time_scale
+        self.rst_rate = rst_rate
+        self.behaviors = {}
+        self.attempts = []
+
+    def set_port(self, port, state="open", host=None, **options):
+        """Configure one port, optionally for a single host only"""
+        self.behaviors[(host, port)] = PortBehavior(state, **options)
+
+    def set_ports(self, ports, state="open", host=None, **options):
+        for port in ports:
+            self.set_port(port, state, host, **options)
+
+    def behavior_for(self, host, port):
+        return self.behaviors.get((host, port)) or self.behaviors.get((None, port)) or self.default
+
+    def draw(self, host, port):
+        """Draw the errno a connect to (host, port) ends with and its delay (inf if never answered)"""
+        behavior = self.behavior_for(host, port)
+        delay = behavior.latency + self.random.uniform(0, behavior.jitter)
+
+        if behavior.state == "filtered" or self.random.random() < behavior.drop_rate:
+            return errno.EAGAIN, float("inf")
+        if self.random.random() < self.rst_rate:
+            return errno.ECONNREFUSED, delay
+        if behavior.state == "open":
+            return 0, delay
+        return errno.ECONNREFUSED, delay
+
+    def connect(self, host, port, timeout):
+        """Decide the errno a connect to (host, port) returns and how long it takes"""
+        code, delay = self.draw(host, port)
+        if timeout is not None and delay > timeout:
+            code, delay = errno.EAGAIN, timeout
+        self.attempts.append((host, port, code))
+        if delay and delay != float("inf"):
+            time.sleep(delay * self.time_scale)
+        return code
+
+    def start_connect(self, host, port):
+        """Non-blocking connect: returns (errno, real seconds until the answer) without sleeping"""
+        code, delay = self.draw(host, port)
+        self.attempts.append((host, port, code))
+        return code, delay * self.time_scale
+
+    def socket(self, family=socket.AF_INET, type=socket.SOCK_STREAM, proto=0, fileno=None):
+        return SimulatedSocket(self, family, type)
+
+    @contextmanager
+    def patch(self):
+        """Route every socket.socket() call through this network for the duration"""
+        with patch('socket.socket', self.socket):
+            yield self
+
+class SimulatedSocket:
+    """The subset of the socket API the scanners use, backed by a SimulatedNetwork
+
+    In non-blocking mode connect_ex() returns EINPROGRESS and fileno() is
+    the write end of a pipe kept full until the simulated answer is due, so
+    selectors see the socket turn writable just like a real connect, and
+    SO_ERROR then holds the outcome. A timer thread empties the pipe.
+    """
+
+    def __init__(self, network, family, type):
+        self.network = network
+        self.family = family
+        self.type = type
+        self.timeout = None
+        self.closed = False
+        self.error = 0
+        self.connecting = False
+        self._pipe = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def setblocking(self, flag):
+        self.timeout = None if flag else 0.0
+
+    def setsockopt(self, *args):
+        pass
+
+    def getsockopt(self, level, option, buflen=None):
+        if option == socket.SO_ERROR:
+            return self.error
+        return 0
+
+    def fileno(self):
+        if self.closed:
+            return -1
+        if self._pipe is None:
+            self._pipe = os.pipe()
+            for fd in self._pipe:
+                os.set_blocking(fd, False)
+            self._fill()
+        return self._pipe[1]
+
+    def _fill(self):
+        try:
+            while True:
+                os.write(self._pipe[1], bytes(65536))
+        except BlockingIOError:
+            pass
+
+    def _answer(self, code):
+        with self._lock:
+            if self.closed:
+                return
+            self.error = code
+            try:
+                while os.read(self._pipe[0], 65536):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def connect_ex(self, address):
+        if self.closed:
+            return errno.EBADF
+        if self.timeout != 0.0:
+            return self.network.connect(address[0], address[1], self.timeout)
+        if self.connecting:
+            return errno.EALREADY
+        self.connecting = True
+        self.fileno()
+        code, delay = self.network.start_connect(address[0], address[1])
+        if delay == 0:
+            self._answer(code)
+        elif delay != float("inf"):
+            self._timer = threading.Timer(delay, self._answer, (code,))
+            self._timer.daemon = True
+            self._timer.start()
+        return errno.EINPROGRESS
+
+    def connect(self, address):
+        code = self.connect_ex(address)
+        if code == errno.EAGAIN:
+            raise socket.timeout("timed out")
+        if code:
+            raise OSError(code, errno.errorcode.get(code, "error"))
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+            if self._pipe is not None:
+                for fd in self._pipe:
+                    os.close(fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
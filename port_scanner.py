@@ -1,37 +1,136 @@
 #!/usr/bin/env python3
 
+import importlib
+import logging
+import queue
 import socket
+import sys
 import threading
-import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
-from datetime import datetime
 import ipaddress
+from fd_budget import FD_EXHAUSTED, FdBudget
+from scan_control import CancelToken, PauseGate
+from scan_diff import ADDED, CHANGED, REMOVED, ScanSnapshot, diff_snapshots
+from service_catalog import cli_catalog, default_catalog
+from socket_tuning import ADDR_EXHAUSTED, set_linger_reset
+from targets import address_family
+
+log = logging.getLogger("port_scanner")
+gui_log = logging.getLogger("port_scanner.gui")
+# The log panel shows GUI messages from INFO up whatever the console level is. Its
+# logger sits outside the port_scanner tree, so the console never sees its records.
+panel_log = logging.getLogger("port_scanner_panel")
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+# Only the GUI needs Tk, so headless tools importing PortScanner never load it
+tk = LazyModule("tkinter")
+ttk = LazyModule("tkinter.ttk")
+scrolledtext = LazyModule("tkinter.scrolledtext")
+messagebox = LazyModule("tkinter.messagebox")
+filedialog = LazyModule("tkinter.filedialog")
+
+# Everything the GUI imports on the way to its first window, for --startup-profile
+GUI_MODULES = ("port_scanner", "tkinter.ttk", "tkinter.scrolledtext", "tkinter.messagebox",
+               "tkinter.filedialog", "scan_presets", "scan_log")
+
+# Points in the probe path where profiling hooks can be attached. Hooks are called as
+# pre_probe(host, port), post_connect(host, port, errno), post_classify(host, port, is_open)
+# and pre_callback(host, port, service). post_connect gets 0 for an answer (a TCP connect or
+# a UDP reply), ECONNREFUSED for a refusal and ETIMEDOUT for silence, on every engine.
+HOOK_POINTS = ("pre_probe", "post_connect", "post_classify", "pre_callback")
 
 class PortScanner:
-    def __init__(self):
-        self.common_ports = {
-            21: "FTP", 22: "SSH", 23: "Telnet", 25: "SMTP", 53: "DNS",
-            80: "HTTP", 110: "POP3", 143: "IMAP", 443: "HTTPS", 993: "IMAPS",
-            995: "POP3S", 1433: "MSSQL", 3306: "MySQL", 3389: "RDP", 5432: "PostgreSQL",
-            5900: "VNC", 6379: "Redis", 8080: "HTTP-Alt", 8443: "HTTPS-Alt", 
-            9000: "Test-Web", 9001: "Test-API", 9002: "Test-DB", 9200: "Elasticsearch",
-            9999: "Test-Service"
-        }
-        self.scanning = False
+    def __init__(self, catalog=None):
+        # Port -> service names, risk and tags; see service_catalog
+        self.catalog = catalog or default_catalog()
+        # Set while no scan is running; see the scanning property
+        self.cancel_token = CancelToken()
+        self.cancel_token.set()
+        self.pause_gate = PauseGate()
         self.scan_results = []
+        self._hooks = {}
+        self.fd_budget = FdBudget()
+        self.linger_reset = False
+        self.source_pool = None
+    
+    @property
+    def scanning(self):
+        """True while a scan may run; clearing it sets cancel_token, waking every engine at once"""
+        return not self.cancel_token.is_set()
+    
+    @scanning.setter
+    def scanning(self, value):
+        if not value:
+            self.cancel_token.set()
+        elif self.cancel_token.is_set():
+            self.cancel_token = CancelToken()
+    
+    def add_hook(self, point, func):
+        """Register func to be called at a hook point in the probe path"""
+        if point not in HOOK_POINTS:
+            raise ValueError(f"Unknown hook point: {point}")
+        self._hooks.setdefault(point, []).append(func)
+    
+    def remove_hook(self, point, func):
+        """Unregister a hook; the hot path skips a point entirely once it has none"""
+        funcs = self._hooks.get(point, [])
+        if func in funcs:
+            funcs.remove(func)
+        if not funcs:
+            self._hooks.pop(point, None)
+    
+    def _fire(self, point, *args):
+        for func in self._hooks.get(point, ()):
+            func(*args)
     
     def scan_port(self, target, port, timeout=1):
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(timeout)
-            result = sock.connect_ex((target, port))
-            sock.close()
-            return result == 0
-        except (socket.error, OSError):
-            return False
+        hooks = self._hooks
+        if "pre_probe" in hooks:
+            self._fire("pre_probe", target, port)
+        backoffs = None
+        while True:
+            try:
+                sock = socket.socket(address_family(target), socket.SOCK_STREAM)
+                try:
+                    if self.source_pool:
+                        self.source_pool.bind(sock)
+                    sock.settimeout(timeout)
+                    result = sock.connect_ex((target, port))
+                    if result == 0 and self.linger_reset:
+                        set_linger_reset(sock)
+                finally:
+                    sock.close()
+                if result in ADDR_EXHAUSTED:
+                    raise OSError(result, "Local address space exhausted")
+                if "post_connect" in hooks:
+                    self._fire("post_connect", target, port, result)
+                return result == 0
+            except (socket.error, OSError) as e:
+                if e.errno not in FD_EXHAUSTED and e.errno not in ADDR_EXHAUSTED:
+                    return False
+                # Running out of descriptors or source ports says nothing about the port; wait
+                if backoffs is None:
+                    backoffs = self.fd_budget.backoffs()
+                if not self.fd_budget.wait(backoffs):
+                    raise
+    
+    @property
+    def common_ports(self):
+        """TCP port -> service name from the current catalogue index"""
+        return self.catalog.index.names
     
-    def get_service_name(self, port):
-        return self.common_ports.get(port, "Unknown")
+    def get_service_name(self, port, protocol="tcp"):
+        return self.catalog.index.name(port, protocol)
     
     def validate_ip(self, ip):
         try:
@@ -41,15 +140,29 @@ class PortScanner:
             return False
     
     def scan_range(self, target, start_port, end_port, timeout, progress_callback, result_callback):
+        return self.scan_ports(target, range(start_port, end_port + 1), timeout,
+                               progress_callback, result_callback)
+    
+    def scan_ports(self, target, ports, timeout, progress_callback, result_callback):
+        """Like scan_range, over any sequence of ports in the order given (e.g. a ScanPlan's)"""
         open_ports = []
-        total_ports = end_port - start_port + 1
+        total_ports = len(ports)
+        hooks = self._hooks
         
-        for i, port in enumerate(range(start_port, end_port + 1)):
+        for i, port in enumerate(ports):
+            if self.pause_gate.paused:
+                self.pause_gate.wait(self.cancel_token)
             if not self.scanning:
                 break
-                
-            if self.scan_port(target, port, timeout):
+            
+            is_open = self.scan_port(target, port, timeout)
+            if "post_classify" in hooks:
+                self._fire("post_classify", target, port, is_open)
+            
+            if is_open:
                 service = self.get_service_name(port)
+                if "pre_callback" in hooks:
+                    self._fire("pre_callback", target, port, service)
                 open_ports.append((port, service))
                 result_callback(port, service)
             
@@ -66,8 +179,23 @@ class PortScannerGUI:
         
         self.scanner = PortScanner()
         self.scan_thread = None
+        # The last completed (or loaded) run; the next scan is compared against it
+        self.baseline = None
+        self.current = None
+        self.current_target = None
+        self.result_rows = {}
+        from scan_presets import PresetLibrary
+        try:
+            self.presets = PresetLibrary.load(common_ports=self.scanner.catalog.index)
+        except (OSError, ValueError, TypeError):
+            self.presets = PresetLibrary(common_ports=self.scanner.catalog.index)
+        # The compiled plan of the selected preset; None scans the entered range serially
+        self.plan = None
         
+        self.attach_log_panel()
         self.setup_ui()
+        self.drain_log()
+        log.debug("GUI initialized")
     
     def setup_ui(self):
         main_frame = ttk.Frame(self.root, padding="10")
@@ -96,6 +224,14 @@ class PortScannerGUI:
         self.end_port_entry.grid(row=0, column=2, padx=(5, 0))
         self.end_port_entry.insert(0, "1000")
         
+        ttk.Label(port_frame, text="Preset:").grid(row=0, column=3, padx=(15, 5))
+        
+        self.preset_var = tk.StringVar(value="Custom")
+        self.preset_combo = ttk.Combobox(port_frame, textvariable=self.preset_var, width=14,
+                                         values=["Custom"] + self.presets.names(), state="readonly")
+        self.preset_combo.grid(row=0, column=4)
+        self.preset_combo.bind("<<ComboboxSelected>>", lambda event: self.apply_preset())
+        
         ttk.Label(main_frame, text="Timeout (seconds):").grid(row=2, column=0, sticky=tk.W, pady=5)
         self.timeout_entry = ttk.Entry(main_frame, width=10)
         self.timeout_entry.grid(row=2, column=1, sticky=tk.W, pady=5)
@@ -110,8 +246,17 @@ class PortScannerGUI:
         self.stop_button = ttk.Button(button_frame, text="Stop Scan", command=self.stop_scan, state=tk.DISABLED)
         self.stop_button.grid(row=0, column=1, padx=5)
         
+        self.pause_button = ttk.Button(button_frame, text="Pause", command=self.toggle_pause, state=tk.DISABLED)
+        self.pause_button.grid(row=0, column=2, padx=5)
+        
         self.clear_button = ttk.Button(button_frame, text="Clear Results", command=self.clear_results)
-        self.clear_button.grid(row=0, column=2, padx=(5, 0))
+        self.clear_button.grid(row=0, column=3, padx=5)
+        
+        self.baseline_button = ttk.Button(button_frame, text="Load Baseline", command=self.load_baseline)
+        self.baseline_button.grid(row=0, column=4, padx=5)
+        
+        self.profiles_button = ttk.Button(button_frame, text="Group by Profile", command=self.show_profiles)
+        self.profiles_button.grid(row=0, column=5, padx=(5, 0))
         
         self.progress = ttk.Progressbar(main_frame, mode='determinate')
         self.progress.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=5)
@@ -126,6 +271,9 @@ class PortScannerGUI:
         
         main_frame.rowconfigure(6, weight=1)
         
+        self.summary_label = ttk.Label(results_frame, text="", justify=tk.LEFT)
+        self.summary_label.grid(row=0, column=0, columnspan=2, sticky=tk.W)
+        
         columns = ("Port", "Service", "Status")
         self.results_tree = ttk.Treeview(results_frame, columns=columns, show="headings", height=10)
         
@@ -133,6 +281,10 @@ class PortScannerGUI:
             self.results_tree.heading(col, text=col)
             self.results_tree.column(col, width=100)
         
+        self.results_tree.tag_configure(ADDED, background="#d4f7d4")
+        self.results_tree.tag_configure(REMOVED, background="#f7d4d4")
+        self.results_tree.tag_configure(CHANGED, background="#fff3c4")
+        
         scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.results_tree.yview)
         self.results_tree.configure(yscrollcommand=scrollbar.set)
         
@@ -149,12 +301,37 @@ class PortScannerGUI:
         self.log_text = scrolledtext.ScrolledText(log_frame, height=8, state=tk.DISABLED)
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
     
-    def log_message(self, message):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)
-        self.log_text.config(state=tk.DISABLED)
+    def attach_log_panel(self):
+        # Scan threads only enqueue log records; the Tk thread formats and shows them in batches
+        from scan_log import DeferredQueueHandler
+        self.log_queue = queue.SimpleQueue()
+        self.log_handler = DeferredQueueHandler(self.log_queue)
+        self.log_format = logging.Formatter("[%(asctime)s] %(message)s", "%H:%M:%S")
+        panel_log.addHandler(self.log_handler)
+        panel_log.setLevel(logging.INFO)
+        panel_log.propagate = False
+    
+    def log_message(self, message, level=logging.INFO, exc_info=False):
+        """Show a message in the log panel, and on the console if gui logging is at that level"""
+        panel_log.log(level, message, exc_info=exc_info)
+        gui_log.log(level, message, exc_info=exc_info)
+    
+    def drain_log(self):
+        """Show the queued log records in one insert, then check again shortly"""
+        lines = []
+        while True:
+            try:
+                record = self.log_queue.get_nowait()
+            except queue.Empty:
+                break
+            if record.levelno >= logging.INFO:
+                lines.append(self.log_format.format(record) + "\n")
+        if lines:
+            self.log_text.config(state=tk.NORMAL)
+            self.log_text.insert(tk.END, "".join(lines))
+            self.log_text.see(tk.END)
+            self.log_text.config(state=tk.DISABLED)
+        self.root.after(100, self.drain_log)
     
     def update_progress(self, value):
         self.progress['value'] = value
@@ -162,9 +339,105 @@ class PortScannerGUI:
         self.root.update_idletasks()
     
     def add_result(self, port, service):
-        self.results_tree.insert("", tk.END, values=(port, service, "Open"))
+        self.result_rows[port] = self.results_tree.insert("", tk.END, values=(port, service, "Open"))
+        self.current.add_open(self.current_target, port, service)
         self.log_message(f"Open port found: {port} ({service})")
     
+    def load_baseline(self):
+        path = filedialog.askopenfilename(
+            title="Load baseline results",
+            filetypes=[("Scan results", "*.psr *.jsonl *.csv *.bin *.gz *.bz2 *.xz"), ("All files", "*")]
+        )
+        if not path:
+            return
+        try:
+            self.baseline = ScanSnapshot.from_path(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Cannot read baseline: {e}")
+            return
+        self.log_message(f"Loaded baseline with {len(self.baseline)} open ports from {path}")
+        self.summary_label.config(text=self.summary_text(self.baseline))
+    
+    def summary_text(self, snapshot):
+        """Top ports and most exposed subnets of a snapshot, for the summary panel"""
+        from analytics import ResultColumns, format_summary
+        return "\n".join(format_summary(ResultColumns.from_snapshot(snapshot).summary()))
+    
+    def profile_rows(self, snapshot):
+        """Treeview rows for each distinct open-port profile, hosts off the golden one tagged"""
+        from profile_store import ProfileStore
+        store = ProfileStore.from_snapshot(snapshot)
+        golden = store.golden()
+        rows = []
+        for profile_id, hosts in store.groups():
+            members = ", ".join(hosts[:20]) + (" ..." if len(hosts) > 20 else "")
+            tags = () if profile_id == golden else (CHANGED,)
+            rows.append(((len(hosts), store.describe(profile_id), members), tags))
+        return rows
+    
+    def show_profiles(self):
+        """Group the loaded baseline's hosts by identical open-port profile in a new window"""
+        snapshot = self.baseline or self.current
+        if not snapshot:
+            messagebox.showinfo("Group by Profile", "Load a baseline or run a scan first.")
+            return
+        window = tk.Toplevel(self.root)
+        window.title("Hosts by Open-Port Profile")
+        columns = ("Hosts", "Open Ports", "Members")
+        tree = ttk.Treeview(window, columns=columns, show="headings", height=15)
+        for col, width in zip(columns, (60, 250, 400)):
+            tree.heading(col, text=col)
+            tree.column(col, width=width)
+        tree.tag_configure(CHANGED, background="#fff3c4")
+        tree.pack(fill=tk.BOTH, expand=True)
+        for values, tags in self.profile_rows(snapshot):
+            tree.insert("", tk.END, values=values, tags=tags)
+    
+    def show_changes(self, target, start_port, end_port):
+        """Highlight rows that differ from the baseline and add rows for ports that closed"""
+        baseline = self.baseline.restrict([target], start_port, end_port, "tcp")
+        changes = 0
+        for event in diff_snapshots(baseline, self.current):
+            changes += 1
+            if event.kind == REMOVED:
+                service = event.old_service or self.scanner.get_service_name(event.port)
+                self.results_tree.insert("", tk.END, values=(event.port, service, "Closed (was open)"),
+                                         tags=(REMOVED,))
+                self.log_message(f"Port closed since baseline: {event.port}")
+            elif event.kind == CHANGED:
+                self.results_tree.item(self.result_rows[event.port], tags=(CHANGED,),
+                                       values=(event.port, event.new_service,
+                                               f"Open (was {event.old_service})"))
+                self.log_message(f"Service changed on port {event.port}: "
+                                 f"{event.old_service} -> {event.new_service}")
+            else:
+                self.results_tree.item(self.result_rows[event.port], tags=(ADDED,))
+                self.log_message(f"Port opened since baseline: {event.port}")
+        return changes
+    
+    def apply_preset(self):
+        """Fill the range and timeout fields from the selected preset's compiled plan"""
+        name = self.preset_var.get()
+        if name == "Custom":
+            self.plan = None
+            return
+        self.plan = self.presets.plan(name)
+        for entry, value in ((self.start_port_entry, self.plan.intervals[0][0]),
+                             (self.end_port_entry, self.plan.intervals[-1][1]),
+                             (self.timeout_entry, self.plan.timeout)):
+            entry.delete(0, tk.END)
+            entry.insert(0, str(value))
+        self.log_message(f"Preset {name}: {len(self.plan.ports)} ports in "
+                         f"{len(self.plan.intervals)} ranges, {self.plan.engine} engine")
+    
+    def plan_ports(self, start_port, end_port):
+        """The selected plan's ports within the entered range, or None without a plan"""
+        if self.plan is None:
+            return None
+        if (start_port, end_port) == (self.plan.intervals[0][0], self.plan.intervals[-1][1]):
+            return self.plan.ports
+        return [port for port in self.plan.ports if start_port <= port <= end_port]
+    
     def validate_inputs(self):
         try:
             target = self.ip_entry.get().strip()
@@ -195,73 +468,159 @@ class PortScannerGUI:
             return
         
         target, start_port, end_port, timeout = inputs
+        ports = self.plan_ports(start_port, end_port)
+        if ports is not None:
+            description = f"{self.plan.name} preset ({len(ports)} ports in {start_port}-{end_port})"
+        else:
+            description = f"ports {start_port}-{end_port}"
         
         if not messagebox.askyesno("Confirm Scan", 
-                                 f"Scan {target} ports {start_port}-{end_port}?\n\n"
+                                 f"Scan {target} {description}?\n\n"
                                  "Only scan networks you own or have permission to test."):
             return
         
         self.scanner.scanning = True
+        self.current = ScanSnapshot()
+        self.current_target = target
+        self.result_rows = {}
         self.scan_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
+        self.pause_button.config(state=tk.NORMAL, text="Pause")
         
         self.progress['value'] = 0
         self.status_label.config(text="Starting scan...")
         
-        self.log_message(f"Starting scan of {target} ports {start_port}-{end_port}")
+        self.log_message(f"Starting scan of {target} {description}")
         
         self.scan_thread = threading.Thread(
             target=self.run_scan,
-            args=(target, start_port, end_port, timeout)
+            args=(target, start_port, end_port, timeout, ports)
         )
         self.scan_thread.daemon = True
         self.scan_thread.start()
     
-    def run_scan(self, target, start_port, end_port, timeout):
+    def run_scan(self, target, start_port, end_port, timeout, ports=None):
         try:
-            open_ports = self.scanner.scan_range(
-                target, start_port, end_port, timeout,
-                self.update_progress, self.add_result
-            )
+            if ports is None:
+                open_ports = self.scanner.scan_range(
+                    target, start_port, end_port, timeout,
+                    self.update_progress, self.add_result
+                )
+            else:
+                open_ports = self.run_plan(target, ports, timeout)
             
             if self.scanner.scanning:
                 self.log_message(f"Scan completed. Found {len(open_ports)} open ports.")
-                self.status_label.config(text=f"Scan completed - {len(open_ports)} open ports found")
+                status = f"Scan completed - {len(open_ports)} open ports found"
+                if self.baseline is not None:
+                    changes = self.show_changes(target, start_port, end_port)
+                    status += f", {changes} changed since baseline"
+                self.baseline = self.current
+                self.status_label.config(text=status)
+                self.summary_label.config(text=self.summary_text(self.current))
             else:
                 self.log_message("Scan stopped by user.")
                 self.status_label.config(text="Scan stopped")
                 
         except Exception as e:
-            self.log_message(f"Scan error: {str(e)}")
+            self.log_message(f"Scan error: {str(e)}", logging.ERROR, exc_info=True)
             self.status_label.config(text="Scan failed")
         finally:
             self.scan_button.config(state=tk.NORMAL)
             self.stop_button.config(state=tk.DISABLED)
+            self.pause_button.config(state=tk.DISABLED, text="Pause")
             self.scanner.scanning = False
+            self.scanner.pause_gate.resume()
+    
+    def run_plan(self, target, ports, timeout):
+        """Scan a preset's ports with the engine it names, naming services from the plan"""
+        services = self.plan.services
+        found = lambda port, service: self.add_result(
+            port, service if service != "Unknown" else services.get(port, service))
+        from scan_presets import make_engine
+        engine = make_engine(self.plan, self.scanner)
+        if engine is None:
+            return self.scanner.scan_ports(target, ports, timeout, self.update_progress, found)
+        results = engine.scan([target], ports, timeout, self.update_progress,
+                              lambda result: found(result.port, result.service))
+        return [(result.port, result.service) for result in results]
     
     def stop_scan(self):
         self.scanner.scanning = False
         self.log_message("Stopping scan...")
     
+    def toggle_pause(self):
+        gate = self.scanner.pause_gate
+        if gate.paused:
+            gate.resume()
+            self.pause_button.config(text="Pause")
+            self.log_message("Scan resumed.")
+        else:
+            gate.pause()
+            self.pause_button.config(text="Resume")
+            self.status_label.config(text="Scan paused")
+            self.log_message("Scan paused.")
+    
     def clear_results(self):
         self.results_tree.delete(*self.results_tree.get_children())
         self.log_text.config(state=tk.NORMAL)
         self.log_text.delete(1.0, tk.END)
         self.log_text.config(state=tk.DISABLED)
         self.progress['value'] = 0
+        self.summary_label.config(text="")
         self.status_label.config(text="Results cleared")
 
-def main():
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Network port scanner GUI")
+    parser.add_argument("--debug", action="store_true",
+                        help="Log startup and scan events to the terminal")
+    parser.add_argument("--log", metavar="LEVELS",
+                        help="Log levels for the terminal, e.g. 'info' or 'warning,engine=debug'")
+    parser.add_argument("--trace", type=int, metavar="N",
+                        help="Keep the last N probe outcomes and print them when a scan fails")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Report how long each module takes to import at startup, then exit")
+    args = parser.parse_args(argv)
+    
+    if args.startup_profile:
+        from scan_profiler import format_import_times, import_times
+        for line in format_import_times(import_times(GUI_MODULES)):
+            print(line)
+        return 0
+    from scan_log import TraceRing, configure_logging
+    ring = TraceRing(args.trace) if args.trace else None
+    try:
+        logs = configure_logging(args.log or ("debug" if args.debug else "warning"), trace=ring)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    # Loaded before the GUI's scanner asks for it, so this run may use the on-disk index cache
+    cli_catalog()
+    log.debug("Creating tkinter root window")
     root = tk.Tk()
     app = PortScannerGUI(root)
+    if ring is not None:
+        ring.attach(app.scanner)
+    if args.debug:
+        # Bring the window to the front when started from a terminal
+        root.lift()
+        root.attributes('-topmost', True)
+        root.after_idle(root.attributes, '-topmost', False)
     
     def on_closing():
+        log.debug("Application closing")
         if hasattr(app.scanner, 'scanning') and app.scanner.scanning:
             app.scanner.scanning = False
+        panel_log.removeHandler(app.log_handler)
         root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)
+    log.debug("Starting main event loop")
     root.mainloop()
+    log.debug("Application closed")
+    logs.close()
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import sys
+from scan_diff import ScanSnapshot, iter_bits
+
+FORMAT_VERSION = 1
+
+def format_ports(bitmap):
+    """Compact port list of a bitmap: '22,80,8000-8010'"""
+    spans = []
+    for port in iter_bits(bitmap):
+        if spans and spans[-1][1] == port - 1:
+            spans[-1][1] = port
+        else:
+            spans.append([port, port])
+    return ",".join(str(low) if low == high else f"{low}-{high}" for low, high in spans)
+
+def parse_ports(text):
+    bitmap = 0
+    for part in filter(None, text.split(",")):
+        low, _, high = part.partition("-")
+        low, high = int(low), int(high or low)
+        bitmap |= ((1 << (high + 1)) - 1) ^ ((1 << low) - 1)
+    return bitmap
+
+class ProfileStore:
+    """Hosts grouped by identical open-port profile, each profile stored once
+
+    A profile is a host's open-port bitmaps, one per protocol. Hosts built
+    from one image share a profile, so a fleet costs one bitmap per distinct
+    profile plus one reference per host, and finding the hosts that differ
+    from a golden profile is a dict lookup rather than a pass over results.
+    """
+
+    def __init__(self):
+        self.profiles = []
+        self.members = []
+        self.hosts = {}
+        self._ids = {}
+
+    def intern(self, profile):
+        """The id of a profile (a {protocol: bitmap} dict), adding it if new"""
+        key = tuple(sorted((protocol, bitmap) for protocol, bitmap in profile.items() if bitmap))
+        profile_id = self._ids.get(key)
+        if profile_id is None:
+            profile_id = self._ids[key] = len(self.profiles)
+            self.profiles.append(key)
+            self.members.append(set())
+        return profile_id
+
+    def add_host(self, host, profile):
+        """Set a host's profile, moving it out of any earlier one"""
+        profile_id = self.intern(profile)
+        previous = self.hosts.get(host)
+        if previous is not None:
+            self.members[previous].discard(host)
+        self.hosts[host] = profile_id
+        self.members[profile_id].add(host)
+        return profile_id
+
+    @classmethod
+    def from_snapshot(cls, snapshot, hosts=()):
+        """Group a ScanSnapshot; hosts lists scanned hosts with nothing open"""
+        profiles = {host: {} for host in hosts}
+        for (host, protocol), bitmap in snapshot.bitmaps.items():
+            profiles.setdefault(host, {})[protocol] = bitmap
+        store = cls()
+        for host, profile in profiles.items():
+            store.add_host(host, profile)
+        return store
+
+    @classmethod
+    def from_results(cls, results):
+        snapshot = ScanSnapshot()
+        hosts = set()
+        for result in results:
+            hosts.add(result.host)
+            snapshot.add(result)
+        return cls.from_snapshot(snapshot, hosts)
+
+    def profile(self, profile_id):
+        return dict(self.profiles[profile_id])
+
+    def profile_of(self, host):
+        return self.profile(self.hosts[host])
+
+    def groups(self):
+        """(profile id, sorted hosts) for every profile in use, largest group first"""
+        groups = [(profile_id, sorted(hosts)) for profile_id, hosts in enumerate(self.members)
+                  if hosts]
+        groups.sort(key=lambda group: (-len(group[1]), group[0]))
+        return groups
+
+    def golden(self):
+        """The most common profile id, or None if the store is empty"""
+        groups = self.groups()
+        return groups[0][0] if groups else None
+
+    def deviants(self, golden=None):
+        """Hosts whose profile differs from golden (a profile id; default: the most common)"""
+        if golden is None:
+            golden = self.golden()
+        return sorted(host for profile_id, hosts in enumerate(self.members) if profile_id != golden
+                      for host in hosts)
+
+    def to_snapshot(self):
+        snapshot = ScanSnapshot()
+        for host, profile_id in self.hosts.items():
+            for protocol, bitmap in self.profiles[profile_id]:
+                snapshot.bitmaps[(host, protocol)] = bitmap
+        return snapshot
+
+    def describe(self, profile_id):
+        parts = [f"{format_ports(bitmap)}/{protocol}" for protocol, bitmap in self.profiles[profile_id]]
+        return " ".join(parts) or "(nothing open)"
+
+    def save(self, path):
+        """Write the store as JSON, one entry per profile listing its hosts"""
+        data = {"version": FORMAT_VERSION, "profiles": [
+            {"ports": {protocol: format_ports(bitmap) for protocol, bitmap in self.profiles[profile_id]},
+             "hosts": hosts}
+            for profile_id, hosts in self.groups()
+        ]}
+        with open(path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} profile store")
+        store = cls()
+        for entry in data["profiles"]:
+            profile = {protocol: parse_ports(ports) for protocol, ports in entry["ports"].items()}
+            for host in entry["hosts"]:
+                store.add_host(host, profile)
+        return store
+
+def load_store(path):
+    """A ProfileStore from a saved store or from any scan result file"""
+    if path.endswith(".json"):
+        return ProfileStore.load(path)
+    from result_file import iter_results
+    return ProfileStore.from_results(iter_results(path))
+
+def print_groups(store, stream=None, limit=5):
+    for profile_id, hosts in store.groups():
+        shown = ", ".join(hosts[:limit]) + (f", ... (+{len(hosts) - limit})" if len(hosts) > limit else "")
+        print(f"{len(hosts):6d} hosts  {store.describe(profile_id)}  [{shown}]", file=stream or sys.stdout)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Group scanned hosts by identical open-port profile")
+    commands = parser.add_subparsers(dest="command", required=True)
+    group_parser = commands.add_parser("group", help="Print each profile and its hosts")
+    group_parser.add_argument("path", help="Result file, exporter output or saved store (.json)")
+    group_parser.add_argument("--limit", type=int, default=5, help="Hosts shown per profile")
+    deviants_parser = commands.add_parser("deviants", help="Hosts that differ from a golden profile")
+    deviants_parser.add_argument("path")
+    deviants_parser.add_argument("--golden", metavar="HOST",
+                                 help="Host with the golden profile (default: the most common)")
+    save_parser = commands.add_parser("save", help="Convert results into a compact profile store")
+    save_parser.add_argument("path")
+    save_parser.add_argument("destination", help="Output .json file")
+    args = parser.parse_args(argv)
+
+    try:
+        store = load_store(args.path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: cannot load {args.path}: {e}", file=sys.stderr)
+        return 2
+
+    if args.command == "group":
+        print_groups(store, limit=args.limit)
+    elif args.command == "save":
+        store.save(args.destination)
+        print(f"Saved {len(store.hosts)} hosts in {len(store.groups())} profiles", file=sys.stderr)
+    else:
+        if args.golden is not None and args.golden not in store.hosts:
+            print(f"Error: {args.golden} is not in {args.path}", file=sys.stderr)
+            return 2
+        golden = store.hosts[args.golden] if args.golden else store.golden()
+        for host in store.deviants(golden):
+            print(f"{host} {store.describe(store.hosts[host])}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
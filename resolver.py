@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import socket
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, TimeoutError
+from targets import is_hostname, lookup_host, pick_addresses
+
+class Resolver:
+    """Concurrent, caching hostname resolver for scan targets
+
+    getaddrinfo blocks, so lookups run on a bounded thread pool and
+    prefetch() starts a whole hostname list at once. Answers are cached for
+    ttl seconds and failures for negative_ttl (getaddrinfo does not expose
+    record TTLs). Concurrent lookups of one name share a single query.
+    Reverse lookups for reporting run on the same pool and never block a scan.
+    """
+
+    def __init__(self, max_workers=16, ttl=300.0, negative_ttl=30.0,
+                 lookup=lookup_host, reverse_lookup=None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lookup = lookup
+        self._reverse_lookup = reverse_lookup or (lambda address: socket.gethostbyaddr(address)[0])
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resolver")
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._pending = {}
+        self._reverse = {}
+        self.stats = {"lookups": 0, "hits": 0, "negative_hits": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, hostname):
+        """Return a future for hostname's (family, address) list, from cache when fresh"""
+        with self._lock:
+            cached = self._cache.get(hostname)
+            if cached is not None and cached[0] > time.monotonic():
+                self.stats["negative_hits" if not cached[1] else "hits"] += 1
+                future = Future()
+                future.set_result(cached[1])
+                return future
+            future = self._pending.get(hostname)
+            if future is None:
+                self.stats["lookups"] += 1
+                future = self._pool.submit(self._run_lookup, hostname)
+                self._pending[hostname] = future
+            return future
+
+    def _run_lookup(self, hostname):
+        try:
+            infos = self._lookup(hostname)
+        except OSError:
+            infos = []
+        with self._lock:
+            ttl = self.ttl if infos else self.negative_ttl
+            self._cache[hostname] = (time.monotonic() + ttl, infos)
+            self._pending.pop(hostname, None)
+        return infos
+
+    def prefetch(self, specs):
+        """Start resolving every hostname among specs in the background"""
+        for spec in specs:
+            if is_hostname(spec):
+                self._submit(spec.strip())
+
+    def resolve(self, hostname, prefer="ipv4"):
+        """Blocking, cached drop-in for targets.resolve_host"""
+        return pick_addresses(self._submit(hostname).result(), prefer)
+
+    def resolve_many(self, hostnames, prefer="ipv4"):
+        """Resolve hostnames concurrently; returns {hostname: [(family, address)]}"""
+        futures = {hostname: self._submit(hostname) for hostname in hostnames}
+        return {hostname: pick_addresses(future.result(), prefer)
+                for hostname, future in futures.items()}
+
+    def reverse(self, addresses):
+        """Start PTR lookups for addresses in the background"""
+        with self._lock:
+            for address in addresses:
+                if address not in self._reverse:
+                    self._reverse[address] = self._pool.submit(self._run_reverse, address)
+
+    def _run_reverse(self, address):
+        try:
+            return self._reverse_lookup(address)
+        except (OSError, UnicodeError):
+            return None
+
+    def reverse_name(self, address, timeout=0):
+        """The PTR name for address if known within timeout seconds, else None"""
+        future = self._reverse.get(address)
+        if future is None:
+            return None
+        try:
+            return future.result(timeout)
+        except (CancelledError, TimeoutError):
+            return None
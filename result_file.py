@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+from exporters import (EXPORTERS, FLAG_UDP, RECORD, STATUS_CODES, STATUSES, open_input,
+                       open_output, read_results)
+from scan_engine import ProbeResult
+
+# Header: magic, version, record size, record count, host table offset and length.
+# Records start at HEADER_SIZE so every field stays naturally aligned; the
+# newline-separated host table follows the last record.
+FILE_MAGIC = b"PSCANREC"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQQ")
+HEADER_SIZE = 64
+
+# Column name -> (memoryview format, offset within a record in units of that format)
+COLUMNS = {"host": ("I", 0), "port": ("H", 2), "status": ("B", 6), "flags": ("B", 7),
+           "latency_us": ("I", 2)}
+
+class ResultFileWriter:
+    """Appends fixed-width records to a preallocated, memory-mapped result file
+
+    The file grows by doubling, so writing a record is a pack_into() on the
+    map rather than a write() call. The host table and final header are
+    written by close(). Has the ResultExporter interface, so it can be used
+    wherever the CLI streams results.
+    """
+
+    def __init__(self, path, capacity=1 << 16):
+        self.path = path
+        self.count = 0
+        self.broken = False
+        self._hosts = {}
+        self._file = open(path, "w+b")
+        self._map = None
+        self._map_capacity(max(1, capacity))
+
+    def _map_capacity(self, capacity):
+        if self._map is not None:
+            self._map.close()
+        self.capacity = capacity
+        self._file.truncate(HEADER_SIZE + capacity * RECORD.size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def write(self, result):
+        if self.count == self.capacity:
+            self._map_capacity(self.capacity * 2)
+        index = self._hosts.get(result.host)
+        if index is None:
+            index = self._hosts[result.host] = len(self._hosts)
+        flags = FLAG_UDP if result.protocol == "udp" else 0
+        latency_us = min(round(result.latency * 1e6), 0xFFFFFFFF)
+        RECORD.pack_into(self._map, HEADER_SIZE + self.count * RECORD.size, index,
+                         result.port, STATUS_CODES[result.status], flags, latency_us)
+        self.count += 1
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        """Trim the preallocation, append the host table and write the header"""
+        if self._file.closed:
+            return
+        self._map.flush()
+        self._map.close()
+        end = HEADER_SIZE + self.count * RECORD.size
+        table = "\n".join(self._hosts).encode()
+        self._file.truncate(end)
+        self._file.seek(end)
+        self._file.write(table)
+        self._file.seek(0)
+        self._file.write(HEADER.pack(FILE_MAGIC, VERSION, RECORD.size, self.count, end, len(table)))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class ResultFile:
+    """Read-only, zero-copy view of a result file
+
+    Records are exposed through memoryviews over the map: column() returns a
+    strided view of one field across all records without copying, and
+    select() filters on those views. numpy users can call as_array() for a
+    structured array over the same memory.
+    """
+
+    def __init__(self, path):
+        self._views = []
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER_SIZE:
+            self._file.close()
+            raise ValueError(f"{path} is not a scan result file")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, self.count, table_offset, table_length = \
+            HEADER.unpack_from(self._map)
+        if magic != FILE_MAGIC or version != VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} scan result file")
+        table = self._map[table_offset:table_offset + table_length].decode()
+        self.hosts = table.split("\n") if table else []
+        self.records = self._view(memoryview(self._map)[HEADER_SIZE:table_offset])
+
+    def _view(self, view):
+        self._views.append(view)
+        return view
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not -self.count <= index < self.count:
+            raise IndexError("result index out of range")
+        host, port, status, flags, latency_us = RECORD.unpack_from(
+            self.records, (index % self.count) * RECORD.size)
+        return ProbeResult(self.hosts[host], port, STATUSES[status], latency_us / 1e6, "",
+                           "udp" if flags & FLAG_UDP else "tcp")
+
+    def __iter__(self):
+        for host, port, status, flags, latency_us in RECORD.iter_unpack(self.records):
+            yield ProbeResult(self.hosts[host], port, STATUSES[status], latency_us / 1e6, "",
+                              "udp" if flags & FLAG_UDP else "tcp")
+
+    def column(self, name):
+        """A zero-copy memoryview of one field across all records (little-endian hosts)"""
+        if sys.byteorder != "little":
+            raise NotImplementedError("column views need a little-endian host; iterate instead")
+        fmt, offset = COLUMNS[name]
+        stride = RECORD.size // struct.calcsize(fmt)
+        return self._view(self.records.cast(fmt)[offset::stride])
+
+    def select(self, port=None, status=None, host=None):
+        """Yield indices of records matching every given field"""
+        filters = []
+        if port is not None:
+            filters.append((self.column("port"), port))
+        if status is not None:
+            filters.append((self.column("status"), STATUS_CODES[status]))
+        if host is not None:
+            filters.append((self.column("host"), self.hosts.index(host)))
+        if not filters:
+            yield from range(self.count)
+            return
+        (first, wanted), rest = filters[0], filters[1:]
+        for index, value in enumerate(first):
+            if value == wanted and all(column[index] == want for column, want in rest):
+                yield index
+
+    def as_array(self):
+        """The records as a numpy structured array sharing this file's memory"""
+        import numpy
+        dtype = numpy.dtype([("host", "<u4"), ("port", "<u2"), ("status", "u1"),
+                             ("flags", "u1"), ("latency_us", "<u4")])
+        return numpy.frombuffer(self.records, dtype=dtype)
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def is_result_file(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(FILE_MAGIC)) == FILE_MAGIC
+    except OSError:
+        return False
+
+def iter_results(path):
+    """Yield ProbeResults from a result file or from any exporter output"""
+    if is_result_file(path):
+        with ResultFile(path) as results:
+            yield from results
+    else:
+        with open_input(path) as stream:
+            yield from read_results(stream)
+
+def convert(source, destination, format=None):
+    """Convert between result files and exporter formats; returns the number of results"""
+    if format == "records" or (format is None and destination.endswith(".psr")):
+        writer = ResultFileWriter(destination)
+    else:
+        writer = EXPORTERS[format or "jsonl"](open_output(destination), flush_interval=60)
+    with writer:
+        for result in iter_results(source):
+            writer.write(result)
+    return writer.count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert and query scan result files")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert_parser = commands.add_parser("convert", help="Convert between result formats")
+    convert_parser.add_argument("source", help="Result file, exporter output, or - for stdin")
+    convert_parser.add_argument("destination", help="Output path (.psr for a result file, - for stdout)")
+    convert_parser.add_argument("-f", "--format", choices=sorted(EXPORTERS) + ["records"],
+                                help="Output format (default: by extension, else jsonl)")
+    query_parser = commands.add_parser("query", help="Print matching results of a result file")
+    query_parser.add_argument("path")
+    query_parser.add_argument("--port", type=int)
+    query_parser.add_argument("--status", choices=sorted(STATUS_CODES))
+    query_parser.add_argument("--host")
+    query_parser.add_argument("--count", action="store_true", help="Only print the number of matches")
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        count = convert(args.source, args.destination, args.format)
+        print(f"Converted {count} results", file=sys.stderr)
+        return 0
+
+    with ResultFile(args.path) as results:
+        if args.host is not None and args.host not in results.hosts:
+            matches = iter(())
+        else:
+            matches = results.select(args.port, args.status, args.host)
+        if args.count:
+            print(sum(1 for _ in matches))
+        else:
+            for index in matches:
+                result = results[index]
+                print(f"{result.host} {result.port}/{result.protocol} {result.status} "
+                      f"{result.latency * 1000:.3f}ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
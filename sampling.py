@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import math
+import random
+import sys
+from collections import namedtuple
+from statistics import NormalDist
+from port_scanner import PortScanner
+from scan_engine import ScanEngine
+from targets import iter_targets, unique_targets
+
+HostEstimate = namedtuple(
+    "HostEstimate", "host ports probed open_ports estimate low high escalated"
+)
+
+def wilson_interval(successes, trials, z=1.96):
+    """Wilson score interval for a binomial proportion; sound even with no successes"""
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    half = z / denominator * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials))
+    low = 0.0 if successes == 0 else max(0.0, center - half)
+    high = 1.0 if successes == trials else min(1.0, center + half)
+    return low, high
+
+def z_score(confidence):
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+class Stratum:
+    """Ports sampled at one rate; the unprobed rest is extrapolated from the probed ones"""
+
+    def __init__(self, name, ports, sample):
+        self.name = name
+        self.ports = ports
+        self.sample = sample
+        self.open = 0
+
+    def bounds(self, z):
+        """(estimate, low, high) open-port counts for the whole stratum"""
+        unprobed = len(self.ports) - len(self.sample)
+        low, high = wilson_interval(self.open, len(self.sample), z)
+        rate = self.open / len(self.sample) if self.sample else 0.0
+        return (self.open + unprobed * rate, self.open + unprobed * low,
+                self.open + unprobed * high)
+
+class SamplingScanner:
+    """Estimates each host's open-port count from a stratified random sample of its ports
+
+    Ports in the scanner's common-port list form one stratum, probed at
+    common_rate (all of them by default); every other port is sampled at
+    rate, with at least min_sample probes. The estimate is the open ports
+    found plus each stratum's unprobed ports times its sampled open rate,
+    with a Wilson score interval at the given confidence. A host is
+    escalated to a full scan when its sample shows an open port outside the
+    common list, or the upper bound exceeds max_open.
+    """
+
+    def __init__(self, scanner=None, engine=None, rate=0.05, common_rate=1.0, min_sample=64,
+                 confidence=0.95, escalate=True, max_open=None, seed=None):
+        self.scanner = scanner or PortScanner()
+        self.engine = engine
+        self.rate = rate
+        self.common_rate = common_rate
+        self.min_sample = min_sample
+        self.z = z_score(confidence)
+        self.escalate = escalate
+        self.max_open = max_open
+        self._random = random.Random(seed)
+        self.stats = {"probes": 0, "full_ports": 0, "escalated": 0}
+
+    def plan(self, start_port, end_port):
+        """Split the range into strata and draw each stratum's sample"""
+        common = [port for port in sorted(self.scanner.common_ports) if start_port <= port <= end_port]
+        known = set(common)
+        rest = [port for port in range(start_port, end_port + 1) if port not in known]
+        strata = []
+        for name, ports, rate in (("common", common, self.common_rate), ("other", rest, self.rate)):
+            if ports:
+                size = min(len(ports), max(self.min_sample, math.ceil(len(ports) * rate)))
+                strata.append(Stratum(name, ports, sorted(self._random.sample(ports, size))))
+        return strata
+
+    def probe(self, target, ports, timeout):
+        """Probe ports on target and return the open ones"""
+        self.stats["probes"] += len(ports)
+        if self.engine is not None:
+            return sorted(result.port for result in self.engine.scan([target], ports, timeout))
+        found = []
+        for port in ports:
+            if not self.scanner.scanning:
+                break
+            if self.scanner.scan_port(target, port, timeout):
+                found.append(port)
+        return found
+
+    def scan_host(self, target, start_port, end_port, timeout=1.0):
+        """Sample one host and return its HostEstimate"""
+        strata = self.plan(start_port, end_port)
+        self.stats["full_ports"] += end_port - start_port + 1
+        open_ports = []
+        for stratum in strata:
+            found = self.probe(target, stratum.sample, timeout)
+            stratum.open = len(found)
+            open_ports.extend(found)
+        bounds = [stratum.bounds(self.z) for stratum in strata]
+        estimate, low, high = (sum(values) for values in zip(*bounds)) if bounds else (0, 0, 0)
+        probed = sum(len(stratum.sample) for stratum in strata)
+
+        unexpected = any(stratum.open for stratum in strata if stratum.name == "other")
+        escalated = self.escalate and self.scanner.scanning and (
+            unexpected or (self.max_open is not None and high > self.max_open))
+        if escalated:
+            self.stats["escalated"] += 1
+            rest = [port for stratum in strata
+                    for port in sorted(set(stratum.ports) - set(stratum.sample))]
+            open_ports.extend(self.probe(target, rest, timeout))
+            probed += len(rest)
+            estimate = low = high = len(open_ports)
+        return HostEstimate(target, end_port - start_port + 1, probed, sorted(open_ports),
+                            estimate, low, high, escalated)
+
+    def scan(self, targets, start_port, end_port, timeout=1.0, callback=None):
+        """Sample every target; callback receives each HostEstimate as it is ready"""
+        estimates = []
+        for target in targets:
+            if not self.scanner.scanning:
+                break
+            estimate = self.scan_host(target, start_port, end_port, timeout)
+            estimates.append(estimate)
+            if callback:
+                callback(estimate)
+        return estimates
+
+def format_estimate(estimate, confidence=0.95):
+    note = ", escalated to full scan" if estimate.escalated else ""
+    return (f"{estimate.host}: ~{estimate.estimate:.1f} open of {estimate.ports} ports "
+            f"({confidence:.0%} CI {estimate.low:.1f}-{estimate.high:.1f}; "
+            f"probed {estimate.probed}, found {len(estimate.open_ports)}{note})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Estimate open-port counts from a port sample (only scan hosts you own or may test)"
+    )
+    parser.add_argument("targets", nargs="+", metavar="target")
+    parser.add_argument("-p", "--ports", default="1-65535", help="START-END (default: 1-65535)")
+    parser.add_argument("-t", "--timeout", type=float, default=1.0)
+    parser.add_argument("--rate", type=float, default=0.05,
+                        help="Fraction of uncommon ports to probe (default: 0.05)")
+    parser.add_argument("--min-sample", type=int, default=64,
+                        help="Fewest uncommon ports probed per host (default: 64)")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--max-open", type=float,
+                        help="Escalate hosts whose upper bound exceeds this many open ports")
+    parser.add_argument("--no-escalate", action="store_true",
+                        help="Never fall back to a full scan")
+    parser.add_argument("--engine", choices=("serial", "concurrent"), default="concurrent")
+    parser.add_argument("-c", "--concurrency", type=int, default=256)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("-f", "--format", choices=("text", "jsonl"), default="text")
+    args = parser.parse_args(argv)
+
+    try:
+        start, _, end = args.ports.partition("-")
+        start_port, end_port = int(start), int(end or start)
+        targets = [target.address for target in unique_targets(iter_targets(args.targets))]
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    scanner = PortScanner()
+    engine = ScanEngine(scanner, max_in_flight=args.concurrency) if args.engine == "concurrent" else None
+    sampler = SamplingScanner(scanner, engine, rate=args.rate, min_sample=args.min_sample,
+                              confidence=args.confidence, escalate=not args.no_escalate,
+                              max_open=args.max_open, seed=args.seed)
+
+    def report(estimate):
+        if args.format == "jsonl":
+            print(json.dumps(estimate._asdict(), separators=(",", ":")))
+        else:
+            print(format_estimate(estimate, args.confidence))
+        sys.stdout.flush()
+
+    scanner.scanning = True
+    try:
+        sampler.scan(targets, start_port, end_port, args.timeout, report)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        scanner.scanning = False
+    stats = sampler.stats
+    saving = stats["full_ports"] / stats["probes"] if stats["probes"] else 0
+    print(f"Probed {stats['probes']} of {stats['full_ports']} ports ({saving:.1f}x fewer), "
+          f"{stats['escalated']} hosts escalated", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+from port_scanner import PortScanner
+from rate_limit import TokenBucket
+from scan_control import CancelToken
+from scan_engine import ScanEngine
+from service_catalog import cli_catalog
+from targets import iter_targets, unique_targets
+from udp_engine import UdpScanEngine
+
+log = logging.getLogger("port_scanner.api")
+
+QUEUED, RUNNING, DONE, CANCELLED, FAILED = "queued", "running", "done", "cancelled", "failed"
+FINISHED = (DONE, CANCELLED, FAILED)
+
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large"}
+
+MAX_BODY = 1 << 20
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ScanRecord:
+    """One submitted scan: its request, state, progress and results so far"""
+
+    def __init__(self, scan_id, request):
+        self.id = scan_id
+        self.targets = request["targets"]
+        self.start_port, self.end_port = request["ports"]
+        self.timeout = request["timeout"]
+        self.protocol = request["protocol"]
+        self.all = request["all"]
+        self.prefer = request["prefer"]
+        self.state = QUEUED
+        self.progress = 0.0
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.results = []
+        self.open_count = 0
+        self.cancel = CancelToken()
+        self._waiters = []
+
+    def summary(self):
+        return {"id": self.id, "state": self.state, "progress": round(self.progress, 1),
+                "targets": self.targets, "ports": f"{self.start_port}-{self.end_port}",
+                "protocol": self.protocol, "results": len(self.results), "open": self.open_count,
+                "error": self.error, "created": self.created, "finished": self.finished}
+
+    def add(self, result):
+        self.results.append(result)
+        if result.status == "open":
+            self.open_count += 1
+        self.wake()
+
+    def wake(self):
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def changed(self):
+        """Wait until a result arrives or the state changes"""
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        await waiter
+
+def parse_request(body):
+    """Validate a POST /scans body into a scan request dict"""
+    try:
+        spec = json.loads(body or b"{}")
+    except ValueError:
+        raise ApiError(400, "Body must be JSON")
+    if not isinstance(spec, dict):
+        raise ApiError(400, "Body must be a JSON object")
+    targets = spec.get("targets")
+    if isinstance(targets, str):
+        targets = [targets]
+    if not targets or not all(isinstance(target, str) for target in targets):
+        raise ApiError(400, "targets must be a non-empty list of strings")
+    try:
+        start, _, end = str(spec.get("ports", "1-1000")).partition("-")
+        start_port, end_port = int(start), int(end or start)
+        timeout = float(spec.get("timeout", 1.0))
+    except ValueError:
+        raise ApiError(400, "ports must be START-END and timeout a number")
+    if start_port < 1 or end_port > 65535 or start_port > end_port:
+        raise ApiError(400, "Invalid port range (1-65535)")
+    if timeout <= 0:
+        raise ApiError(400, "timeout must be positive")
+    protocol = spec.get("protocol", "tcp")
+    if protocol not in ("tcp", "udp"):
+        raise ApiError(400, "protocol must be tcp or udp")
+    prefer = spec.get("prefer", "ipv4")
+    if prefer not in ("ipv4", "ipv6", "both"):
+        raise ApiError(400, "prefer must be ipv4, ipv6 or both")
+    return {"targets": targets, "ports": (start_port, end_port), "timeout": timeout,
+            "protocol": protocol, "all": bool(spec.get("all", False)), "prefer": prefer}
+
+class ScanService:
+    """Queues submitted scans and runs them on one shared engine and rate budget
+
+    max_concurrent scans run at a time, each on an executor thread since the
+    engines are selector loops of their own; everything else (the queue,
+    records and HTTP handling) lives on the asyncio loop. Finished scans are
+    kept for finished_ttl seconds, and at most max_finished of them, so a
+    long-running daemon does not hold every result it ever produced.
+    """
+
+    def __init__(self, max_concurrent=2, max_in_flight=256, rate=None, scanner=None,
+                 max_finished=100, finished_ttl=3600.0):
+        self.scanner = scanner or PortScanner()
+        self.scanner.scanning = True
+        self.rate_limiter = TokenBucket(rate) if rate else None
+        window = max(1, max_in_flight // max_concurrent)
+        self.engine = ScanEngine(self.scanner, max_in_flight=window, rate_limiter=self.rate_limiter)
+        self.udp_engine = UdpScanEngine(self.scanner, max_in_flight=window,
+                                        rate_limiter=self.rate_limiter or TokenBucket(200))
+        self.max_concurrent = max_concurrent
+        self.max_finished = max_finished
+        self.finished_ttl = finished_ttl
+        self.scans = {}
+        self._executor = ThreadPoolExecutor(max_concurrent, thread_name_prefix="api-scan")
+        self._ids = itertools.count(1)
+        self._queue = None
+        self._workers = []
+
+    def start(self):
+        """Start the worker tasks; call from the running loop"""
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrent)]
+
+    async def stop(self):
+        for record in self.scans.values():
+            record.cancel.set()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        # Cancel tokens wake running scans at once, closing their sockets
+        await asyncio.to_thread(self._executor.shutdown)
+
+    def submit(self, request):
+        self._evict()
+        record = ScanRecord(str(next(self._ids)), request)
+        self.scans[record.id] = record
+        self._queue.put_nowait(record)
+        return record
+
+    def cancel(self, record):
+        if record.state in FINISHED:
+            raise ApiError(409, f"Scan already {record.state}")
+        record.cancel.set()
+        if record.state == QUEUED:
+            self._finish(record, CANCELLED)
+
+    def remove(self, record):
+        """Forget a finished scan and its results"""
+        if record.state not in FINISHED:
+            raise ApiError(409, f"Scan is {record.state}")
+        self.scans.pop(record.id, None)
+
+    def _finish(self, record, state, error=None):
+        record.state = state
+        record.error = error
+        record.finished = time.time()
+        record.wake()
+        self._evict()
+
+    def _evict(self):
+        """Drop finished scans older than finished_ttl, and the oldest beyond max_finished"""
+        finished = sorted((record for record in self.scans.values() if record.state in FINISHED),
+                          key=lambda record: record.finished)
+        expired = time.time() - self.finished_ttl
+        excess = len(finished) - self.max_finished
+        for index, record in enumerate(finished):
+            if index < excess or record.finished < expired:
+                # Streams already following the record keep their reference
+                del self.scans[record.id]
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            record = await self._queue.get()
+            if record.state != QUEUED:
+                continue
+            record.state = RUNNING
+            record.wake()
+            try:
+                await loop.run_in_executor(self._executor, self._run, record, loop)
+            except (OSError, ValueError) as e:
+                self._finish(record, FAILED, str(e))
+            except Exception as e:
+                # An unexpected failure fails this scan, not the worker and its slot
+                log.exception("Scan %s failed", record.id)
+                self._finish(record, FAILED, str(e))
+            else:
+                self._finish(record, CANCELLED if record.cancel.is_set() else DONE)
+
+    def _run(self, record, loop):
+        """Executor side: resolve targets and scan, handing results back to the loop"""
+        targets = list(unique_targets(iter_targets(record.targets, record.prefer)))
+        engine = self.udp_engine if record.protocol == "udp" else self.engine
+
+        def on_progress(value):
+            record.progress = value
+
+        engine.scan([target.address for target in targets],
+                    range(record.start_port, record.end_port + 1), record.timeout,
+                    progress_callback=on_progress,
+                    result_callback=lambda result: loop.call_soon_threadsafe(record.add, result),
+                    open_only=not record.all, collect=False, cancel=record.cancel)
+
+class HttpConnection:
+    """Just enough HTTP/1.1 for the API: one request per connection"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def read_request(self):
+        line = await self.reader.readline()
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise ApiError(400, "Malformed request line")
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise ApiError(400, "Invalid Content-Length")
+        if length > MAX_BODY:
+            raise ApiError(413, "Request body too large")
+        body = await self.reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+
+    async def send_json(self, status, payload):
+        body = (json.dumps(payload) + "\n").encode()
+        self.writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await self.writer.drain()
+
+    async def start_chunked(self, content_type):
+        self.writer.write(
+            f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\nCache-Control: no-cache\r\n"
+            f"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n".encode()
+        )
+        await self.writer.drain()
+
+    async def send_chunk(self, data):
+        if data:
+            self.writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            await self.writer.drain()
+
+    async def end_chunked(self):
+        self.writer.write(b"0\r\n\r\n")
+        await self.writer.drain()
+
+class ScanApi:
+    """Routes HTTP requests to a ScanService
+
+    POST /scans                submit {"targets", "ports", "timeout", "protocol", "all", "prefer"}
+    GET /scans                 list scans
+    GET /scans/ID              status and progress
+    GET /scans/ID/results      chunked JSONL, or SSE with ?format=sse or Accept: text/event-stream;
+                               streams until the scan finishes
+    DELETE /scans/ID           cancel a queued or running scan; forget a finished one
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    async def handle(self, reader, writer):
+        http = HttpConnection(reader, writer)
+        try:
+            try:
+                method, target, headers, body = await http.read_request()
+                await self.route(http, method, target, headers, body)
+            except ApiError as e:
+                await http.send_json(e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, http, method, target, headers, body):
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        if not parts or parts[0] != "scans" or len(parts) > 3:
+            raise ApiError(404, "Not found")
+        if len(parts) == 1:
+            if method == "POST":
+                record = self.service.submit(parse_request(body))
+                return await http.send_json(202, record.summary())
+            if method == "GET":
+                return await http.send_json(200, [record.summary()
+                                                  for record in self.service.scans.values()])
+            raise ApiError(405, "Use GET or POST")
+
+        record = self.service.scans.get(parts[1])
+        if record is None:
+            raise ApiError(404, f"No scan {parts[1]}")
+        if len(parts) == 3:
+            if parts[2] != "results":
+                raise ApiError(404, "Not found")
+            if method != "GET":
+                raise ApiError(405, "Use GET")
+            query = parse_qs(url.query)
+            sse = query.get("format") == ["sse"] or "text/event-stream" in headers.get("accept", "")
+            return await self.stream(http, record, sse)
+        if method == "GET":
+            return await http.send_json(200, record.summary())
+        if method == "DELETE":
+            if record.state in FINISHED:
+                self.service.remove(record)
+            else:
+                self.service.cancel(record)
+            return await http.send_json(200, record.summary())
+        raise ApiError(405, "Use GET or DELETE")
+
+    async def stream(self, http, record, sse):
+        """Send results so far, then follow the scan until it finishes"""
+        await http.start_chunked("text/event-stream" if sse else "application/x-ndjson")
+        sent = 0
+        while True:
+            finished = record.state in FINISHED
+            batch = record.results[sent:]
+            sent += len(batch)
+            lines = [json.dumps(result._asdict(), separators=(",", ":")) for result in batch]
+            if sse:
+                await http.send_chunk("".join(f"event: result\ndata: {line}\n\n"
+                                              for line in lines).encode())
+            else:
+                await http.send_chunk("".join(f"{line}\n" for line in lines).encode())
+            if finished:
+                break
+            await record.changed()
+        if sse:
+            await http.send_chunk(f"event: end\ndata: {json.dumps(record.summary())}\n\n".encode())
+        await http.end_chunked()
+
+class ScanApiServer:
+    """Runs the API on its own event loop thread, in the style of TestServer"""
+
+    def __init__(self, service=None, host="127.0.0.1", port=8765):
+        self.service = service or ScanService()
+        self.host = host
+        self.port = port
+        self.loop = None
+        self._server = None
+        self._task = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    async def _serve(self):
+        self.service.start()
+        self._server = await asyncio.start_server(ScanApi(self.service).handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.service.stop()
+
+    def serve_forever(self):
+        asyncio.run(self._serve())
+
+    def start(self):
+        """Serve from a background thread; returns the bound port (useful with port=0)"""
+        def run():
+            self.loop = asyncio.new_event_loop()
+            self._task = self.loop.create_task(self._serve())
+            try:
+                self.loop.run_until_complete(self._task)
+            finally:
+                self.loop.close()
+        self._thread = threading.Thread(target=run, daemon=True, name="scan-api")
+        self._thread.start()
+        self._ready.wait(5)
+        return self.port
+
+    def stop(self):
+        if self._task is not None and self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self._task.cancel)
+            self._thread.join(5)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON API for submitting scans")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Address to listen on (default: 127.0.0.1; the API has no auth)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--max-concurrent", type=int, default=2, help="Scans running at once")
+    parser.add_argument("-c", "--concurrency", type=int, default=256,
+                        help="Probes in flight shared by all scans")
+    parser.add_argument("--rate", type=float, help="Probes per second shared by all scans")
+    parser.add_argument("--keep-finished", type=int, default=100, metavar="N",
+                        help="Finished scans kept for GET (default: 100)")
+    parser.add_argument("--finished-ttl", type=float, default=3600.0, metavar="SECONDS",
+                        help="Seconds a finished scan is kept (default: 3600)")
+    parser.add_argument("--services", metavar="FILE",
+                        help="Service catalogue to name ports from (default: services.json)")
+    parser.add_argument("--reload-interval", type=float, default=5.0, metavar="SECONDS",
+                        help="Seconds between checks for an edited catalogue, 0 to never "
+                             "reload (default: 5)")
+    args = parser.parse_args(argv)
+
+    try:
+        catalog = cli_catalog(args.services)
+    except (OSError, ValueError) as e:
+        print(f"Error: cannot load service catalogue: {e}", file=sys.stderr)
+        return 2
+    if args.reload_interval > 0:
+        catalog.watch(args.reload_interval)
+    service = ScanService(args.max_concurrent, args.concurrency, args.rate, PortScanner(catalog),
+                          args.keep_finished, args.finished_ttl)
+    server = ScanApiServer(service, args.host, args.port)
+    print(f"Scan API listening on http://{args.host}:{args.port}/scans", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
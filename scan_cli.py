@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+
+import argparse
+import logging
+import os
+import sys
+import time
+from exporters import COMPRESSORS, EXPORTERS, open_output
+from fd_budget import raise_soft_limit
+from port_scanner import PortScanner
+from rate_limit import TokenBucket
+from resolver import Resolver
+from scan_diff import ScanSnapshot, diff_snapshots, format_event, port_mask
+from scan_engine import OPEN, ProbeResult, RetryPolicy, ScanEngine
+from socket_tuning import SourcePool
+from targets import iter_targets, merge_dual_stack, unique_targets
+
+log = logging.getLogger("port_scanner.cli")
+
+def parse_port_range(spec):
+    """Parse 'START-END' or a single port into a (start, end) tuple"""
+    try:
+        if "-" in spec:
+            start, end = (int(part) for part in spec.split("-", 1))
+        else:
+            start = end = int(spec)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid port range: {spec}")
+    if start < 1 or end > 65535 or start > end:
+        raise argparse.ArgumentTypeError("Invalid port range (1-65535)")
+    return start, end
+
+# Modules only some options need are imported when those options are used,
+# keeping startup (see --startup-profile) to what a plain scan loads
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Headless port scan (only scan hosts you own or may test)"
+    )
+    parser.add_argument("targets", nargs="+", metavar="target",
+                        help="IP address, prefix (10.0.0.0/28, 2001:db8::/120), "
+                             "@file hitlist or hostname")
+    parser.add_argument("--prefer", choices=("ipv4", "ipv6", "both"), default="ipv4",
+                        help="Address family for hostnames; both scans dual-stack hosts twice")
+    parser.add_argument("--resolvers", type=int, default=16,
+                        help="Hostnames resolved in parallel (default: 16)")
+    parser.add_argument("--reverse-dns", action="store_true",
+                        help="Look up PTR names of scanned addresses in the background")
+    parser.add_argument("-p", "--ports", type=parse_port_range, default=(1, 1000),
+                        help="Port range START-END (default: 1-1000, or the preset's ports)")
+    parser.add_argument("--preset", metavar="NAME",
+                        help="Scan with a named preset (quick, full, web, db, stealthy-slow, ...); "
+                             "options given explicitly override it")
+    parser.add_argument("--presets", action="append", metavar="FILE",
+                        help="Extra presets file; its presets replace built-in ones of the same name")
+    parser.add_argument("--services", metavar="FILE",
+                        help="Service catalogue to name ports from (default: services.json)")
+    parser.add_argument("-t", "--timeout", type=float, default=1.0,
+                        help="Timeout per port in seconds (default: 1)")
+    parser.add_argument("-u", "--udp", action="store_true",
+                        help="UDP scan with protocol payloads (DNS, NTP, SNMP, ...)")
+    parser.add_argument("--rate", type=float,
+                        help="Probes per second (default: 200 for UDP, unlimited for TCP)")
+    parser.add_argument("--engine", choices=("serial", "concurrent"), default="serial",
+                        help="serial probes one port at a time; concurrent keeps many in flight")
+    parser.add_argument("-c", "--concurrency", type=int, default=256,
+                        help="Probes in flight for the concurrent engine (default: 256)")
+    parser.add_argument("--max-per-host", type=int,
+                        help="Probes in flight to any one target (concurrent and UDP engines)")
+    parser.add_argument("--retries", type=int, default=0,
+                        help="Reprobe filtered/timed-out ports this many times (concurrent engine)")
+    parser.add_argument("--retry-backoff", type=float, default=0.25,
+                        help="Seconds before the first retry, doubling per attempt (default: 0.25)")
+    parser.add_argument("--raise-fd-limit", action="store_true",
+                        help="Raise the soft open-file limit to the hard limit before scanning")
+    parser.add_argument("--linger-reset", action="store_true",
+                        help="Close open ports with a RST so no TIME_WAIT entries pile up")
+    parser.add_argument("--source-addresses", type=lambda v: v.split(","), metavar="IP[,IP...]",
+                        help="Spread probes over these local source addresses")
+    parser.add_argument("--source-ports", type=parse_port_range, metavar="START-END",
+                        help="Bind probes to source ports from this range")
+    parser.add_argument("-o", "--output", metavar="FILE",
+                        help="Stream results to FILE ('-' for stdout); .gz/.bz2/.xz compress")
+    parser.add_argument("-f", "--format", choices=sorted(EXPORTERS) + ["records"],
+                        help="Output format (default: records for .psr files, else jsonl); "
+                             "records is a memory-mapped fixed-width file")
+    parser.add_argument("--compress", choices=sorted(COMPRESSORS),
+                        help="Compress the output regardless of its extension")
+    parser.add_argument("--flush-interval", type=float, default=1.0,
+                        help="Seconds between output flushes; 0 flushes every result")
+    parser.add_argument("--all", action="store_true",
+                        help="Also output closed and filtered ports (concurrent and UDP engines)")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="Report ports opened, closed or changed since this earlier result file")
+    parser.add_argument("--group-by-profile", action="store_true",
+                        help="Print hosts grouped by identical open-port set instead of each port")
+    parser.add_argument("--summary", action="store_true",
+                        help="Print top ports, most exposed subnets and latency percentiles at the end")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="Profile the scan and write the result to FILE")
+    parser.add_argument("--profiler", choices=("cprofile", "sample"), default="cprofile",
+                        help="cprofile writes pstats, sample writes flamegraph-collapsed stacks")
+    parser.add_argument("--log", default="warning", metavar="LEVELS",
+                        help="Log levels, overall and per subsystem: 'info' or "
+                             "'warning,engine=debug,udp=info' (default: warning)")
+    parser.add_argument("--log-json", action="store_true",
+                        help="Log one JSON object per line, with per-probe fields as keys")
+    parser.add_argument("--trace", type=int, metavar="N",
+                        help="Keep the last N probe outcomes and print them if the scan fails")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Report how long each module takes to import at startup, then exit "
+                             "(no targets needed)")
+    return parser
+
+def run_scan(scanner, targets, ports, timeout, engine=None, on_result=None,
+             open_only=True, collect=True):
+    """Scan every target and return the open ProbeResults (none if collect is False)"""
+    on_result = on_result or (lambda result: None)
+    scanner.scanning = True
+    try:
+        if engine is not None:
+            return engine.scan([target.address for target in targets], ports, timeout,
+                               result_callback=on_result, open_only=open_only,
+                               collect=collect)
+        
+        results = []
+        for target in targets:
+            if not scanner.scanning:
+                break
+            def found(port, service, host=target.address):
+                result = ProbeResult(host, port, OPEN, 0.0, service)
+                if collect:
+                    results.append(result)
+                on_result(result)
+            scanner.scan_ports(target.address, ports, timeout, lambda progress: None, found)
+        return results
+    finally:
+        scanner.scanning = False
+
+def preset_defaults(plan):
+    """Parser defaults taken from a ScanPlan; ports None means the plan's own port set"""
+    return {"ports": None, "timeout": plan.timeout, "udp": plan.protocol == "udp",
+            "engine": plan.engine, "concurrency": plan.concurrency, "rate": plan.rate,
+            "retries": plan.retries, "retry_backoff": plan.retry_backoff,
+            "max_per_host": plan.max_per_host}
+
+def main(argv=None):
+    # Checked before parsing, since it needs no targets
+    if "--startup-profile" in (sys.argv[1:] if argv is None else argv):
+        from scan_profiler import format_import_times, import_times
+        for line in format_import_times(import_times(["scan_cli"])):
+            print(line)
+        return 0
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    from service_catalog import cli_catalog
+    try:
+        catalog = cli_catalog(args.services)
+    except (OSError, ValueError) as e:
+        print(f"Error: cannot load service catalogue: {e}", file=sys.stderr)
+        return 2
+    scanner = PortScanner(catalog)
+
+    plan = None
+    if args.preset:
+        from scan_presets import DEFAULT_PATH, PresetLibrary
+        try:
+            library = PresetLibrary.load([DEFAULT_PATH] + (args.presets or []), scanner.catalog.index)
+            plan = library.plan(args.preset)
+        except KeyError:
+            print(f"Error: unknown preset {args.preset!r} "
+                  f"(available: {', '.join(library.names())})", file=sys.stderr)
+            return 2
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Error: cannot load presets: {e}", file=sys.stderr)
+            return 2
+        # Parse again so options given on the command line win over the preset
+        parser.set_defaults(**preset_defaults(plan))
+        args = parser.parse_args(argv)
+
+    from scan_log import TraceRing, configure_logging
+    ring = TraceRing(args.trace).attach(scanner) if args.trace else None
+    try:
+        logs = configure_logging(args.log, structured=args.log_json, trace=ring)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        with Resolver(max_workers=args.resolvers) as resolver:
+            return _main(args, scanner, resolver, plan)
+    finally:
+        logs.close()
+
+def _main(args, scanner, resolver, plan=None):
+    resolver.prefetch(args.targets)
+    try:
+        targets = list(unique_targets(iter_targets(args.targets, args.prefer, resolver.resolve)))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    names = {target.address: target.name for target in targets}
+    if args.reverse_dns:
+        resolver.reverse(names)
+
+    if args.raise_fd_limit:
+        raise_soft_limit()
+    source_pool = None
+    if args.source_addresses or args.source_ports:
+        ports = range(args.source_ports[0], args.source_ports[1] + 1) if args.source_ports else None
+        source_pool = SourcePool(args.source_addresses or ["0.0.0.0"], ports)
+    scanner.linger_reset = args.linger_reset
+    scanner.source_pool = source_pool
+    
+    engine = None
+    if args.udp:
+        from udp_engine import UdpScanEngine
+        engine = UdpScanEngine(scanner, rate=args.rate or 200, max_in_flight=args.concurrency,
+                               max_per_host=args.max_per_host)
+    elif args.engine == "concurrent":
+        retry_policy = None
+        if args.retries > 0:
+            retry_policy = RetryPolicy(max_attempts=args.retries + 1, backoff=args.retry_backoff)
+        engine = ScanEngine(scanner, max_in_flight=args.concurrency,
+                            linger_reset=args.linger_reset, source_pool=source_pool,
+                            retry_policy=retry_policy, max_per_host=args.max_per_host,
+                            rate_limiter=TokenBucket(args.rate) if args.rate else None)
+    
+    services = plan.services if plan is not None else None
+    if args.ports is None:
+        ports, mask = plan.ports, plan.mask
+    else:
+        start_port, end_port = args.ports
+        ports, mask = range(start_port, end_port + 1), port_mask(start_port, end_port)
+    protocol = "udp" if args.udp else "tcp"
+    
+    exporter = None
+    if args.format == "records" or (args.output or "").endswith(".psr"):
+        if not args.output or args.output == "-":
+            print("Error: the records format needs an --output file", file=sys.stderr)
+            return 2
+        from result_file import ResultFileWriter
+        exporter = ResultFileWriter(args.output)
+    elif args.output or args.format:
+        def stop_on_broken_pipe():
+            # The reader went away (e.g. | head); stop scanning and silence stdout
+            scanner.scanning = False
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        exporter = EXPORTERS[args.format or "jsonl"](
+            open_output(args.output or "-", args.compress), args.flush_interval,
+            on_broken=stop_on_broken_pipe
+        )
+    exporting_to_stdout = exporter is not None and (args.output or "-") == "-"
+    open_count = 0
+    
+    baseline = current = None
+    if args.baseline:
+        try:
+            baseline = ScanSnapshot.from_path(args.baseline).restrict(
+                names, protocol=protocol, mask=mask)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot read baseline: {e}", file=sys.stderr)
+            return 2
+        current = ScanSnapshot()
+    elif args.group_by_profile:
+        current = ScanSnapshot()
+    columns = None
+    if args.summary:
+        from analytics import ResultColumns
+        columns = ResultColumns()
+    
+    def print_result(result):
+        nonlocal open_count
+        if services is not None and result.service == "Unknown":
+            result = result._replace(service=services.get(result.port, "Unknown"))
+        if result.status == OPEN:
+            open_count += 1
+        if current is not None:
+            current.add(result)
+        if columns is not None:
+            columns.append(result)
+        if exporter is not None:
+            exporter.write(result)
+        if exporting_to_stdout or args.group_by_profile or result.status != OPEN:
+            return
+        host = names.get(result.host, result.host)
+        if args.reverse_dns and host == result.host:
+            host = resolver.reverse_name(result.host) or host
+        if host != result.host:
+            host = f"{host} ({result.host})"
+        print(f"{host} {result.port}/{protocol} open {result.service}")
+        sys.stdout.flush()
+    
+    scan = lambda: run_scan(scanner, targets, ports, args.timeout,
+                            engine, print_result, open_only=not args.all,
+                            collect=exporter is None)
+
+    start_time = time.time()
+    try:
+        if args.profile:
+            from scan_profiler import PhaseTimer, profile_call
+            timer = PhaseTimer().attach(scanner)
+            try:
+                open_ports = profile_call(scan, args.profile, mode=args.profiler)
+            finally:
+                timer.detach()
+            print(f"Profile written to {args.profile}", file=sys.stderr)
+            for phase, (total, samples) in sorted(timer.summary().items()):
+                print(f"  {phase:10s} {total:.4f}s over {samples} probes", file=sys.stderr)
+        else:
+            open_ports = scan()
+    except OSError as e:
+        log.error("Scan failed: %s", e)
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if exporter is not None:
+            exporter.close()
+
+    elapsed = time.time() - start_time
+    if baseline is not None:
+        changes = sys.stderr if exporting_to_stdout else sys.stdout
+        for event in diff_snapshots(baseline, current):
+            print(format_event(event), file=changes)
+    if args.group_by_profile:
+        from profile_store import ProfileStore, print_groups
+        print_groups(ProfileStore.from_snapshot(current, names),
+                     sys.stderr if exporting_to_stdout else sys.stdout)
+    if columns is not None:
+        from analytics import format_summary
+        for line in format_summary(columns.summary()):
+            print(line, file=sys.stderr if exporting_to_stdout else sys.stdout)
+    unique = len(merge_dual_stack(open_ports, targets)) if exporter is None else open_count
+    print(f"Scanned {len(ports)} ports on {len(targets)} addresses "
+          f"in {elapsed:.2f}s, {unique} open", file=sys.stderr)
+    if engine is not None and engine.stats.get("retries"):
+        print(f"{engine.stats['retries']} retries, {engine.stats['flipped']} results "
+              f"changed on retry", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
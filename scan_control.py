@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+import os
+import selectors
+import threading
+import time
+import weakref
+
+# Longest wait between checks of cancel events that have no fileno()
+EVENT_POLL = 0.05
+
+def _close_pipe(fds):
+    for fd in fds:
+        os.close(fd)
+
+class _Signal:
+    """A pipe whose read end is readable exactly while the signal is raised
+
+    Level-triggered, so any number of threads can select() on it without
+    stealing each other's wakeups. The pipe is created on first fileno().
+    """
+
+    def __init__(self, raised=False):
+        self.raised = raised
+        self._fds = None
+        self._lock = threading.Lock()
+
+    def fileno(self):
+        with self._lock:
+            if self._fds is None:
+                self._fds = os.pipe()
+                for fd in self._fds:
+                    os.set_blocking(fd, False)
+                weakref.finalize(self, _close_pipe, self._fds)
+                if self.raised:
+                    os.write(self._fds[1], b"\0")
+            return self._fds[0]
+
+    def set(self, raised):
+        with self._lock:
+            if raised == self.raised:
+                return
+            self.raised = raised
+            if self._fds is None:
+                return
+            if raised:
+                os.write(self._fds[1], b"\0")
+            else:
+                os.read(self._fds[0], 1)
+
+class CancelToken:
+    """A one-shot stop signal with the threading.Event interface plus fileno()
+
+    Engines register the token in their selector next to the probe sockets,
+    so set() wakes a waiting scan at once instead of after a poll interval.
+    Anything with is_set() can be passed where a token is expected.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._signal = _Signal()
+
+    def set(self):
+        self._event.set()
+        self._signal.set(True)
+
+    def is_set(self):
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
+
+    def fileno(self):
+        return self._signal.fileno()
+
+class PauseGate:
+    """Holds scans between probes while paused
+
+    fileno() is readable while the gate is paused, so running engines wake
+    up as soon as pause() is called; wait() blocks a paused engine until
+    resume() or one of its cancel tokens is set.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._paused = _Signal()
+        self._resumed = _Signal(raised=True)
+
+    @property
+    def paused(self):
+        return self._paused.raised
+
+    def pause(self):
+        with self._lock:
+            self._resumed.set(False)
+            self._paused.set(True)
+
+    def resume(self):
+        with self._lock:
+            self._paused.set(False)
+            self._resumed.set(True)
+
+    def fileno(self):
+        return self._paused.fileno()
+
+    def wait(self, *cancels, timeout=None):
+        """Block until resumed, a cancel is set or timeout passes; returns True if resumed"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        polled = any(not hasattr(cancel, "fileno") for cancel in cancels)
+        with selectors.DefaultSelector() as selector:
+            selector.register(self._resumed, selectors.EVENT_READ)
+            for cancel in set(cancels):
+                if hasattr(cancel, "fileno"):
+                    selector.register(cancel, selectors.EVENT_READ)
+            while self.paused and not any(cancel.is_set() for cancel in cancels):
+                wait = None if deadline is None else deadline - time.monotonic()
+                if wait is not None and wait <= 0:
+                    break
+                if polled:
+                    wait = EVENT_POLL if wait is None else min(wait, EVENT_POLL)
+                selector.select(wait)
+        return not self.paused
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import sys
+from collections import namedtuple
+
+ADDED, REMOVED, CHANGED = "added", "removed", "changed"
+
+DiffEvent = namedtuple("DiffEvent", "kind host port protocol old_service new_service")
+
+def iter_bits(bitmap):
+    """Yield the positions of the set bits of an int, lowest first"""
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+def port_mask(start_port, end_port):
+    return ((1 << (end_port + 1)) - 1) ^ ((1 << start_port) - 1)
+
+class ScanSnapshot:
+    """The open ports of one scan run, one int bitmap per (host, protocol)
+
+    Bit n is set when port n was open, so comparing two runs of a host is a
+    single XOR however many ports were scanned. Services are kept only for
+    open ports that reported one.
+    """
+
+    def __init__(self):
+        self.bitmaps = {}
+        self.services = {}
+
+    def add(self, result):
+        if result.status == "open":
+            self.add_open(result.host, result.port, result.service, result.protocol)
+
+    def add_open(self, host, port, service=None, protocol="tcp"):
+        key = (host, protocol)
+        self.bitmaps[key] = self.bitmaps.get(key, 0) | (1 << port)
+        if service:
+            self.services[(host, protocol, port)] = service
+
+    @classmethod
+    def from_results(cls, results):
+        snapshot = cls()
+        for result in results:
+            snapshot.add(result)
+        return snapshot
+
+    @classmethod
+    def from_path(cls, path):
+        """Load a .psr result file or any exporter output"""
+        from result_file import iter_results
+        return cls.from_results(iter_results(path))
+
+    def restrict(self, hosts=None, start_port=1, end_port=65535, protocol=None, mask=None):
+        """A copy limited to the given hosts, port range (or port bitmap mask) and protocol"""
+        if mask is None:
+            mask = port_mask(start_port, end_port)
+        hosts = set(hosts) if hosts is not None else None
+        snapshot = ScanSnapshot()
+        for (host, proto), bitmap in self.bitmaps.items():
+            if (hosts is None or host in hosts) and (protocol is None or proto == protocol):
+                if bitmap & mask:
+                    snapshot.bitmaps[(host, proto)] = bitmap & mask
+        snapshot.services = {(host, proto, port): service
+                             for (host, proto, port), service in self.services.items()
+                             if snapshot.bitmaps.get((host, proto), 0) >> port & 1}
+        return snapshot
+
+    def open_ports(self, host, protocol="tcp"):
+        return list(iter_bits(self.bitmaps.get((host, protocol), 0)))
+
+    def __len__(self):
+        return sum(bitmap.bit_count() for bitmap in self.bitmaps.values())
+
+def diff_snapshots(baseline, current):
+    """Yield DiffEvents for ports opened, closed or serving something else, host by host"""
+    for key in sorted(baseline.bitmaps.keys() | current.bitmaps.keys()):
+        host, protocol = key
+        old = baseline.bitmaps.get(key, 0)
+        new = current.bitmaps.get(key, 0)
+        events = []
+        for port in iter_bits(old ^ new):
+            if new >> port & 1:
+                events.append(DiffEvent(ADDED, host, port, protocol, None,
+                                        current.services.get((host, protocol, port))))
+            else:
+                events.append(DiffEvent(REMOVED, host, port, protocol,
+                                        baseline.services.get((host, protocol, port)), None))
+        if baseline.services and current.services:
+            for port in iter_bits(old & new):
+                old_service = baseline.services.get((host, protocol, port))
+                new_service = current.services.get((host, protocol, port))
+                if old_service and new_service and old_service != new_service:
+                    events.append(DiffEvent(CHANGED, host, port, protocol, old_service, new_service))
+        events.sort(key=lambda event: event.port)
+        yield from events
+
+def format_event(event):
+    """One line per event: '+' opened, '-' closed, '~' changed service"""
+    where = f"{event.host} {event.port}/{event.protocol}"
+    if event.kind == ADDED:
+        return f"+ {where} {event.new_service or ''}".rstrip()
+    if event.kind == REMOVED:
+        return f"- {where} {event.old_service or ''}".rstrip()
+    return f"~ {where} {event.old_service} -> {event.new_service}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show what changed between two scan runs")
+    parser.add_argument("baseline", help="Earlier results (.psr file or exporter output)")
+    parser.add_argument("current", help="Later results (.psr file or exporter output)")
+    parser.add_argument("-f", "--format", choices=("text", "jsonl"), default="text")
+    args = parser.parse_args(argv)
+
+    baseline = ScanSnapshot.from_path(args.baseline)
+    current = ScanSnapshot.from_path(args.current)
+    changes = 0
+    for event in diff_snapshots(baseline, current):
+        changes += 1
+        if args.format == "jsonl":
+            print(json.dumps(event._asdict(), separators=(",", ":")))
+        else:
+            print(format_event(event))
+    # Like diff(1): 1 when the runs differ
+    return 1 if changes else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+
+import errno
+import heapq
+import itertools
+import logging
+import random
+import selectors
+import socket
+import time
+from collections import namedtuple
+from fd_budget import FD_EXHAUSTED
+from host_queue import HostQueue
+from port_scanner import PortScanner
+from socket_tuning import ADDR_EXHAUSTED, set_linger_reset
+from targets import address_family
+
+log = logging.getLogger("port_scanner.engine")
+
+OPEN, CLOSED, FILTERED, ERROR = "open", "closed", "filtered", "error"
+
+ProbeResult = namedtuple("ProbeResult", "host port status latency service protocol",
+                         defaults=("tcp",))
+
+_IN_PROGRESS = (errno.EINPROGRESS, errno.EALREADY, errno.EWOULDBLOCK)
+
+# Longest select() wait while a cancel event without fileno() is attached
+CANCEL_POLL = 0.05
+
+# Selector data marking cancel tokens and pause gates among the probe sockets
+WAKEUP = "wakeup"
+
+def classify(code):
+    """Map a connect() errno to a probe status"""
+    if code == 0:
+        return OPEN
+    if code == errno.ECONNREFUSED:
+        return CLOSED
+    if code in (errno.ETIMEDOUT, errno.EHOSTUNREACH, errno.ENETUNREACH):
+        return FILTERED
+    return ERROR
+
+class RetryPolicy:
+    """Which probe results to retry, how often, and how long to wait in between
+
+    max_attempts counts the first probe. The delay before attempt n+1 is
+    backoff * multiplier**(n-1), capped at max_backoff and spread by
+    +/- jitter (a fraction) so retries to one host do not arrive in lockstep.
+    """
+
+    def __init__(self, max_attempts=3, backoff=0.25, multiplier=2.0, max_backoff=5.0,
+                 jitter=0.5, statuses=(FILTERED,), seed=None):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.multiplier = multiplier
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+        self._random = random.Random(seed)
+
+    def should_retry(self, status, attempt):
+        return status in self.statuses and attempt < self.max_attempts
+
+    def delay(self, attempt):
+        """Seconds to wait after the given (1-based) attempt failed"""
+        delay = min(self.max_backoff, self.backoff * self.multiplier ** (attempt - 1))
+        return delay * self._random.uniform(1 - self.jitter, 1 + self.jitter)
+
+class ScanEngine:
+    """Non-blocking connect scanner that keeps a bounded window of probes in flight
+
+    The window is clamped to the descriptor budget left under RLIMIT_NOFILE.
+    EMFILE/ENFILE and EADDRNOTAVAIL shrink it and requeue the probe instead
+    of being reported as a port result. linger_reset closes open ports with
+    a RST so they leave no TIME_WAIT entry, and source_pool spreads probes
+    over several source addresses/ports. retry_policy reprobes filtered or
+    timed-out ports after a backoff without holding up the other probes.
+    rate_limiter (a TokenBucket, possibly shared between engines) caps
+    connection attempts per second. Probes are spread round-robin over the
+    targets through a HostQueue, at most max_per_host at a time on one host,
+    with hosts that answer fast given more of the window. The scanner's
+    cancel_token and pause_gate sit in the selector beside the probe
+    sockets: a stop closes every in-flight socket at once, and a pause puts
+    in-flight probes back on the queue until resume().
+    """
+
+    def __init__(self, scanner=None, max_in_flight=256, fd_budget=None,
+                 linger_reset=False, source_pool=None, retry_policy=None, rate_limiter=None,
+                 max_per_host=None):
+        self.scanner = scanner or PortScanner()
+        self.max_in_flight = max_in_flight
+        self.max_per_host = max_per_host
+        self.fd_budget = fd_budget or self.scanner.fd_budget
+        self.linger_reset = linger_reset
+        self.source_pool = source_pool
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.stats = {}
+
+    def scan(self, targets, ports, timeout=1.0, progress_callback=None,
+             result_callback=None, open_only=True, collect=True, cancel=None,
+             stats=None):
+        """Probe every (target, port) pair and return the open ProbeResults
+
+        result_callback receives each ProbeResult as it completes (only open
+        ones unless open_only is False); progress_callback receives a percentage.
+        collect=False returns nothing, so streaming scans hold no results in memory.
+        cancel (a CancelToken, or any threading.Event) stops just this scan when set.
+        self.stats holds the counters of the latest scan; concurrent scans
+        pass their own stats dict to have this scan's counters kept there.
+        """
+        run = _ScanRun(self, list(targets), list(ports), timeout,
+                       progress_callback, result_callback, open_only, collect, cancel,
+                       stats=stats)
+        return run.execute()
+
+    def scan_range(self, target, start_port, end_port, timeout, progress_callback, result_callback):
+        """Drop-in replacement for PortScanner.scan_range using the concurrent engine"""
+        results = self.scan(
+            [target], range(start_port, end_port + 1), timeout, progress_callback,
+            lambda result: result_callback(result.port, result.service)
+        )
+        return sorted((result.port, result.service) for result in results)
+
+class _RunBase:
+    """What every scan run shares: stop and pause control, and reporting each result
+
+    Subclasses keep in_flight as socket -> probe, where probe_address()
+    gives the probe's (host, port), and name their protocol, logger and
+    service lookup.
+    """
+
+    protocol, port_suffix = "tcp", ""
+    log = log
+
+    def __init__(self, engine, targets, ports, timeout, progress_callback,
+                 result_callback, open_only, collect, cancel):
+        self.engine = engine
+        self.scanner = engine.scanner
+        self.timeout = timeout
+        self.progress_callback = progress_callback
+        self.result_callback = result_callback
+        self.open_only = open_only
+        self.collect = collect
+        self.pause = self.scanner.pause_gate
+        # Captured now, so restarting the scanner later cannot revive a stopped scan
+        self.cancels = [self.scanner.cancel_token] + ([cancel] if cancel is not None else [])
+        self.polled = cancel is not None and not hasattr(cancel, "fileno")
+        self.queue = HostQueue(targets, ports, engine.max_per_host,
+                               max_window=engine.max_in_flight)
+        self.total = self.queue.total
+        self.done = 0
+        self.open_results = []
+        self.in_flight = {}
+        self.deadlines = []
+        self.sequence = itertools.count()
+        self.selector = selectors.DefaultSelector()
+        for wakeup in {self.pause, *(c for c in self.cancels if hasattr(c, "fileno"))}:
+            self.selector.register(wakeup, selectors.EVENT_READ, WAKEUP)
+        # Read once per scan so per-probe logging costs one attribute test when it is off
+        self.debug = self.log.isEnabledFor(logging.DEBUG)
+
+    def active(self):
+        """False once the scanner is stopped or this scan's cancel event is set"""
+        return not any(cancel.is_set() for cancel in self.cancels)
+
+    def probe_address(self, probe):
+        return probe[0], probe[1]
+
+    def service_name(self, port):
+        return self.scanner.get_service_name(port)
+
+    def hold(self):
+        """Put in-flight probes back on the queue and wait for resume or cancel
+
+        Closing the sockets rather than draining them leaves every probe
+        either finished or queued, so a paused scan is consistent at once.
+        """
+        for sock, probe in self.in_flight.items():
+            self.selector.unregister(sock)
+            sock.close()
+            host, port = self.probe_address(probe)
+            self.queue.push((host, port))
+            self.queue.release(host)
+        self.in_flight.clear()
+        self.deadlines.clear()
+        self.stats["pauses"] += 1
+        self.log.info("Paused with %d probes left", self.queue.remaining)
+        self.pause.wait(*self.cancels)
+
+    def finish(self, host, port, status, latency):
+        hooks = self.scanner._hooks
+        if "post_classify" in hooks:
+            self.scanner._fire("post_classify", host, port, status == OPEN)
+        service = self.service_name(port)
+        result = ProbeResult(host, port, status, latency, service, self.protocol)
+        if self.debug:
+            self.log.debug("%s:%d%s %s in %.2fms", host, port, self.port_suffix, status,
+                           latency * 1000,
+                           extra={"host": host, "port": port, "status": status,
+                                  "latency": latency})
+        if status == OPEN and self.collect:
+            self.open_results.append(result)
+        if self.result_callback and (status == OPEN or not self.open_only):
+            if "pre_callback" in hooks:
+                self.scanner._fire("pre_callback", host, port, service)
+            self.result_callback(result)
+        self.done += 1
+        if self.progress_callback:
+            self.progress_callback(self.done / self.total * 100)
+
+    def abort_in_flight(self):
+        for sock in self.in_flight:
+            try:
+                self.selector.unregister(sock)
+            except (KeyError, ValueError):
+                pass
+            sock.close()
+        self.in_flight.clear()
+        self.deadlines.clear()
+
+class _ScanRun(_RunBase):
+    """State for one scan, so a single engine can serve several scans at once"""
+
+    def __init__(self, *args, stats=None):
+        super().__init__(*args)
+        engine = self.engine
+        # (due, sequence, item) for probes waiting out a retry backoff
+        self.retries = []
+        # (host, port) -> (attempts so far, status of the first attempt)
+        self.attempts = {}
+        # Seconds until the rate limiter has another token, when it stopped fill_window
+        self.rate_wait = 0.0
+        self.target_window = engine.fd_budget.window(engine.max_in_flight)
+        self.window = self.target_window
+        self.stats = stats if stats is not None else {}
+        self.stats.update(probes=0, fd_backpressure=0, addr_backpressure=0, window=self.window,
+                          retries=0, flipped=0, rate_waits=0, pauses=0)
+        engine.stats = self.stats
+
+    def next_item(self):
+        now = time.perf_counter()
+        while self.retries and self.retries[0][0] <= now:
+            self.queue.push(heapq.heappop(self.retries)[2])
+        return self.queue.pop()
+
+    def retry_wait(self):
+        """Seconds until the next retry is due, or None if none are pending"""
+        if not self.retries:
+            return None
+        return max(0.0, self.retries[0][0] - time.perf_counter())
+
+    def idle_wait(self):
+        """Seconds until there may be something to start, or None if the scan is done"""
+        retry_wait = self.retry_wait()
+        if self.rate_wait:
+            return self.rate_wait if retry_wait is None else min(self.rate_wait, retry_wait)
+        return retry_wait
+
+    def wait(self, seconds):
+        """Sleep, waking early for a stop or a pause"""
+        self.selector.select(min(seconds, CANCEL_POLL) if self.polled else seconds)
+
+    def execute(self):
+        backoffs = None
+        log.debug("Scanning %d probes, window %d", self.total, self.window)
+        try:
+            while self.active():
+                if self.pause.paused:
+                    self.hold()
+                    continue
+                stalled = self.fill_window()
+                if not self.in_flight:
+                    if not stalled:
+                        idle_wait = self.idle_wait()
+                        if idle_wait is None:
+                            break
+                        # Waiting on retries or rate tokens
+                        self.wait(idle_wait)
+                        continue
+                    # Nothing of ours to wait on; give descriptors or TIME_WAIT entries time to clear
+                    if backoffs is None:
+                        backoffs = self.engine.fd_budget.backoffs()
+                    if not self.engine.fd_budget.wait(backoffs):
+                        log.error("Scan stalled: %s persisted", errno.errorcode[stalled])
+                        raise OSError(stalled, f"Scan stalled: {errno.errorcode[stalled]} persisted")
+                    continue
+                backoffs = None
+                self.poll()
+        finally:
+            self.abort_in_flight()
+            self.selector.close()
+            log.debug("Scan finished: %s", self.stats)
+        return self.open_results
+
+    def throttle(self, item, code):
+        """Requeue a probe that hit a local resource limit and shrink the window"""
+        self.queue.push(item)
+        self.queue.release(item[0])
+        self.window = max(1, len(self.in_flight))
+        key = "fd_backpressure" if code in FD_EXHAUSTED else "addr_backpressure"
+        self.stats[key] += 1
+        if self.debug:
+            log.debug("%s: window down to %d", errno.errorcode.get(code, code), self.window)
+        return code
+
+    def fill_window(self):
+        """Start probes until the window is full; returns the errno if a local limit stalled it"""
+        hooks = self.scanner._hooks
+        source_pool = self.engine.source_pool
+        rate_limiter = self.engine.rate_limiter
+        self.rate_wait = 0.0
+        while len(self.in_flight) < self.window:
+            item = self.next_item()
+            if item is None:
+                return None
+            host, port = item
+            if rate_limiter is not None:
+                # Taken only once there is a probe to spend it on
+                self.rate_wait = rate_limiter.try_acquire()
+                if self.rate_wait:
+                    self.queue.push(item)
+                    self.queue.release(host)
+                    self.stats["rate_waits"] += 1
+                    return None
+            try:
+                sock = socket.socket(address_family(host), socket.SOCK_STREAM)
+            except OSError as e:
+                if e.errno in FD_EXHAUSTED:
+                    return self.throttle(item, e.errno)
+                self.queue.release(host)
+                self.finish(host, port, ERROR, 0.0)
+                continue
+            if source_pool:
+                try:
+                    source_pool.bind(sock)
+                except OSError as e:
+                    sock.close()
+                    if e.errno in ADDR_EXHAUSTED:
+                        return self.throttle(item, e.errno)
+                    raise
+            if "pre_probe" in hooks:
+                self.scanner._fire("pre_probe", host, port)
+
+            sock.setblocking(False)
+            started = time.perf_counter()
+            try:
+                code = sock.connect_ex((host, port))
+            except OSError as e:
+                code = e.errno
+            self.stats["probes"] += 1
+
+            if code in _IN_PROGRESS:
+                deadline = started + self.timeout
+                self.in_flight[sock] = (host, port, started)
+                heapq.heappush(self.deadlines, (deadline, next(self.sequence), sock))
+                self.selector.register(sock, selectors.EVENT_WRITE)
+            elif code in ADDR_EXHAUSTED:
+                sock.close()
+                return self.throttle(item, code)
+            else:
+                self.close(sock, code)
+                self.complete(host, port, code, started)
+        return None
+
+    def close(self, sock, code):
+        if code == 0 and self.engine.linger_reset:
+            set_linger_reset(sock)
+        sock.close()
+
+    def poll(self):
+        now = time.perf_counter()
+        wait = max(0.0, self.deadlines[0][0] - now) if self.deadlines else self.timeout
+        idle_wait = self.idle_wait()
+        if idle_wait is not None:
+            wait = min(wait, idle_wait)
+        if self.polled:
+            wait = min(wait, CANCEL_POLL)
+        for key, mask in self.selector.select(timeout=wait):
+            if key.data is WAKEUP:
+                continue
+            sock = key.fileobj
+            host, port, started = self.in_flight.pop(sock)
+            code = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            self.selector.unregister(sock)
+            self.close(sock, code)
+            if code in ADDR_EXHAUSTED:
+                self.throttle((host, port), code)
+                continue
+            self.complete(host, port, code, started)
+            if self.window < self.target_window:
+                self.window += 1
+
+        now = time.perf_counter()
+        while self.deadlines and self.deadlines[0][0] <= now:
+            _, _, sock = heapq.heappop(self.deadlines)
+            probe = self.in_flight.pop(sock, None)
+            if probe is None:
+                continue
+            self.selector.unregister(sock)
+            sock.close()
+            host, port, started = probe
+            self.complete(host, port, errno.ETIMEDOUT, started)
+
+        # Drop heap entries for sockets that already completed
+        if len(self.deadlines) > 2 * len(self.in_flight) + 64:
+            self.deadlines = [entry for entry in self.deadlines if entry[2] in self.in_flight]
+            heapq.heapify(self.deadlines)
+
+    def complete(self, host, port, code, started):
+        self.queue.done(host, code != errno.ETIMEDOUT)
+        if "post_connect" in self.scanner._hooks:
+            self.scanner._fire("post_connect", host, port, code)
+        status = classify(code)
+        policy = self.engine.retry_policy
+        if policy is not None:
+            attempt, first_status = self.attempts.get((host, port), (1, status))
+            if policy.should_retry(status, attempt):
+                self.attempts[(host, port)] = (attempt + 1, first_status)
+                due = time.perf_counter() + policy.delay(attempt)
+                heapq.heappush(self.retries, (due, next(self.sequence), (host, port)))
+                self.stats["retries"] += 1
+                if self.debug:
+                    log.debug("%s:%d %s, retry %d", host, port, status, attempt)
+                return
+            if self.attempts.pop((host, port), None) and status != first_status:
+                self.stats["flipped"] += 1
+        self.finish(host, port, status, time.perf_counter() - started)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+import errno
+import json
+import logging
+import logging.handlers
+import queue
+import struct
+import sys
+import time
+
+# Every module logs under this name: port_scanner.engine, port_scanner.gui, ...
+ROOT = "port_scanner"
+SUBSYSTEMS = ("engine", "udp", "gui", "scheduler", "distributed", "api", "cli", "catalog")
+
+TRACE_RECORD = struct.Struct("<dIHh")
+
+# LogRecord attributes; anything else on a record came from extra= and is a structured field
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+def parse_levels(spec):
+    """'info' or 'warning,engine=debug,gui=info' into {logger name: level}"""
+    levels = {}
+    for part in filter(None, (part.strip() for part in spec.split(","))):
+        subsystem, _, level = part.rpartition("=")
+        if subsystem and subsystem not in SUBSYSTEMS:
+            raise ValueError(f"Unknown subsystem {subsystem!r} (one of: {', '.join(SUBSYSTEMS)})")
+        if not isinstance(logging.getLevelName(level.upper()), int):
+            raise ValueError(f"Unknown log level: {level}")
+        levels[f"{ROOT}.{subsystem}" if subsystem else ROOT] = level.upper()
+    return levels
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with any extra= fields as keys of their own"""
+
+    def format(self, record):
+        data = {"ts": round(record.created, 6), "level": record.levelname,
+                "logger": record.name, "message": record.getMessage()}
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """A QueueHandler that leaves formatting to whoever drains the queue
+
+    The stock QueueHandler formats each record in the logging thread; this
+    one enqueues it untouched, so a probe loop pays for one put and the
+    message is only built by the listener thread (or not at all if dropped).
+    """
+
+    def prepare(self, record):
+        return record
+
+class LogSetup:
+    """Logging routed through a queue to one listener thread; close() flushes and stops it"""
+
+    def __init__(self, levels=None, stream=None, structured=False, trace=None):
+        self.logger = logging.getLogger(ROOT)
+        self.levels = {ROOT: "WARNING", **(levels or {})}
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(JsonFormatter() if structured else
+                             logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        self.queue = queue.SimpleQueue()
+        self.handler = DeferredQueueHandler(self.queue)
+        self.listener = logging.handlers.QueueListener(self.queue, handler)
+        self.trace_handler = TraceDumpHandler(trace, stream) if trace is not None else None
+        self._previous = {}
+
+    def start(self):
+        for name, level in self.levels.items():
+            logger = logging.getLogger(name)
+            self._previous[name] = logger.level
+            logger.setLevel(level)
+        self.logger.addHandler(self.handler)
+        if self.trace_handler is not None:
+            self.logger.addHandler(self.trace_handler)
+        # Records stop here rather than also reaching the root logger's handlers
+        self.logger.propagate = False
+        self.listener.start()
+        return self
+
+    def close(self):
+        self.logger.removeHandler(self.handler)
+        if self.trace_handler is not None:
+            self.logger.removeHandler(self.trace_handler)
+        self.logger.propagate = True
+        self.listener.stop()
+        for name, level in self._previous.items():
+            logging.getLogger(name).setLevel(level)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+def configure_logging(spec="warning", stream=None, structured=False, trace=None):
+    """Start a LogSetup from a level spec (see parse_levels); the caller closes it"""
+    return LogSetup(parse_levels(spec), stream, structured, trace).start()
+
+class TraceRing:
+    """The last size probe outcomes, packed into a preallocated binary ring
+
+    Each completed probe is one 16-byte record (monotonic time, host
+    index, port, code), where code is the errno post_connect reports (0 is
+    an answer). Records are written in place, so tracing allocates nothing
+    per probe and the ring costs size * 16 bytes however long the scan runs.
+    It listens on the post_connect hook only, as one call per probe is what
+    keeps it cheap; detach() restores the no-hook fast path.
+    """
+
+    def __init__(self, size=4096):
+        self.size = size
+        self.buffer = bytearray(TRACE_RECORD.size * size)
+        self.count = 0
+        self.hosts = {}
+        self._pack = TRACE_RECORD.pack_into
+        self._scanner = None
+
+    def record(self, host, port, code):
+        try:
+            host_id = self.hosts[host]
+        except KeyError:
+            host_id = self.hosts[host] = len(self.hosts)
+        count = self.count
+        self._pack(self.buffer, count % self.size * 16, time.monotonic(), host_id, port, code)
+        self.count = count + 1
+
+    def attach(self, scanner):
+        self._scanner = scanner
+        scanner.add_hook("post_connect", self.record)
+        return self
+
+    def detach(self):
+        if self._scanner is None:
+            return
+        self._scanner.remove_hook("post_connect", self.record)
+        self._scanner = None
+
+    def events(self):
+        """(time, host, port, outcome) for the recorded probes, oldest first"""
+        count = min(self.count, self.size)
+        hosts = list(self.hosts)
+        events = []
+        for index in range(self.count - count, self.count):
+            moment, host_id, port, code = TRACE_RECORD.unpack_from(
+                self.buffer, index % self.size * TRACE_RECORD.size)
+            outcome = errno.errorcode.get(code, str(code)) if code else "connected"
+            events.append((moment, hosts[host_id], port, outcome))
+        return events
+
+    def format_events(self):
+        events = self.events()
+        if not events:
+            return ["No probes traced"]
+        last = events[-1][0]
+        lines = [f"Last {len(events)} of {self.count} probes (seconds before the last):"]
+        for moment, host, port, outcome in events:
+            lines.append(f"  -{last - moment:.6f}s {host}:{port} {outcome}")
+        return lines
+
+class TraceDumpHandler(logging.Handler):
+    """Writes a TraceRing's probes whenever an ERROR (or worse) record is logged
+
+    An error logged again on the way up (engine, then CLI) finds no new
+    probes and prints nothing, so each failure dumps the ring once.
+    """
+
+    def __init__(self, ring, stream=None):
+        super().__init__(logging.ERROR)
+        self.ring = ring
+        self.stream = stream
+        self.dumped = None
+
+    def emit(self, record):
+        if self.ring.count == self.dumped:
+            return
+        self.dumped = self.ring.count
+        stream = self.stream or sys.stderr
+        for line in self.ring.format_events():
+            print(line, file=stream)
+        stream.flush()
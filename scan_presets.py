@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import random
+from collections import namedtuple
+from types import MappingProxyType
+from profile_store import parse_ports
+from scan_diff import iter_bits
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "presets.json")
+ENGINES = ("serial", "concurrent")
+ORDERS = ("ascending", "common-first", "shuffle")
+
+ScanPlan = namedtuple(
+    "ScanPlan",
+    "name intervals ports mask services timeout protocol engine concurrency rate retries "
+    "retry_backoff max_per_host"
+)
+
+def port_set(spec, common=()):
+    """Bitmap of a port spec like '1-1024,3306,8000-8010'; 'common' adds the common-port list
+
+    With a ServiceIndex as common, 'tag:NAME' adds the catalogue's ports
+    with that tag and 'risk:LEVEL' those at that risk level or above.
+    """
+    bitmap = 0
+    for part in str(spec).split(","):
+        part = part.strip()
+        if part == "common":
+            for port in common:
+                bitmap |= 1 << port
+        elif part.startswith(("tag:", "risk:")):
+            if not hasattr(common, "tagged"):
+                raise ValueError(f"{part!r} needs the service catalogue")
+            kind, _, value = part.partition(":")
+            bitmap |= common.tagged(value) if kind == "tag" else common.at_risk(value)
+        elif part:
+            bitmap |= parse_ports(part)
+    if not bitmap:
+        raise ValueError(f"No ports in {spec!r}")
+    if bitmap & 1 or bitmap >> 65536:
+        raise ValueError(f"Ports out of range (1-65535) in {spec!r}")
+    return bitmap
+
+def intervals_of(ports):
+    """Sorted ports merged into (start, end) runs"""
+    intervals = []
+    for port in ports:
+        if intervals and intervals[-1][1] == port - 1:
+            intervals[-1][1] = port
+        else:
+            intervals.append([port, port])
+    return tuple((start, end) for start, end in intervals)
+
+class ScanPreset:
+    """A named bundle of scan settings, as written in a presets file
+
+    ports is a port spec (see port_set). order decides the probe order the
+    plan fixes: ascending, common-first (likely services before the rest) or
+    shuffle (a fixed pseudo-random order, so hosts do not see a sweep).
+    services names ports missing from the scanner's common-port list.
+    """
+
+    def __init__(self, name, ports="1-1000", timeout=1.0, protocol="tcp", engine="serial",
+                 concurrency=256, rate=None, retries=0, retry_backoff=0.25, max_per_host=None,
+                 order="ascending", services=None, description=""):
+        if protocol not in ("tcp", "udp"):
+            raise ValueError(f"Unknown protocol: {protocol}")
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        if order not in ORDERS:
+            raise ValueError(f"Unknown order: {order}")
+        if timeout <= 0:
+            raise ValueError("Timeout must be positive")
+        self.name = name
+        self.ports = ports
+        self.timeout = timeout
+        self.protocol = protocol
+        self.engine = engine
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.max_per_host = max_per_host
+        self.order = order
+        self.services = {int(port): name for port, name in (services or {}).items()}
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, spec):
+        spec = dict(spec)
+        return cls(spec.pop("name"), **spec)
+
+    def compile(self, common_ports):
+        """Expand into an immutable ScanPlan; common_ports maps ports to names, e.g. a ServiceIndex"""
+        bitmap = port_set(self.ports, common_ports)
+        ports = list(iter_bits(bitmap))
+        intervals = intervals_of(ports)
+        if self.order == "common-first":
+            ports.sort(key=lambda port: port not in common_ports)
+        elif self.order == "shuffle":
+            # Seeded by name so a preset probes in the same order on every run
+            random.Random(self.name).shuffle(ports)
+        services = {port: self.services.get(port) or common_ports.get(port, "Unknown")
+                    for port in ports}
+        return ScanPlan(self.name, intervals, tuple(ports), bitmap, MappingProxyType(services),
+                        self.timeout, self.protocol, self.engine, self.concurrency, self.rate,
+                        self.retries, self.retry_backoff, self.max_per_host)
+
+class PresetLibrary:
+    """Presets by name, each compiled into a ScanPlan once and reused by every later scan"""
+
+    def __init__(self, presets=(), common_ports=None):
+        self.presets = {preset.name: preset for preset in presets}
+        self.common_ports = common_ports or {}
+        self._plans = {}
+
+    @classmethod
+    def load(cls, paths=(DEFAULT_PATH,), common_ports=None):
+        """Read {"presets": [...]} files; a later file's preset replaces an earlier one of that name"""
+        library = cls(common_ports=common_ports)
+        for path in paths:
+            with open(path) as f:
+                config = json.load(f)
+            for spec in config.get("presets", []):
+                library.add(ScanPreset.from_dict(spec))
+        return library
+
+    def add(self, preset):
+        self.presets[preset.name] = preset
+        self._plans.pop(preset.name, None)
+
+    def names(self):
+        return list(self.presets)
+
+    def plan(self, name):
+        """The compiled ScanPlan for a preset; KeyError if there is no such preset"""
+        plan = self._plans.get(name)
+        if plan is None:
+            plan = self._plans[name] = self.presets[name].compile(self.common_ports)
+        return plan
+
+def make_engine(plan, scanner):
+    """The engine a plan asks for, or None for the serial scanner"""
+    from rate_limit import TokenBucket
+    from scan_engine import RetryPolicy, ScanEngine
+    from udp_engine import UdpScanEngine
+    if plan.protocol == "udp":
+        return UdpScanEngine(scanner, rate=plan.rate or 200, max_in_flight=plan.concurrency,
+                             max_per_host=plan.max_per_host)
+    if plan.engine == "serial":
+        return None
+    retry_policy = None
+    if plan.retries > 0:
+        retry_policy = RetryPolicy(max_attempts=plan.retries + 1, backoff=plan.retry_backoff)
+    return ScanEngine(scanner, max_in_flight=plan.concurrency, retry_policy=retry_policy,
+                      rate_limiter=TokenBucket(plan.rate) if plan.rate else None,
+                      max_per_host=plan.max_per_host)
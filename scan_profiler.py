@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+import cProfile
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+
+ImportTime = namedtuple("ImportTime", "module self_us cumulative_us depth parent")
+
+_STARTUP_MARK = "-- interpreter ready --"
+
+class PhaseTimer:
+    """Attributes wall time inside the probe path using PortScanner hooks"""
+
+    def __init__(self):
+        self.totals = Counter()
+        self.counts = Counter()
+        self._marks = {}
+        self._scanner = None
+
+    def attach(self, scanner):
+        """Register this timer on every hook point of a scanner"""
+        self._scanner = scanner
+        scanner.add_hook("pre_probe", self._pre_probe)
+        scanner.add_hook("post_connect", self._post_connect)
+        scanner.add_hook("post_classify", self._post_classify)
+        scanner.add_hook("pre_callback", self._pre_callback)
+        return self
+
+    def detach(self):
+        """Remove the hooks so the scanner returns to its no-hook fast path"""
+        if self._scanner is None:
+            return
+        self._scanner.remove_hook("pre_probe", self._pre_probe)
+        self._scanner.remove_hook("post_connect", self._post_connect)
+        self._scanner.remove_hook("post_classify", self._post_classify)
+        self._scanner.remove_hook("pre_callback", self._pre_callback)
+        self._scanner = None
+
+    def _record(self, key, phase):
+        now = time.perf_counter()
+        started = self._marks.get(key)
+        if started is not None:
+            self.totals[phase] += now - started
+            self.counts[phase] += 1
+        self._marks[key] = now
+
+    def _pre_probe(self, target, port):
+        self._marks[(target, port)] = time.perf_counter()
+
+    def _post_connect(self, target, port, code):
+        self._record((target, port), "connect")
+
+    def _post_classify(self, target, port, is_open):
+        self._record((target, port), "classify")
+        if not is_open:
+            self._marks.pop((target, port), None)
+
+    def _pre_callback(self, target, port, service):
+        self._record((target, port), "lookup")
+        self._marks.pop((target, port), None)
+
+    def summary(self):
+        """Return {phase: (total_seconds, samples)} for every phase seen"""
+        return {phase: (self.totals[phase], self.counts[phase]) for phase in self.totals}
+
+class SamplingProfiler:
+    """Periodically samples one thread's stack and collapses it for flamegraphs"""
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self, thread_id=None):
+        self._thread_id = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._run, daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+            self._sampler = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+    def write_collapsed(self, path):
+        """Write stacks in the 'frame;frame;frame count' format used by flamegraph.pl"""
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+def profile_call(func, output_path, mode="cprofile", interval=0.001):
+    """Run func under a profiler and write the result to output_path
+
+    mode "cprofile" writes a pstats file, mode "sample" writes collapsed stacks.
+    """
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return func()
+        finally:
+            profiler.disable()
+            profiler.dump_stats(output_path)
+    elif mode == "sample":
+        profiler = SamplingProfiler(interval)
+        profiler.start()
+        try:
+            return func()
+        finally:
+            profiler.stop()
+            profiler.write_collapsed(output_path)
+    else:
+        raise ValueError(f"Unknown profiler mode: {mode}")
+
+def import_times(modules, python=None):
+    """ImportTime rows for importing modules in a fresh interpreter, as -X importtime reports them
+
+    Imports made by the interpreter's own startup are left out, so the rows
+    cover exactly what importing modules costs. Rows come children first:
+    each module's parent is the module whose import pulled it in.
+    """
+    code = (f"import sys; print({_STARTUP_MARK!r}, file=sys.stderr, flush=True); "
+            f"import {', '.join(modules)}")
+    completed = subprocess.run([python or sys.executable, "-X", "importtime", "-c", code],
+                               capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in completed.stderr.partition(_STARTUP_MARK)[2].splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append([name.strip(), int(self_us), int(cumulative_us), depth, None])
+    # A module is listed after everything it imported, so walk backwards keeping the open parents
+    parents = []
+    for row in reversed(rows):
+        del parents[row[3]:]
+        row[4] = parents[-1] if parents else None
+        parents.append(row[0])
+    return [ImportTime(*row) for row in rows]
+
+def format_import_times(times, top=15):
+    """Report lines: total startup import time, then the slowest modules by self time"""
+    roots = [row for row in times if row.depth == 0]
+    total = sum(row.cumulative_us for row in roots)
+    lines = [f"Startup imports: {total / 1000:.1f}ms ("
+             + ", ".join(f"{row.module} {row.cumulative_us / 1000:.1f}ms" for row in roots) + ")",
+             f"{'self':>9} {'cumulative':>11}  module"]
+    for row in sorted(times, key=lambda row: -row.self_us)[:top]:
+        via = f"  (via {row.parent})" if row.parent else ""
+        lines.append(f"{row.self_us / 1000:7.1f}ms {row.cumulative_us / 1000:9.1f}ms  {row.module}{via}")
+    return lines
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from port_scanner import PortScanner
+from rate_limit import TokenBucket
+from scan_engine import ScanEngine
+from service_catalog import cli_catalog
+from targets import iter_targets, unique_targets
+
+log = logging.getLogger("port_scanner.scheduler")
+
+SKIP, MERGE = "skip", "merge"
+
+class ScanJob:
+    """A recurring scan: what to probe, how often, and how it ranks against other jobs
+
+    overlap decides what happens when the job comes due while its previous
+    run is still going: skip drops that occurrence, merge runs once more as
+    soon as the current run finishes (however many occurrences were missed).
+    """
+
+    def __init__(self, name, targets, start_port=1, end_port=1000, interval=3600.0,
+                 priority=0, timeout=1.0, overlap=SKIP, prefer="ipv4"):
+        if overlap not in (SKIP, MERGE):
+            raise ValueError(f"overlap must be {SKIP!r} or {MERGE!r}")
+        self.name = name
+        self.targets = list(targets)
+        self.start_port = start_port
+        self.end_port = end_port
+        self.interval = interval
+        self.priority = priority
+        self.timeout = timeout
+        self.overlap = overlap
+        self.prefer = prefer
+        self.running = False
+        self.pending = False
+        self.runs = 0
+        self.skipped = 0
+        # Engine counters of the last finished run
+        self.stats = {}
+
+    @classmethod
+    def from_dict(cls, spec):
+        start, _, end = str(spec.get("ports", "1-1000")).partition("-")
+        start_port, end_port = int(start), int(end or start)
+        return cls(spec["name"], spec["targets"], start_port, end_port,
+                   float(spec.get("interval", 3600)), int(spec.get("priority", 0)),
+                   float(spec.get("timeout", 1.0)), spec.get("overlap", SKIP),
+                   spec.get("prefer", "ipv4"))
+
+class Scheduler:
+    """Runs ScanJobs on their intervals through one shared ScanEngine
+
+    First runs are spread uniformly over each job's interval and later runs
+    are jittered by +/- jitter of the interval, so jobs with equal intervals
+    do not start together. At most max_concurrent jobs run at once, sharing
+    max_in_flight probes and, if rate is set, one token bucket of probes per
+    second. When more jobs are due than slots are free, higher priority wins.
+    """
+
+    def __init__(self, jobs=(), max_concurrent=2, max_in_flight=256, rate=None, jitter=0.1,
+                 on_result=None, on_run=None, scanner=None, seed=None):
+        self.scanner = scanner or PortScanner()
+        self.rate_limiter = TokenBucket(rate) if rate else None
+        self.engine = ScanEngine(self.scanner, max_in_flight=max(1, max_in_flight // max_concurrent),
+                                 rate_limiter=self.rate_limiter)
+        self.max_concurrent = max_concurrent
+        self.jitter = jitter
+        self.on_result = on_result
+        self.on_run = on_run
+        self._random = random.Random(seed)
+        self._sequence = itertools.count()
+        self._due = []
+        self._running = 0
+        self._threads = []
+        self._condition = threading.Condition()
+        self._stopped = False
+        self.jobs = []
+        for job in jobs:
+            self.add_job(job)
+
+    def add_job(self, job, delay=None):
+        """Schedule a job to first run after delay seconds, by default a random point in its interval"""
+        if delay is None:
+            delay = self._random.uniform(0, job.interval)
+        with self._condition:
+            self.jobs.append(job)
+            self._push(job, time.monotonic() + delay)
+            self._condition.notify()
+
+    def _push(self, job, due):
+        heapq.heappush(self._due, (due, next(self._sequence), job))
+
+    def _next_due(self, job, due):
+        spread = job.interval * self.jitter
+        return due + job.interval + self._random.uniform(-spread, spread)
+
+    def run(self, duration=None):
+        """Run jobs until stop() is called or duration seconds have passed"""
+        self.scanner.scanning = True
+        deadline = None if duration is None else time.monotonic() + duration
+        with self._condition:
+            while not self._stopped:
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                ready = []
+                while self._due and self._due[0][0] <= now:
+                    due, _, job = heapq.heappop(self._due)
+                    self._push(job, self._next_due(job, due))
+                    if job.running:
+                        if job.overlap == MERGE:
+                            job.pending = True
+                        else:
+                            job.skipped += 1
+                    else:
+                        ready.append(job)
+                # Jobs waiting for a slot stay ready ahead of anything due later
+                ready.extend(job for job in self.jobs if job.pending and not job.running
+                             and job not in ready)
+                for job in sorted(ready, key=lambda job: -job.priority):
+                    if self._running >= self.max_concurrent:
+                        job.pending = True
+                        continue
+                    self._start(job)
+                wait = self._due[0][0] - now if self._due else None
+                if deadline is not None:
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+                self._condition.wait(wait)
+        self.stop()
+
+    def _start(self, job):
+        job.running = True
+        job.pending = False
+        self._running += 1
+        log.info("Starting job %s", job.name)
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        thread = threading.Thread(target=self._run_job, args=(job,), daemon=True,
+                                  name=f"scan-{job.name}")
+        self._threads.append(thread)
+        thread.start()
+
+    def _run_job(self, job):
+        started = time.time()
+        error = None
+        results = []
+        # Jobs share the engine, so each run keeps its counters apart from engine.stats
+        stats = {}
+        try:
+            targets = list(unique_targets(iter_targets(job.targets, job.prefer)))
+            callback = (lambda result: self.on_result(job, result)) if self.on_result else None
+            results = self.engine.scan([target.address for target in targets],
+                                       range(job.start_port, job.end_port + 1), job.timeout,
+                                       result_callback=callback, stats=stats)
+        except (OSError, ValueError) as e:
+            log.error("Job %s failed: %s", job.name, e)
+            error = e
+        finally:
+            with self._condition:
+                job.running = False
+                job.runs += 1
+                job.stats = stats
+                self._running -= 1
+                self._condition.notify()
+        if self.on_run:
+            self.on_run(job, {"started": started, "duration": time.time() - started,
+                              "open": len(results), "error": error, "stats": stats})
+
+    def stop(self, wait=True):
+        """Stop scheduling, abort running scans and optionally wait for them"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self.scanner.scanning = False
+        if wait:
+            for thread in self._threads:
+                if thread is not threading.current_thread():
+                    thread.join()
+
+def load_jobs(path):
+    """Read {"jobs": [...], ...settings} from a JSON file"""
+    with open(path) as f:
+        config = json.load(f)
+    return [ScanJob.from_dict(spec) for spec in config.get("jobs", [])], config
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run recurring scans from a JSON job file (only scan hosts you own or may test)"
+    )
+    parser.add_argument("jobs", help="JSON file with a jobs list and optional settings")
+    parser.add_argument("--max-concurrent", type=int, help="Jobs running at once (default: 2)")
+    parser.add_argument("--rate", type=float, help="Probes per second shared by all jobs")
+    parser.add_argument("--concurrency", type=int, help="Probes in flight shared by all jobs")
+    parser.add_argument("--duration", type=float, help="Exit after this many seconds")
+    parser.add_argument("--services", metavar="FILE",
+                        help="Service catalogue to name ports from (default: services.json)")
+    parser.add_argument("--reload-interval", type=float, default=5.0, metavar="SECONDS",
+                        help="Seconds between checks for an edited catalogue, 0 to never "
+                             "reload (default: 5)")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs, config = load_jobs(args.jobs)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: cannot load jobs: {e}", file=sys.stderr)
+        return 2
+    try:
+        catalog = cli_catalog(args.services)
+    except (OSError, ValueError) as e:
+        print(f"Error: cannot load service catalogue: {e}", file=sys.stderr)
+        return 2
+    if args.reload_interval > 0:
+        # Running scans pick up the reloaded names on their next result
+        catalog.watch(args.reload_interval)
+
+    def print_result(job, result):
+        print(json.dumps({"job": job.name, **result._asdict()}, separators=(",", ":")))
+        sys.stdout.flush()
+
+    def print_run(job, run):
+        status = f"failed: {run['error']}" if run["error"] else f"{run['open']} open"
+        print(f"[{job.name}] run {job.runs} took {run['duration']:.1f}s, {status}", file=sys.stderr)
+
+    scheduler = Scheduler(
+        jobs,
+        max_concurrent=args.max_concurrent or config.get("max_concurrent", 2),
+        max_in_flight=args.concurrency or config.get("concurrency", 256),
+        rate=args.rate or config.get("rate"),
+        jitter=config.get("jitter", 0.1),
+        on_result=print_result, on_run=print_run, scanner=PortScanner(catalog),
+    )
+    try:
+        scheduler.run(args.duration)
+    except KeyboardInterrupt:
+        scheduler.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+
+import glob
+import hashlib
+import json
+import logging
+import marshal
+import os
+import threading
+from collections import namedtuple
+from collections.abc import Mapping
+
+log = logging.getLogger("port_scanner.catalog")
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "services.json")
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                         "port_scanner")
+CACHE_VERSION = 2
+RISK_LEVELS = ("info", "low", "medium", "high", "critical")
+
+ServiceEntry = namedtuple("ServiceEntry", "port protocol name risk tags")
+
+def parse_catalog(text):
+    """ServiceEntries from a {"services": [{"port": 22, "name": "SSH", ...}]} document"""
+    entries = []
+    seen = set()
+    for spec in json.loads(text).get("services", []):
+        port, protocol = spec.get("port"), spec.get("protocol", "tcp")
+        if not isinstance(port, int) or not 1 <= port <= 65535:
+            raise ValueError(f"Invalid port: {port!r}")
+        if protocol not in ("tcp", "udp"):
+            raise ValueError(f"Unknown protocol for port {port}: {protocol}")
+        if (port, protocol) in seen:
+            raise ValueError(f"Port {port}/{protocol} is listed twice")
+        seen.add((port, protocol))
+        name = spec.get("name")
+        if not isinstance(name, str) or not name:
+            raise ValueError(f"Port {port}/{protocol} has no name")
+        risk = spec.get("risk", "low")
+        if risk not in RISK_LEVELS:
+            raise ValueError(f"Unknown risk level for port {port}/{protocol}: {risk}")
+        tags = spec.get("tags", [])
+        if isinstance(tags, str) or not all(isinstance(tag, str) for tag in tags):
+            raise ValueError(f"Tags of port {port}/{protocol} must be a list of strings")
+        entries.append(ServiceEntry(port, protocol, name, risk, tuple(tags)))
+    return entries
+
+class ServiceIndex(Mapping):
+    """A compiled service catalogue: TCP port -> name, plus UDP names, risk and tags
+
+    As a mapping it reads like the old common_ports dict. Lookups are plain
+    dict hits, and tagged() / at_risk() answer from bitmaps built once, so
+    a catalogue of thousands of entries costs nothing more per probe. The
+    whole index is plain data (see state()), so it can be cached as is.
+    """
+
+    def __init__(self, entries=(), digest=None):
+        self.names = {}
+        self.udp_names = {}
+        # port -> (risk level index, tags), one dict per protocol
+        self.details = {"tcp": {}, "udp": {}}
+        self.by_tag = {}
+        self.by_risk = [0] * len(RISK_LEVELS)
+        self.digest = digest
+        for entry in entries:
+            (self.names if entry.protocol == "tcp" else self.udp_names)[entry.port] = entry.name
+            risk = RISK_LEVELS.index(entry.risk)
+            self.details[entry.protocol][entry.port] = (risk, entry.tags)
+            self.by_risk[risk] |= 1 << entry.port
+            for tag in entry.tags:
+                self.by_tag[tag] = self.by_tag.get(tag, 0) | 1 << entry.port
+
+    def state(self):
+        return (self.names, self.udp_names, self.details, self.by_tag, self.by_risk)
+
+    @classmethod
+    def from_state(cls, state, digest=None):
+        index = cls(digest=digest)
+        index.names, index.udp_names, index.details, index.by_tag, index.by_risk = state
+        return index
+
+    def __getitem__(self, port):
+        return self.names[port]
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def name(self, port, protocol="tcp"):
+        """The service name; UDP ports without a UDP entry fall back to the TCP name"""
+        if protocol == "udp":
+            name = self.udp_names.get(port)
+            if name:
+                return name
+        return self.names.get(port, "Unknown")
+
+    def entry(self, port, protocol="tcp"):
+        """The ServiceEntry for a port, or None if the catalogue does not list it"""
+        details = self.details[protocol].get(port)
+        if details is None:
+            return None
+        names = self.names if protocol == "tcp" else self.udp_names
+        return ServiceEntry(port, protocol, names[port], RISK_LEVELS[details[0]], tuple(details[1]))
+
+    def tagged(self, tag):
+        """Bitmap of the ports carrying a tag"""
+        return self.by_tag.get(tag, 0)
+
+    def at_risk(self, level):
+        """Bitmap of the ports at this risk level or above"""
+        if level not in RISK_LEVELS:
+            raise ValueError(f"Unknown risk level: {level}")
+        bitmap = 0
+        for ports in self.by_risk[RISK_LEVELS.index(level):]:
+            bitmap |= ports
+        return bitmap
+
+def cache_path(path, cache_dir=CACHE_DIR):
+    key = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"services-{key}.idx")
+
+def _read_cache(path):
+    """(version, source path, stamp, digest, index state), or None if unusable"""
+    try:
+        with open(path, "rb") as f:
+            cached = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if (not isinstance(cached, tuple) or len(cached) != 5 or cached[0] != CACHE_VERSION
+            or not isinstance(cached[4], tuple) or len(cached[4]) != 5):
+        return None
+    return cached
+
+def _write_cache(path, source, stamp, digest, index):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, "wb") as f:
+            marshal.dump((CACHE_VERSION, os.path.abspath(source), stamp, digest, index.state()), f)
+        os.replace(temp, path)
+    except OSError as e:
+        # A read-only or full cache directory only costs the next run a recompile
+        log.debug("Cannot write service index cache %s: %s", path, e)
+        return
+    _prune_cache(os.path.dirname(path), path)
+
+def _prune_cache(cache_dir, keep):
+    """Remove cached indexes whose catalogue is gone or that an older version wrote"""
+    for path in glob.glob(os.path.join(cache_dir, "services-*.idx")):
+        if path == keep:
+            continue
+        cached = _read_cache(path)
+        if cached is None or not os.path.exists(cached[1]):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+def load_index(path=DEFAULT_PATH, cache_dir=None):
+    """Load a catalogue, reusing the compiled index cached by an earlier run when it still matches
+
+    Nothing is cached unless cache_dir is given (CACHE_DIR for the usual
+    place). The cache is trusted outright while the file's size and mtime are
+    unchanged. Otherwise the file is read and hashed, and only compiled
+    again if its content really differs (a touch or a checkout of the same
+    content reuses the cache). Returns (index, stamp, how) where how is
+    'cache', 'hash' or 'compiled'.
+    """
+    stamp = file_stamp(path)
+    cache = cache_path(path, cache_dir) if cache_dir else None
+    cached = _read_cache(cache) if cache else None
+    if cached is not None and tuple(cached[2]) == stamp:
+        return ServiceIndex.from_state(cached[4], cached[3]), stamp, "cache"
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if cached is not None and cached[3] == digest:
+        index, how = ServiceIndex.from_state(cached[4], digest), "hash"
+    else:
+        index, how = ServiceIndex(parse_catalog(data), digest), "compiled"
+    if cache:
+        _write_cache(cache, path, stamp, digest, index)
+    return index, stamp, how
+
+class ServiceCatalog:
+    """The current ServiceIndex of a catalogue file, swapped in place when the file changes
+
+    Scans read self.index on every lookup, so refresh() (or a watch()
+    thread in a daemon) takes effect mid-scan without restarting anything.
+    A file that fails to load leaves the previous index in use.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, cache_dir=None):
+        self.path = path
+        self.cache_dir = cache_dir
+        self.index, self.stamp, self.loaded_from = load_index(path, cache_dir)
+        self._stop = None
+
+    def refresh(self):
+        """Reload if the file changed since the last load; True if a new index was swapped in"""
+        try:
+            stamp = file_stamp(self.path)
+            if stamp == self.stamp:
+                return False
+            # Remembered even if the load fails, so a broken file is reported once
+            self.stamp = stamp
+            index, self.stamp, how = load_index(self.path, self.cache_dir)
+        except (OSError, ValueError) as e:
+            log.warning("Keeping the current service catalogue, cannot reload %s: %s", self.path, e)
+            return False
+        if index.digest == self.index.digest:
+            return False
+        self.index, self.loaded_from = index, how
+        log.info("Reloaded %d services from %s", len(index.names) + len(index.udp_names), self.path)
+        return True
+
+    def watch(self, interval=5.0):
+        """Check the file for changes every interval seconds in a daemon thread"""
+        if self._stop is not None:
+            return
+        self._stop = threading.Event()
+        stop = self._stop
+
+        def run():
+            while not stop.wait(interval):
+                self.refresh()
+
+        threading.Thread(target=run, daemon=True, name="catalog-watch").start()
+
+    def stop_watching(self):
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+
+_default = None
+_default_lock = threading.Lock()
+
+def default_catalog(cache_dir=None):
+    """The shipped catalogue, loaded once per process and shared by every PortScanner
+
+    Only the first call's cache_dir counts. The command line entry points
+    pass CACHE_DIR so later runs start from the compiled index; library use
+    and tests write nothing to disk.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ServiceCatalog(cache_dir=cache_dir)
+        return _default
+
+def cli_catalog(path=None):
+    """The catalogue for a command line entry point: path if given, else the shared default
+
+    Either way the compiled index is cached under CACHE_DIR, which the
+    entry points opt into so repeated runs start quickly.
+    """
+    if path:
+        return ServiceCatalog(path, CACHE_DIR)
+    return default_catalog(CACHE_DIR)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import errno
+import itertools
+import socket
+import struct
+import sys
+from targets import address_family
+
+# connect()/bind() errors meaning the local (address, port) space is used up,
+# usually by TIME_WAIT entries; a signal to slow down, not a port result
+ADDR_EXHAUSTED = (errno.EADDRNOTAVAIL,)
+
+# Linux: defer picking the source port until connect(), when the destination is known
+IP_BIND_ADDRESS_NO_PORT = getattr(socket, "IP_BIND_ADDRESS_NO_PORT",
+                                  24 if sys.platform.startswith("linux") else None)
+
+def set_linger_reset(sock):
+    """Make close() send a RST, so the connection leaves no TIME_WAIT entry behind"""
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    except OSError:
+        pass
+
+class SourcePool:
+    """Round-robins outgoing probes over source addresses and, optionally, source ports
+
+    Each source address has its own ephemeral port range, so spreading probes
+    over several loopback or interface aliases multiplies the connections
+    that can be in TIME_WAIT before connect() starts failing.
+    """
+
+    def __init__(self, addresses, ports=None):
+        self.addresses = list(addresses)
+        if not self.addresses:
+            raise ValueError("SourcePool needs at least one source address")
+        self.ports = list(ports) if ports else [0]
+        self._sources = {}
+        for family in (socket.AF_INET, socket.AF_INET6):
+            sources = [(address, port) for port in self.ports for address in self.addresses
+                       if address_family(address) == family]
+            if sources:
+                self._sources[family] = (itertools.cycle(sources), len(sources))
+
+    def bind(self, sock):
+        """Bind sock to the next usable source of its address family
+
+        Raises EADDRNOTAVAIL if none is free; sockets of a family the pool
+        has no addresses for are left for the kernel to bind.
+        """
+        if sock.family not in self._sources:
+            return None
+        sources, size = self._sources[sock.family]
+        for _ in range(size):
+            address, port = next(sources)
+            if port:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            elif IP_BIND_ADDRESS_NO_PORT is not None:
+                try:
+                    sock.setsockopt(socket.IPPROTO_IP, IP_BIND_ADDRESS_NO_PORT, 1)
+                except OSError:
+                    pass
+            try:
+                sock.bind((address, port))
+                return address, port
+            except OSError as e:
+                if e.errno != errno.EADDRINUSE:
+                    raise
+        raise OSError(errno.EADDRNOTAVAIL, "No free source address/port in the pool")
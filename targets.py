@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+import ipaddress
+import socket
+from collections import namedtuple
+from functools import lru_cache
+
+# address is what gets probed; name is what the user asked for (hostname or address)
+Target = namedtuple("Target", "address name family")
+
+FAMILY_NAMES = {socket.AF_INET: "ipv4", socket.AF_INET6: "ipv6"}
+
+# Largest prefix expanded on request; sweeping an IPv6 /64 is not a thing
+MAX_PREFIX_HOSTS = 65536
+
+@lru_cache(maxsize=4096)
+def address_family(address):
+    """AF_INET6 for IPv6 literals, AF_INET for everything else"""
+    try:
+        return socket.AF_INET6 if ipaddress.ip_address(address).version == 6 else socket.AF_INET
+    except ValueError:
+        return socket.AF_INET
+
+def expand_prefix(prefix, max_hosts=MAX_PREFIX_HOSTS):
+    """Lazily yield the host addresses of a small IPv4 or IPv6 prefix"""
+    network = ipaddress.ip_network(prefix, strict=False)
+    if network.num_addresses > max_hosts:
+        raise ValueError(f"{prefix} has {network.num_addresses} addresses; "
+                         f"the limit is {max_hosts}, use a hitlist for larger spaces")
+    if network.num_addresses <= 2:
+        return (str(address) for address in network)
+    return (str(address) for address in network.hosts())
+
+def load_hitlist(path):
+    """Lazily yield addresses from a file, one per line; '#' starts a comment"""
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            entry = line.split("#", 1)[0].strip()
+            if not entry:
+                continue
+            try:
+                yield str(ipaddress.ip_address(entry))
+            except ValueError:
+                raise ValueError(f"{path}:{line_number}: not an IP address: {entry}")
+
+def pick_addresses(infos, prefer="ipv4"):
+    """Choose which resolved addresses to scan
+
+    prefer is "ipv4" or "ipv6" (one address, falling back to the other
+    family) or "both" (one address per family, for dual-stack coverage).
+    """
+    by_family = {}
+    for family, address in infos:
+        by_family.setdefault(family, address)
+    if prefer == "both":
+        return [(family, by_family[family]) for family in (socket.AF_INET, socket.AF_INET6)
+                if family in by_family]
+    order = (socket.AF_INET6, socket.AF_INET) if prefer == "ipv6" else (socket.AF_INET, socket.AF_INET6)
+    for family in order:
+        if family in by_family:
+            return [(family, by_family[family])]
+    return []
+
+def lookup_host(hostname):
+    """All (family, address) pairs getaddrinfo knows for hostname; [] if it does not resolve"""
+    try:
+        infos = socket.getaddrinfo(hostname, None, socket.AF_UNSPEC, socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError):
+        return []
+    return [(info[0], info[4][0]) for info in infos if info[0] in FAMILY_NAMES]
+
+def resolve_host(hostname, prefer="ipv4"):
+    """Resolve a hostname with getaddrinfo and return [(family, address)] per pick_addresses"""
+    return pick_addresses(lookup_host(hostname), prefer)
+
+def is_hostname(spec):
+    """True for specs iter_targets has to resolve, as opposed to addresses, prefixes and hitlists"""
+    spec = spec.strip()
+    if spec.startswith("@") or "/" in spec:
+        return False
+    try:
+        ipaddress.ip_address(spec)
+        return False
+    except ValueError:
+        return True
+
+def iter_targets(specs, prefer="ipv4", resolve=resolve_host):
+    """Lazily turn target specs into Targets
+
+    A spec is an IP literal, a prefix like 10.0.0.0/24 or 2001:db8::/120,
+    @path for a hitlist file, or a hostname resolved according to prefer.
+    """
+    for spec in specs:
+        spec = spec.strip()
+        if spec.startswith("@"):
+            for address in load_hitlist(spec[1:]):
+                yield Target(address, address, address_family(address))
+        elif "/" in spec:
+            for address in expand_prefix(spec):
+                yield Target(address, address, address_family(address))
+        elif is_hostname(spec):
+            addresses = resolve(spec, prefer)
+            if not addresses:
+                raise ValueError(f"Could not resolve {spec}")
+            for family, address in addresses:
+                yield Target(address, spec, family)
+        else:
+            address = str(ipaddress.ip_address(spec))
+            yield Target(address, address, address_family(address))
+
+def unique_targets(targets):
+    """Yield each address once, keeping the first name it was given"""
+    seen = set()
+    for target in targets:
+        if target.address not in seen:
+            seen.add(target.address)
+            yield target
+
+def merge_dual_stack(results, targets):
+    """Deduplicate results of hosts scanned over both families
+
+    Returns {(name, port): {"status", "families", "addresses"}}; a port counts
+    as open if it is open on any family, and families records where it was.
+    """
+    names = {target.address: target.name for target in targets}
+    rank = {"open": 0, "closed": 1}
+    merged = {}
+    for result in results:
+        name = names.get(result.host, result.host)
+        entry = merged.setdefault((name, result.port), {
+            "status": result.status, "families": set(), "addresses": set()
+        })
+        if rank.get(result.status, 2) < rank.get(entry["status"], 2):
+            entry["status"] = result.status
+        if result.status == "open":
+            entry["families"].add(FAMILY_NAMES[address_family(result.host)])
+        entry["addresses"].add(result.host)
+    return merged
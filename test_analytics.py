@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from analytics import ResultColumns, format_summary, load_numpy, main
+from port_scanner import PortScanner, PortScannerGUI
+from result_file import ResultFileWriter
+from scan_diff import ScanSnapshot
+from scan_engine import ProbeResult
+
+def results():
+    rows = []
+    for i in range(1, 11):
+        rows.append(ProbeResult(f"10.0.0.{i}", 22, "open", i / 1000, "SSH"))
+        rows.append(ProbeResult(f"10.0.0.{i}", 23, "closed", 0.0005, "Telnet"))
+    for i in range(1, 4):
+        rows.append(ProbeResult(f"10.0.1.{i}", 80, "open", 0.002, "HTTP"))
+        rows.append(ProbeResult(f"10.0.1.{i}", 81, "filtered", 1.0, "Unknown"))
+    rows.append(ProbeResult("10.0.1.1", 53, "open", 0.001, "DNS", "udp"))
+    # A duplicate probe must not count the host twice
+    rows.append(ProbeResult("10.0.0.1", 22, "open", 0.001, "SSH"))
+    return rows
+
+class AnalyticsTests:
+    backend = None
+    
+    def columns(self):
+        return ResultColumns.from_results(results(), self.backend)
+    
+    def test_status_counts(self):
+        """Test counting results per status"""
+        self.assertEqual(self.columns().status_counts(),
+                         {"open": 15, "closed": 10, "filtered": 3})
+    
+    def test_port_frequency(self):
+        """Test open ports ranked by the number of distinct hosts"""
+        columns = self.columns()
+        self.assertEqual(columns.port_frequency(), [(22, 10), (80, 3), (53, 1)])
+        self.assertEqual(columns.port_frequency(protocol="tcp", top=1), [(22, 10)])
+        self.assertEqual(columns.port_frequency(status="filtered"), [(81, 3)])
+    
+    def test_subnet_exposure(self):
+        """Test per-subnet host and open-port counts"""
+        self.assertEqual(self.columns().subnet_exposure(), [
+            ("10.0.0.0/24", 10, 10, 11), ("10.0.1.0/24", 3, 3, 4)])
+        self.assertEqual(self.columns().subnet_exposure(prefix=16, status="filtered"), [
+            ("10.0.0.0/16", 13, 3, 3)])
+    
+    def test_latency_percentiles(self):
+        """Test interpolated percentiles over answered probes only"""
+        percentiles = self.columns().latency_percentiles((0, 50, 100))
+        self.assertAlmostEqual(percentiles[0], 0.0005)
+        self.assertAlmostEqual(percentiles[50], 0.001)
+        self.assertAlmostEqual(percentiles[100], 0.010)
+        self.assertEqual(ResultColumns(self.backend).latency_percentiles(), {})
+    
+    def test_result_file_and_snapshot_sources(self):
+        """Test loading columns from a .psr file and from a ScanSnapshot"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "scan.psr")
+            with ResultFileWriter(path) as writer:
+                for result in results():
+                    writer.write(result)
+            columns = ResultColumns(self.backend).load(path).load(path)
+        self.assertEqual(len(columns), 2 * len(results()))
+        self.assertEqual(columns.port_frequency(top=1), [(22, 10)])
+        snapshot = ScanSnapshot.from_results(results())
+        self.assertEqual(ResultColumns.from_snapshot(snapshot, self.backend).port_frequency(),
+                         [(22, 10), (80, 3), (53, 1)])
+
+class TestPythonBackend(AnalyticsTests, unittest.TestCase):
+    backend = "python"
+
+@unittest.skipUnless(load_numpy(), "numpy is not installed")
+class TestNumpyBackend(AnalyticsTests, unittest.TestCase):
+    backend = "numpy"
+
+class TestSummary(unittest.TestCase):
+    
+    def test_format_summary(self):
+        """Test the summary lines shared by the CLI and GUI"""
+        lines = format_summary(ResultColumns.from_results(results(), "python").summary(top=2))
+        self.assertEqual(lines[0], "28 results from 13 hosts (15 open, 10 closed, 3 filtered)")
+        self.assertEqual(lines[1], "Top open ports: 22 (10 hosts), 80 (3 hosts)")
+        self.assertTrue(lines[2].startswith("Most exposed subnets: 10.0.0.0/24 (10/10 hosts, 11 open)"))
+        self.assertTrue(lines[3].startswith("Latency: p50 1.00ms"))
+    
+    def test_cli(self):
+        """Test summarising a JSONL result file from the command line"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "scan.jsonl")
+            with open(path, "w") as f:
+                f.write('{"host":"10.0.0.1","port":22,"status":"open","latency":0.001,'
+                        '"service":"SSH","protocol":"tcp"}\n')
+            output = io.StringIO()
+            with redirect_stdout(output):
+                self.assertEqual(main([path, "--backend", "python"]), 0)
+        self.assertIn("Top open ports: 22 (1 hosts)", output.getvalue())
+    
+    def test_gui_summary_text(self):
+        """Test the GUI summary panel text for a snapshot"""
+        gui = PortScannerGUI.__new__(PortScannerGUI)
+        gui.scanner = PortScanner()
+        text = gui.summary_text(ScanSnapshot.from_results(results()))
+        self.assertEqual(text.splitlines()[:2], [
+            "14 results from 13 hosts (14 open)",
+            "Top open ports: 22 (10 hosts), 80 (3 hosts), 53 (1 hosts)"])
+
+if __name__ == '__main__':
+    unittest.main()
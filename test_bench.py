@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import errno
+import json
+import os
+import socket
+import tempfile
+import unittest
+from bench.compare import compare, load_results
+from bench.fleet import BenchFleet
+from bench.run_bench import overhead, percentile, run_benchmarks
+
+class TestBenchFleet(unittest.TestCase):
+    
+    def test_fleet_roles_behave_as_configured(self):
+        """Test that open ports accept, closed ports refuse and blackholes time out"""
+        with BenchFleet(open_count=2, closed_count=3, blackhole_count=1, base_port=23000) as fleet:
+            self.assertEqual(fleet.end_port - fleet.start_port + 1, 6)
+            expected = {"open": 0, "closed": errno.ECONNREFUSED}
+            for role, code in expected.items():
+                for port in fleet.ports_with_role(role):
+                    with socket.socket() as sock:
+                        sock.settimeout(1)
+                        self.assertEqual(sock.connect_ex(('127.0.0.1', port)), code)
+            for port in fleet.ports_with_role("blackhole"):
+                with socket.socket() as sock:
+                    sock.settimeout(0.1)
+                    self.assertNotIn(sock.connect_ex(('127.0.0.1', port)),
+                                     (0, errno.ECONNREFUSED))
+    
+    def test_run_benchmarks_reports_metrics(self):
+        """Test that a benchmark run reports throughput, latency, CPU and RSS"""
+        with BenchFleet(open_count=2, closed_count=5, blackhole_count=0, base_port=23100) as fleet:
+            report = run_benchmarks(fleet, timeout=0.1, repeat=1)
+        
+        self.assertEqual(report["meta"]["fleet"]["open"], 2)
+        row = report["results"][0]
+        self.assertEqual(row["engine"], "serial")
+        self.assertEqual(row["probes"], 7)
+        self.assertEqual(row["open_found"], 2)
+        for key in ("probes_per_sec", "p50_ms", "p99_ms", "cpu_s", "peak_rss_kb"):
+            self.assertIn(key, row)
+        self.assertGreater(row["probes_per_sec"], 0)
+    
+    def test_instrumented_runs_report_overhead(self):
+        """Test that trace and debug runs are measured and compared against the plain run"""
+        with BenchFleet(open_count=2, closed_count=5, blackhole_count=0, base_port=24950) as fleet:
+            report = run_benchmarks(fleet, timeout=0.1, concurrency_levels=(4,), repeat=1,
+                                    engines=["concurrent"], instruments=("off", "trace", "debug"))
+        
+        self.assertEqual([row["instrument"] for row in report["results"]], ["off", "trace", "debug"])
+        for row in report["results"]:
+            self.assertEqual(row["open_found"], 2)
+        rows = overhead(report["results"])
+        self.assertEqual([row["instrument"] for row in rows], ["trace", "debug"])
+        for row in rows:
+            self.assertIn("probes_per_sec", row)
+            self.assertIn("cpu_s", row)
+
+class TestBenchCompare(unittest.TestCase):
+    
+    def row(self, rate, p99):
+        return {"engine": "serial", "concurrency": 1, "probes_per_sec": rate, "p99_ms": p99}
+    
+    def test_slowdown_beyond_threshold_flagged(self):
+        """Test that a throughput drop beyond the threshold is a regression"""
+        baseline = {("serial", 1): self.row(1000, 5)}
+        candidate = {("serial", 1): self.row(850, 5)}
+        rows, regressions = compare(baseline, candidate, threshold=10)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(len(regressions), 1)
+    
+    def test_small_changes_tolerated(self):
+        """Test that changes within the threshold are not flagged"""
+        baseline = {("serial", 1): self.row(1000, 5)}
+        candidate = {("serial", 1): self.row(950, 5.2)}
+        rows, regressions = compare(baseline, candidate, threshold=10)
+        self.assertEqual(regressions, [])
+    
+    def test_latency_rise_flagged(self):
+        """Test that a p99 latency rise beyond the threshold is a regression"""
+        baseline = {("serial", 1): self.row(1000, 5)}
+        candidate = {("serial", 1): self.row(1000, 8)}
+        self.assertEqual(len(compare(baseline, candidate)[1]), 1)
+    
+    def test_instrumented_rows_kept_apart(self):
+        """Test that results files key instrumented runs separately from plain ones"""
+        results = [dict(self.row(1000, 5)), dict(self.row(950, 5), instrument="trace")]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "results.json")
+            with open(path, "w") as f:
+                json.dump({"results": results}, f)
+            loaded = load_results(path)
+        self.assertEqual(sorted(loaded), [("serial", 1), ("serial+trace", 1)])
+    
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 99), 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import unittest
+from distributed import Coordinator, Worker, partition, send_message
+from test_server import TestServer
+
+OPEN_PORTS = list(range(24400, 24405))
+
+class TestDistributedScan(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = TestServer(verbose=False)
+        cls.server.start_port_range(24400, 5, "Distributed")
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop_all_servers()
+    
+    def start_coordinator(self, **options):
+        found = []
+        options.setdefault("ports_per_lease", 25)
+        coordinator = Coordinator(["127.0.0.1"], 24350, 24449, 0.3, on_result=found.append,
+                                  **options)
+        coordinator.start()
+        self.addCleanup(coordinator.stop)
+        return coordinator, found
+    
+    def run_workers(self, coordinator, count):
+        workers = [Worker(*coordinator.address, name=f"w{i}") for i in range(count)]
+        threads = [threading.Thread(target=worker.run, daemon=True) for worker in workers]
+        for thread in threads:
+            thread.start()
+        return workers, threads
+    
+    def test_partition_covers_the_space_once(self):
+        """Test that leases tile every (host, port) pair exactly once"""
+        hosts = [f"10.0.0.{i}" for i in range(5)]
+        leases = list(partition(hosts, 1, 100, hosts_per_lease=2, ports_per_lease=30))
+        self.assertEqual(len(leases), 3 * 4)
+        pairs = [(host, port) for chunk, low, high in leases for host in chunk
+                 for port in range(low, high + 1)]
+        self.assertEqual(len(pairs), 500)
+        self.assertEqual(len(set(pairs)), 500)
+    
+    def test_workers_share_the_leases(self):
+        """Test that two workers split the leases and every open port is reported once"""
+        coordinator, found = self.start_coordinator()
+        workers, threads = self.run_workers(coordinator, 2)
+        self.assertTrue(coordinator.wait(10))
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(sorted(result.port for result in found), OPEN_PORTS)
+        self.assertEqual(sum(worker.leases for worker in workers), 4)
+        self.assertEqual(coordinator.stats["reassigned"], 0)
+    
+    def test_dead_worker_leases_are_reassigned(self):
+        """Test that a worker disconnecting mid-lease loses the lease to another worker"""
+        coordinator, found = self.start_coordinator()
+        with socket.create_connection(coordinator.address) as sock:
+            stream = sock.makefile("rwb")
+            send_message(stream, {"type": "hello", "worker": "doomed"})
+            send_message(stream, {"type": "request"})
+            lease = json.loads(stream.readline())
+            # Report a result for the lease, then die before completing it
+            send_message(stream, {"type": "results", "lease": lease["lease"],
+                                  "results": [["127.0.0.1", 24350, "open", 0.0, "Bogus", "tcp"]]})
+            stream.close()
+        workers, threads = self.run_workers(coordinator, 1)
+        self.assertTrue(coordinator.wait(10))
+        self.assertEqual(sorted(result.port for result in found), OPEN_PORTS)
+        self.assertEqual(coordinator.stats["reassigned"], 1)
+    
+    def test_silent_worker_leases_expire(self):
+        """Test that a lease held past lease_ttl without messages goes to another worker"""
+        coordinator, found = self.start_coordinator(lease_ttl=0.3)
+        sock = socket.create_connection(coordinator.address)
+        self.addCleanup(sock.close)
+        stream = sock.makefile("rwb")
+        send_message(stream, {"type": "request"})
+        stream.readline()
+        
+        workers, threads = self.run_workers(coordinator, 1)
+        self.assertTrue(coordinator.wait(10))
+        self.assertEqual(sorted(result.port for result in found), OPEN_PORTS)
+        self.assertGreaterEqual(coordinator.stats["reassigned"], 1)
+    
+    def test_worker_processes(self):
+        """Test the coordinator with workers running as separate processes"""
+        coordinator, found = self.start_coordinator()
+        host, port = coordinator.address
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "distributed.py")
+        processes = [subprocess.Popen([sys.executable, script, "worker", f"{host}:{port}",
+                                       "--name", f"p{i}"], stderr=subprocess.DEVNULL)
+                     for i in range(2)]
+        try:
+            self.assertTrue(coordinator.wait(20))
+            for process in processes:
+                self.assertEqual(process.wait(10), 0)
+        finally:
+            for process in processes:
+                if process.poll() is None:
+                    process.kill()
+        self.assertEqual(sorted(result.port for result in found), OPEN_PORTS)
+
+    def test_coordinator_process_lets_workers_finish(self):
+        """Test that the coordinator CLI tells still-connected workers "done" before it exits"""
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "distributed.py")
+        coordinator = subprocess.Popen([sys.executable, script, "coordinator", "127.0.0.1",
+                                        "-p", "24350-24449", "-t", "0.3", "--ports-per-lease", "50",
+                                        "--listen", "127.0.0.1:24981", "--grace", "10"],
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        processes = [coordinator]
+        try:
+            self.assertIn(b"Coordinator on", coordinator.stderr.readline())
+            # A worker that takes the first lease, and one that is idle between leases
+            with socket.create_connection(("127.0.0.1", 24981)) as holder, \
+                    socket.create_connection(("127.0.0.1", 24981)) as idle:
+                holder_stream, idle_stream = holder.makefile("rwb"), idle.makefile("rwb")
+                send_message(holder_stream, {"type": "request"})
+                lease = json.loads(holder_stream.readline())
+                worker = subprocess.Popen([sys.executable, script, "worker", "127.0.0.1:24981"],
+                                          stderr=subprocess.PIPE)
+                processes.append(worker)
+                send_message(holder_stream, {"type": "complete", "lease": lease["lease"]})
+                _, errors = worker.communicate(timeout=10)
+                self.assertEqual(worker.returncode, 0, errors.decode())
+                
+                # The scan is over, but the idle worker has not asked again yet
+                with self.assertRaises(subprocess.TimeoutExpired):
+                    coordinator.wait(1)
+                send_message(idle_stream, {"type": "request"})
+                self.assertEqual(json.loads(idle_stream.readline()), {"type": "done"})
+                holder_stream.close()
+                idle_stream.close()
+            output, _ = coordinator.communicate(timeout=10)
+            self.assertEqual(coordinator.returncode, 0)
+        finally:
+            for process in processes:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+        self.assertEqual(sorted(json.loads(line)["port"] for line in output.splitlines()), OPEN_PORTS)
+
+if __name__ == '__main__':
+    unittest.main()
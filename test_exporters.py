@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+from exporters import (BinaryExporter, CsvExporter, JsonlExporter, MAGIC, open_input,
+                       open_output, read_binary)
+from port_scanner import PortScanner
+from scan_engine import CLOSED, FILTERED, OPEN, ProbeResult, ScanEngine
+from test_server import TestServer
+
+RESULTS = [
+    ProbeResult("127.0.0.1", 22, OPEN, 0.0015, "SSH"),
+    ProbeResult("::1", 80, CLOSED, 0.0002, "HTTP"),
+    ProbeResult("127.0.0.1", 53, "open|filtered", 1.0, "DNS", "udp"),
+    ProbeResult("127.0.0.1", 443, FILTERED, 0.5, "HTTPS"),
+]
+
+class CountingStream(io.BytesIO):
+    """BytesIO that counts flushes"""
+    
+    def __init__(self):
+        super().__init__()
+        self.flushes = 0
+    
+    def flush(self):
+        self.flushes += 1
+
+class BrokenStream(io.BytesIO):
+    """A pipe whose reader has gone away after the first write"""
+    
+    def write(self, data):
+        if self.tell():
+            raise BrokenPipeError(32, "Broken pipe")
+        return super().write(data)
+
+class TestExporters(unittest.TestCase):
+    
+    def test_jsonl_one_object_per_line(self):
+        """Test that JSONL output parses line by line back into the results"""
+        stream = CountingStream()
+        exporter = JsonlExporter(stream)
+        for result in RESULTS:
+            exporter.write(result)
+        lines = stream.getvalue().decode().splitlines()
+        self.assertEqual([ProbeResult(**json.loads(line)) for line in lines], RESULTS)
+        self.assertEqual(exporter.count, 4)
+    
+    def test_csv_has_header_and_rows(self):
+        """Test that CSV output has a header row and one row per result"""
+        stream = CountingStream()
+        exporter = CsvExporter(stream)
+        for result in RESULTS:
+            exporter.write(result)
+        rows = list(csv.DictReader(io.StringIO(stream.getvalue().decode())))
+        self.assertEqual([(row["host"], int(row["port"]), row["status"]) for row in rows],
+                         [(result.host, result.port, result.status) for result in RESULTS])
+        self.assertEqual(rows[2]["protocol"], "udp")
+    
+    def test_binary_round_trip(self):
+        """Test that binary records read back with hosts, statuses and protocols intact"""
+        stream = CountingStream()
+        exporter = BinaryExporter(stream)
+        for result in RESULTS:
+            exporter.write(result)
+        data = stream.getvalue()
+        # Magic, two host records and 13 bytes per result
+        self.assertEqual(len(data), len(MAGIC) + (2 + 9) + (2 + 3) + 4 * 13)
+        
+        scanner = PortScanner()
+        back = list(read_binary(io.BytesIO(data), lambda port, protocol: scanner.get_service_name(port)))
+        self.assertEqual([(r.host, r.port, r.status, r.protocol) for r in back],
+                         [(r.host, r.port, r.status, r.protocol) for r in RESULTS])
+        self.assertAlmostEqual(back[0].latency, 0.0015)
+        self.assertEqual(back[0].service, "SSH")
+        with self.assertRaises(ValueError):
+            list(read_binary(io.BytesIO(b"garbage")))
+    
+    def test_truncated_binary_stream(self):
+        """Test that a stream cut off anywhere after the magic raises ValueError"""
+        stream = CountingStream()
+        exporter = BinaryExporter(stream)
+        for result in RESULTS:
+            exporter.write(result)
+        data = stream.getvalue()
+        for end in (len(MAGIC) + 1, len(MAGIC) + 2, len(MAGIC) + 11 + 1, len(data) - 5):
+            with self.assertRaisesRegex(ValueError, "Truncated"):
+                list(read_binary(io.BytesIO(data[:end])))
+        # A result whose host record is missing
+        with self.assertRaises(ValueError):
+            list(read_binary(io.BytesIO(MAGIC + data[len(MAGIC) + 11:])))
+    
+    def test_flush_interval(self):
+        """Test that writes are flushed once per interval rather than per result"""
+        stream = CountingStream()
+        exporter = JsonlExporter(stream, flush_interval=60)
+        for result in RESULTS * 100:
+            exporter.write(result)
+        self.assertEqual(stream.flushes, 0)
+        exporter.flush()
+        self.assertEqual(stream.flushes, 1)
+        
+        eager = CountingStream()
+        exporter = JsonlExporter(eager, flush_interval=0)
+        for result in RESULTS:
+            exporter.write(result)
+        self.assertEqual(eager.flushes, 4)
+    
+    def test_broken_pipe_stops_quietly(self):
+        """Test that a closed pipe marks the exporter broken and calls on_broken once"""
+        calls = []
+        exporter = JsonlExporter(BrokenStream(), on_broken=lambda: calls.append(1))
+        for result in RESULTS:
+            exporter.write(result)
+        exporter.close()
+        self.assertTrue(exporter.broken)
+        self.assertEqual(calls, [1])
+    
+    def test_compressed_output_by_extension(self):
+        """Test that a .gz path is gzip-compressed and reads back through open_input"""
+        path = os.path.join(tempfile.mkdtemp(), "results.jsonl.gz")
+        with JsonlExporter(open_output(path)) as exporter:
+            for result in RESULTS:
+                exporter.write(result)
+        with gzip.open(path, "rt") as f:
+            self.assertEqual(len(f.readlines()), 4)
+        with open_input(path) as f:
+            self.assertEqual(json.loads(f.readline())["port"], 22)
+        os.unlink(path)
+
+class TestStreamingScan(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = TestServer(verbose=False)
+        cls.server.start_port_range(24040, 3, "Export")
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop_all_servers()
+    
+    def test_engine_streams_without_collecting(self):
+        """Test that collect=False streams every result to the exporter and keeps none"""
+        scanner = PortScanner()
+        scanner.scanning = True
+        stream = CountingStream()
+        exporter = JsonlExporter(stream)
+        results = ScanEngine(scanner).scan(["127.0.0.1"], range(24040, 24050), 0.5,
+                                           result_callback=exporter.write, open_only=False,
+                                           collect=False)
+        self.assertEqual(results, [])
+        statuses = [json.loads(line)["status"] for line in stream.getvalue().splitlines()]
+        self.assertEqual(statuses.count(OPEN), 3)
+        self.assertEqual(len(statuses), 10)
+
+if __name__ == '__main__':
+    unittest.main()
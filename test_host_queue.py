@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import unittest
+from host_queue import HostQueue
+from port_scanner import PortScanner
+from scan_engine import ScanEngine
+from test_server import TestServer
+
+def drain(queue):
+    items = []
+    item = queue.pop()
+    while item is not None:
+        items.append(item)
+        item = queue.pop()
+    return items
+
+class TestHostQueue(unittest.TestCase):
+    
+    def test_round_robin_across_hosts(self):
+        """Test that consecutive probes go to different hosts"""
+        queue = HostQueue(["a", "b", "c"], [1, 2], initial_window=4)
+        self.assertEqual(drain(queue), [("a", 1), ("b", 1), ("c", 1), ("a", 2), ("b", 2), ("c", 2)])
+        self.assertEqual(queue.remaining, 0)
+    
+    def test_max_per_host(self):
+        """Test that a host never has more than max_per_host probes in flight"""
+        queue = HostQueue(["a"], range(10), max_per_host=2)
+        self.assertEqual(drain(queue), [("a", 0), ("a", 1)])
+        queue.done("a", True)
+        self.assertEqual(drain(queue), [("a", 2)])
+    
+    def test_unresponsive_hosts_yield_to_responsive_ones(self):
+        """Test that timeouts shrink a host's window and answers grow it"""
+        queue = HostQueue(["slow", "fast"], range(100), initial_window=4, max_per_host=8)
+        for _ in range(8):
+            queue.pop()
+        for _ in range(4):
+            queue.done("slow", False)
+            queue.done("fast", True)
+        self.assertEqual(queue.hosts["slow"].window, 1)
+        self.assertEqual(queue.hosts["fast"].window, 8)
+        # Windows first: slow gets one slot and fast eight; slow then takes the spare capacity
+        hosts = [queue.pop()[0] for _ in range(10)]
+        self.assertEqual(hosts, ["slow"] + ["fast"] * 8 + ["slow"])
+    
+    def test_max_hosts_admits_targets_as_hosts_finish(self):
+        """Test that only max_hosts targets are interleaved at once"""
+        queue = HostQueue(["a", "b", "c"], [1, 2], max_hosts=2)
+        items = drain(queue)
+        self.assertEqual(items[:4], [("a", 1), ("b", 1), ("a", 2), ("b", 2)])
+        self.assertEqual(items[4:], [("c", 1), ("c", 2)])
+    
+    def test_push_requeues_ahead_and_revives_hosts(self):
+        """Test that pushed probes go first and bring a finished host back"""
+        queue = HostQueue(["a"], [1, 2])
+        self.assertEqual(drain(queue), [("a", 1), ("a", 2)])
+        queue.done("a", True)
+        queue.release("a")
+        self.assertNotIn("a", queue.hosts)
+        queue.push(("a", 2))
+        self.assertEqual(queue.remaining, 1)
+        self.assertEqual(drain(queue), [("a", 2)])
+    
+    def test_repeated_targets_are_scanned_each_time(self):
+        """Test that a target listed twice gets each port twice"""
+        queue = HostQueue(["a", "a"], [1, 2])
+        self.assertEqual(queue.total, 4)
+        self.assertEqual(sorted(drain(queue)), [("a", 1), ("a", 1), ("a", 2), ("a", 2)])
+
+class TestEngineFairness(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = TestServer(verbose=False)
+        cls.server.start_port_range(24600, 3, "Fair")
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop_all_servers()
+    
+    def test_engine_limits_each_host(self):
+        """Test that the engine interleaves hosts and honours max_per_host"""
+        scanner = PortScanner()
+        scanner.scanning = True
+        in_flight = {}
+        peak = {}
+        order = []
+        
+        def started(host, port):
+            order.append(host)
+            in_flight[host] = in_flight.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), in_flight[host])
+        
+        def finished(host, port, code):
+            in_flight[host] -= 1
+        
+        scanner.add_hook("pre_probe", started)
+        scanner.add_hook("post_connect", finished)
+        engine = ScanEngine(scanner, max_in_flight=16, max_per_host=3)
+        results = engine.scan(["127.0.0.1", "127.0.0.2"], range(24600, 24640), 0.5)
+        
+        self.assertEqual(sorted(result.port for result in results if result.host == "127.0.0.1"),
+                         [24600, 24601, 24602])
+        self.assertLessEqual(max(peak.values()), 3)
+        self.assertEqual(set(order[:2]), {"127.0.0.1", "127.0.0.2"})
+        self.assertEqual(len(order), 80)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+import errno
+import select
+import socket
+import time
+import unittest
+from net_simulator import SimulatedNetwork
+from port_scanner import PortScanner
+from scan_engine import CLOSED, FILTERED, OPEN, RetryPolicy, ScanEngine
+from test_server import TestServer
+
+class TestSimulatedNetwork(unittest.TestCase):
+    
+    def setUp(self):
+        self.scanner = PortScanner()
+        self.network = SimulatedNetwork(seed=7, time_scale=0.001)
+    
+    def scan(self, start_port, end_port, timeout=1):
+        found = []
+        self.scanner.scanning = True
+        with self.network.patch():
+            self.scanner.scan_range("10.0.0.1", start_port, end_port, timeout,
+                                    lambda value: None, lambda port, service: found.append(port))
+        return found
+    
+    def test_open_closed_and_filtered_ports(self):
+        """Test that the shim drives scan_port through each port state"""
+        self.network.set_port(80, "open")
+        self.network.set_port(81, "filtered")
+        self.assertEqual(self.scan(79, 81), [80])
+        codes = [code for host, port, code in self.network.attempts]
+        self.assertEqual(codes, [errno.ECONNREFUSED, 0, errno.EAGAIN])
+    
+    def test_latency_beyond_timeout_reports_closed(self):
+        """Test that a slow accept longer than the timeout is missed"""
+        self.network.set_port(80, "open", latency=2.0)
+        self.network.set_port(81, "open", latency=0.5)
+        self.assertEqual(self.scan(80, 81, timeout=1), [81])
+    
+    def test_same_seed_same_outcome(self):
+        """Test that drops and RST storms are deterministic for a seed"""
+        def run(seed):
+            network = SimulatedNetwork(seed=seed, rst_rate=0.2, time_scale=0)
+            network.set_ports(range(1, 200), "open", drop_rate=0.3)
+            with network.patch():
+                return [self.scanner.scan_port("10.0.0.1", port, timeout=1) for port in range(1, 200)]
+        
+        first = run(3)
+        self.assertEqual(first, run(3))
+        self.assertNotEqual(first, run(4))
+        self.assertTrue(0 < sum(first) < 199)
+    
+    def test_host_specific_behavior(self):
+        """Test that a host-specific entry overrides the port default"""
+        self.network.set_port(22, "open")
+        self.network.set_port(22, "closed", host="10.0.0.1")
+        with self.network.patch():
+            self.assertFalse(self.scanner.scan_port("10.0.0.1", 22))
+            self.assertTrue(self.scanner.scan_port("10.0.0.2", 22))
+
+class TestSimulatedEngine(unittest.TestCase):
+    
+    def setUp(self):
+        self.scanner = PortScanner()
+        self.scanner.scanning = True
+        self.network = SimulatedNetwork(seed=11)
+    
+    def test_engine_retries_dropped_probes(self):
+        """Test that the selector engine runs on the shim and retries lost SYNs until they answer"""
+        self.network.set_ports(range(1, 21), "open", latency=0.002, jitter=0.005, drop_rate=0.3)
+        self.network.set_port(21, "filtered")
+        self.network.set_port(22, "closed", latency=0.01)
+        engine = ScanEngine(self.scanner, max_in_flight=8,
+                            retry_policy=RetryPolicy(max_attempts=12, backoff=0.005, multiplier=1,
+                                                     jitter=0))
+        statuses = {}
+        with self.network.patch():
+            engine.scan(["10.0.0.1"], range(1, 23), 0.05,
+                        result_callback=lambda result: statuses.__setitem__(result.port, result.status),
+                        open_only=False)
+        
+        self.assertEqual(statuses, {**dict.fromkeys(range(1, 21), OPEN), 21: FILTERED, 22: CLOSED})
+        self.assertGreater(engine.stats["flipped"], 0)
+        self.assertEqual(len(self.network.attempts), engine.stats["probes"])
+        self.assertEqual([port for _, port, _ in self.network.attempts].count(21), 12)
+    
+    def test_nonblocking_connect_reports_through_so_error(self):
+        """Test EINPROGRESS, writability once the answer is due, and SO_ERROR"""
+        self.network.set_port(80, "closed", latency=0.01)
+        with self.network.patch():
+            sock = socket.socket()
+        sock.setblocking(False)
+        self.assertEqual(sock.connect_ex(("10.0.0.1", 80)), errno.EINPROGRESS)
+        self.assertEqual(sock.connect_ex(("10.0.0.1", 80)), errno.EALREADY)
+        self.assertEqual(select.select([], [sock], [], 0)[1], [])
+        self.assertEqual(select.select([], [sock], [], 1)[1], [sock])
+        self.assertEqual(sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR), errno.ECONNREFUSED)
+        sock.close()
+        self.assertEqual(sock.fileno(), -1)
+
+class TestServerFaults(unittest.TestCase):
+    
+    def setUp(self):
+        self.server = TestServer(verbose=False)
+        self.addCleanup(self.server.stop_all_servers)
+    
+    def test_reset_fault_sends_rst(self):
+        """Test that reset listeners abort connections"""
+        self.assertTrue(self.server.start_server(23501, "Reset", reset=True))
+        with socket.create_connection(("127.0.0.1", 23501), timeout=1) as sock:
+            with self.assertRaises(ConnectionResetError):
+                sock.recv(100)
+                sock.recv(100)
+    
+    def test_delay_fault_postpones_banner(self):
+        """Test that delayed listeners answer only after the delay"""
+        self.assertTrue(self.server.start_server(23502, "Slow", delay=0.2))
+        with socket.create_connection(("127.0.0.1", 23502), timeout=1) as sock:
+            start = time.perf_counter()
+            self.assertTrue(sock.recv(100).startswith(b"Hello from Slow"))
+            self.assertGreaterEqual(time.perf_counter() - start, 0.15)
+    
+    def test_trickle_fault_sends_banner_bytewise(self):
+        """Test that trickled banners arrive one byte at a time"""
+        self.assertTrue(self.server.start_server(23503, "Trickle", trickle=0.01))
+        with socket.create_connection(("127.0.0.1", 23503), timeout=2) as sock:
+            self.assertEqual(len(sock.recv(100)), 1)
+            data = b""
+            while True:
+                chunk = sock.recv(100)
+                if not chunk:
+                    break
+                data += chunk
+            self.assertTrue(data.endswith(b"port 23503\n"))
+
+if __name__ == '__main__':
+    unittest.main()
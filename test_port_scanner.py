@@ -184,6 +184,22 @@ class TestPortScannerRange(unittest.TestCase):
         self.assertEqual(len(self.found_ports), 1)
         self.assertEqual(self.found_ports[0], (80, "HTTP"))
     
+    @patch.object(PortScanner, 'scan_port')
+    def test_scan_ports_keeps_given_order(self, mock_scan_port):
+        """Test scanning a non-contiguous port list in the order given"""
+        probed = []
+        mock_scan_port.side_effect = lambda target, port, timeout: probed.append(port) or port == 443
+        self.scanner.scanning = True
+        
+        result = self.scanner.scan_ports(
+            "127.0.0.1", [443, 22, 8080], 1,
+            self.progress_callback, self.result_callback
+        )
+        
+        self.assertEqual(probed, [443, 22, 8080])
+        self.assertEqual(result, [(443, "HTTPS")])
+        self.assertAlmostEqual(self.progress_values[-1], 100.0, places=1)
+    
     @patch.object(PortScanner, 'scan_port')
     def test_scan_range_stopped_early(self, mock_scan_port):
         """Test range scanning stopped by user"""
@@ -287,6 +303,51 @@ class TestPortScannerEdgeCases(unittest.TestCase):
         # Test very high port
         self.assertEqual(self.scanner.get_service_name(100000), "Unknown")
 
+class TestPortScannerHooks(unittest.TestCase):
+    
+    def setUp(self):
+        self.scanner = PortScanner()
+        self.events = []
+    
+    def test_unknown_hook_point_rejected(self):
+        """Test that only known hook points can be registered"""
+        with self.assertRaises(ValueError):
+            self.scanner.add_hook("post_scan", lambda *args: None)
+    
+    @patch('socket.socket')
+    def test_hooks_fire_in_order(self, mock_socket):
+        """Test that every hook point fires around an open port"""
+        mock_sock = MagicMock()
+        mock_socket.return_value = mock_sock
+        mock_sock.connect_ex.return_value = 0
+        
+        for point in ("pre_probe", "post_connect", "post_classify", "pre_callback"):
+            self.scanner.add_hook(point, lambda *args, point=point: self.events.append((point,) + args))
+        
+        self.scanner.scanning = True
+        self.scanner.scan_range("127.0.0.1", 80, 80, 1, lambda value: None, lambda port, service: None)
+        
+        self.assertEqual(self.events, [
+            ("pre_probe", "127.0.0.1", 80),
+            ("post_connect", "127.0.0.1", 80, 0),
+            ("post_classify", "127.0.0.1", 80, True),
+            ("pre_callback", "127.0.0.1", 80, "HTTP"),
+        ])
+    
+    @patch.object(PortScanner, 'scan_port')
+    def test_removed_hook_no_longer_fires(self, mock_scan_port):
+        """Test that removing the last hook restores the no-hook path"""
+        mock_scan_port.return_value = False
+        hook = lambda *args: self.events.append(args)
+        self.scanner.add_hook("post_classify", hook)
+        self.scanner.remove_hook("post_classify", hook)
+        
+        self.scanner.scanning = True
+        self.scanner.scan_range("127.0.0.1", 80, 82, 1, lambda value: None, lambda port, service: None)
+        
+        self.assertEqual(self.events, [])
+        self.assertEqual(self.scanner._hooks, {})
+
 if __name__ == '__main__':
     # Create test suite
     test_suite = unittest.TestSuite()
@@ -297,7 +358,8 @@ if __name__ == '__main__':
         TestPortScannerNetworking,
         TestPortScannerRange,
         TestPortScannerIntegration,
-        TestPortScannerEdgeCases
+        TestPortScannerEdgeCases,
+        TestPortScannerHooks
     ]
     
     for test_class in test_classes:
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from port_scanner import PortScanner, PortScannerGUI
+from profile_store import ProfileStore, format_ports, main, parse_ports
+from scan_diff import CHANGED, ScanSnapshot
+from scan_engine import ProbeResult
+
+WEB = [22, 80, 443]
+
+def fleet():
+    """100 identical web nodes, one with an extra port and one with nothing open"""
+    results = [ProbeResult(f"10.0.0.{i}", port, "open", 0.001, "")
+               for i in range(1, 101) for port in WEB]
+    results.append(ProbeResult("10.0.0.50", 6379, "open", 0.001, "Redis"))
+    results.append(ProbeResult("10.0.1.1", 22, "closed", 0.001, "SSH"))
+    return results
+
+class TestProfileStore(unittest.TestCase):
+    
+    def test_port_list_round_trip(self):
+        """Test the compact port-list notation"""
+        bitmap = parse_ports("22,80,8000-8003")
+        self.assertEqual(format_ports(bitmap), "22,80,8000-8003")
+        self.assertEqual(bin(bitmap).count("1"), 6)
+        self.assertEqual(parse_ports(""), 0)
+    
+    def test_identical_profiles_are_stored_once(self):
+        """Test that hosts sharing an open-port set share one interned profile"""
+        store = ProfileStore.from_results(fleet())
+        self.assertEqual(len(store.hosts), 101)
+        self.assertEqual(len(store.profiles), 3)
+        golden = store.golden()
+        self.assertEqual(store.describe(golden), "22,80,443/tcp")
+        self.assertEqual(len(store.members[golden]), 99)
+        self.assertIs(store.profiles[store.hosts["10.0.0.1"]], store.profiles[store.hosts["10.0.0.2"]])
+    
+    def test_deviants(self):
+        """Test finding the hosts off the golden profile, including one with nothing open"""
+        store = ProfileStore.from_results(fleet())
+        self.assertEqual(store.deviants(), ["10.0.0.50", "10.0.1.1"])
+        self.assertEqual(store.profile_of("10.0.1.1"), {})
+        self.assertEqual(store.deviants(store.hosts["10.0.0.50"])[:2], ["10.0.0.1", "10.0.0.10"])
+    
+    def test_add_host_moves_between_profiles(self):
+        """Test that re-adding a host leaves no stale membership behind"""
+        store = ProfileStore()
+        store.add_host("a", {"tcp": 1 << 22})
+        store.add_host("a", {"tcp": 1 << 80})
+        self.assertEqual([hosts for _, hosts in store.groups()], [["a"]])
+        self.assertEqual(store.profile_of("a"), {"tcp": 1 << 80})
+    
+    def test_save_and_load(self):
+        """Test that a saved store reloads to the same grouping and snapshot"""
+        store = ProfileStore.from_results(fleet())
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "fleet.json")
+            store.save(path)
+            loaded = ProfileStore.load(path)
+            self.assertLess(os.path.getsize(path), 2000)
+        self.assertEqual(loaded.groups()[0][1], store.groups()[0][1])
+        self.assertEqual(loaded.deviants(), store.deviants())
+        self.assertEqual(loaded.to_snapshot().bitmaps, store.to_snapshot().bitmaps)
+    
+    def test_cli(self):
+        """Test the group and deviants subcommands on a JSONL result file"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "fleet.jsonl")
+            with open(path, "w") as f:
+                for result in fleet():
+                    f.write('{"host":"%s","port":%d,"status":"%s","latency":0.001,"service":"",'
+                            '"protocol":"tcp"}\n' % (result.host, result.port, result.status))
+            output = io.StringIO()
+            with redirect_stdout(output):
+                self.assertEqual(main(["group", path, "--limit", "1"]), 0)
+                self.assertEqual(main(["deviants", path, "--golden", "10.0.0.1"]), 0)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(lines[0], "    99 hosts  22,80,443/tcp  [10.0.0.1, ... (+98)]")
+        self.assertEqual(lines[-2:], ["10.0.0.50 22,80,443,6379/tcp", "10.0.1.1 (nothing open)"])
+    
+    def test_gui_rows(self):
+        """Test that the GUI lists each profile and flags those off the golden one"""
+        gui = PortScannerGUI.__new__(PortScannerGUI)
+        gui.scanner = PortScanner()
+        rows = gui.profile_rows(ScanSnapshot.from_results(fleet()))
+        self.assertEqual([values[:2] for values, tags in rows],
+                         [(99, "22,80,443/tcp"), (1, "22,80,443,6379/tcp")])
+        self.assertEqual([tags for values, tags in rows], [(), (CHANGED,)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import socket
+import threading
+import time
+import unittest
+from resolver import Resolver
+from targets import Target, iter_targets, unique_targets
+
+ZONE = {
+    "www.test": [(socket.AF_INET, "192.0.2.10"), (socket.AF_INET6, "2001:db8::10")],
+    "alias.test": [(socket.AF_INET, "192.0.2.10")],
+    "mail.test": [(socket.AF_INET, "192.0.2.20")],
+}
+
+class FakeDNS:
+    """getaddrinfo stand-in answering from ZONE after delay seconds, counting queries"""
+    
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.queries = []
+        self._lock = threading.Lock()
+    
+    def __call__(self, hostname):
+        with self._lock:
+            self.queries.append(hostname)
+        time.sleep(self.delay)
+        return list(ZONE.get(hostname, []))
+
+class TestResolver(unittest.TestCase):
+    
+    def test_answers_are_cached(self):
+        """Test that a second resolve of a name is served from the cache"""
+        dns = FakeDNS()
+        with Resolver(lookup=dns) as resolver:
+            self.assertEqual(resolver.resolve("www.test"), [(socket.AF_INET, "192.0.2.10")])
+            self.assertEqual(resolver.resolve("www.test", "ipv6"), [(socket.AF_INET6, "2001:db8::10")])
+        self.assertEqual(dns.queries, ["www.test"])
+        self.assertEqual(resolver.stats["hits"], 1)
+    
+    def test_expired_answers_are_looked_up_again(self):
+        """Test that entries past their TTL trigger a new query"""
+        dns = FakeDNS()
+        with Resolver(lookup=dns, ttl=0) as resolver:
+            resolver.resolve("www.test")
+            resolver.resolve("www.test")
+        self.assertEqual(dns.queries, ["www.test", "www.test"])
+    
+    def test_failures_are_cached_negatively(self):
+        """Test that unresolvable names are cached for negative_ttl"""
+        dns = FakeDNS()
+        with Resolver(lookup=dns, negative_ttl=60) as resolver:
+            self.assertEqual(resolver.resolve("missing.test"), [])
+            self.assertEqual(resolver.resolve("missing.test"), [])
+        self.assertEqual(dns.queries, ["missing.test"])
+        self.assertEqual(resolver.stats["negative_hits"], 1)
+    
+    def test_lookups_run_in_parallel(self):
+        """Test that a hostname list resolves in about one lookup's time, not the sum"""
+        dns = FakeDNS(delay=0.2)
+        names = [f"host{i}.test" for i in range(20)] + ["www.test"]
+        with Resolver(max_workers=32, lookup=dns) as resolver:
+            started = time.perf_counter()
+            answers = resolver.resolve_many(names)
+            elapsed = time.perf_counter() - started
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(answers["www.test"], [(socket.AF_INET, "192.0.2.10")])
+        self.assertEqual(answers["host0.test"], [])
+    
+    def test_concurrent_queries_for_one_name_are_shared(self):
+        """Test that resolving a name already in flight waits for that query"""
+        dns = FakeDNS(delay=0.1)
+        with Resolver(lookup=dns) as resolver:
+            resolver.prefetch(["www.test", "10.0.0.1", "10.0.0.0/30"])
+            resolver.resolve("www.test")
+        self.assertEqual(dns.queries, ["www.test"])
+    
+    def test_shared_addresses_are_scanned_once(self):
+        """Test that hostnames resolving to one address yield one target"""
+        with Resolver(lookup=FakeDNS()) as resolver:
+            specs = ["www.test", "alias.test", "mail.test"]
+            resolver.prefetch(specs)
+            targets = list(unique_targets(iter_targets(specs, "ipv4", resolver.resolve)))
+        self.assertEqual(targets, [Target("192.0.2.10", "www.test", socket.AF_INET),
+                                   Target("192.0.2.20", "mail.test", socket.AF_INET)])
+    
+    def test_reverse_lookups_do_not_block(self):
+        """Test that reverse_name returns None until the PTR answer arrives"""
+        release = threading.Event()
+        def ptr(address):
+            release.wait(5)
+            return "host.test"
+        with Resolver(reverse_lookup=ptr) as resolver:
+            resolver.reverse(["192.0.2.10"])
+            self.assertIsNone(resolver.reverse_name("192.0.2.10"))
+            self.assertIsNone(resolver.reverse_name("192.0.2.99"))
+            release.set()
+            self.assertEqual(resolver.reverse_name("192.0.2.10", timeout=5), "host.test")
+    
+    def test_failed_reverse_lookup_gives_none(self):
+        """Test that addresses without PTR records report no name"""
+        def ptr(address):
+            raise socket.herror(1, "Unknown host")
+        with Resolver(reverse_lookup=ptr) as resolver:
+            resolver.reverse(["192.0.2.10"])
+            self.assertIsNone(resolver.reverse_name("192.0.2.10", timeout=5))
+
+if __name__ == '__main__':
+    unittest.main()
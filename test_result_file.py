@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from exporters import read_binary
+from result_file import ResultFile, ResultFileWriter, convert, iter_results
+from scan_engine import CLOSED, FILTERED, OPEN, ProbeResult
+import scan_cli
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+RESULTS = [
+    ProbeResult("127.0.0.1", 22, OPEN, 0.0015, ""),
+    ProbeResult("::1", 22, CLOSED, 0.0002, ""),
+    ProbeResult("127.0.0.1", 53, "open|filtered", 1.0, "", "udp"),
+    ProbeResult("10.0.0.1", 443, FILTERED, 0.5, ""),
+    ProbeResult("::1", 80, OPEN, 0.25, ""),
+]
+
+class TestResultFile(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "results.psr")
+        # A tiny capacity makes the writer grow its map several times
+        with ResultFileWriter(self.path, capacity=2) as writer:
+            for result in RESULTS:
+                writer.write(result)
+    
+    def test_round_trip(self):
+        """Test that records read back equal to what was written"""
+        with ResultFile(self.path) as results:
+            self.assertEqual(len(results), 5)
+            self.assertEqual(list(results), RESULTS)
+            self.assertEqual(results[-1], RESULTS[-1])
+            self.assertEqual(results.hosts, ["127.0.0.1", "::1", "10.0.0.1"])
+            with self.assertRaises(IndexError):
+                results[5]
+        # Header, 12-byte records, host table; no preallocated slack left behind
+        self.assertEqual(os.path.getsize(self.path), 64 + 5 * 12 + len("127.0.0.1\n::1\n10.0.0.1"))
+    
+    def test_columns_are_views(self):
+        """Test that column() returns strided memoryviews over the mapped file"""
+        with ResultFile(self.path) as results:
+            ports = results.column("port")
+            self.assertIsInstance(ports, memoryview)
+            self.assertEqual(ports.tolist(), [22, 22, 53, 443, 80])
+            self.assertEqual(results.column("host").tolist(), [0, 1, 0, 2, 1])
+            self.assertEqual(results.column("latency_us").tolist(), [1500, 200, 1000000, 500000, 250000])
+            self.assertEqual(results.column("flags").tolist(), [0, 0, 1, 0, 0])
+    
+    def test_select(self):
+        """Test filtering by port, status and host, alone and combined"""
+        with ResultFile(self.path) as results:
+            self.assertEqual(list(results.select(port=22)), [0, 1])
+            self.assertEqual(list(results.select(status=OPEN)), [0, 4])
+            self.assertEqual(list(results.select(port=22, status=OPEN)), [0])
+            self.assertEqual(list(results.select(host="::1")), [1, 4])
+            self.assertEqual(list(results.select()), [0, 1, 2, 3, 4])
+    
+    @unittest.skipIf(numpy is None, "numpy not installed")
+    def test_as_array(self):
+        """Test the numpy structured view of the records"""
+        with ResultFile(self.path) as results:
+            array = results.as_array()
+            self.assertEqual(int((array["port"] == 22).sum()), 2)
+            del array
+    
+    def test_rejects_other_files(self):
+        """Test that files without the result file header are refused"""
+        other = os.path.join(self.directory, "other.psr")
+        with open(other, "wb") as f:
+            f.write(b"x" * 100)
+        with self.assertRaises(ValueError):
+            ResultFile(other)
+    
+    def test_convert_between_formats(self):
+        """Test conversion to binary and JSONL exporter output and back to a result file"""
+        binary = os.path.join(self.directory, "results.bin")
+        jsonl = os.path.join(self.directory, "results.jsonl.gz")
+        back = os.path.join(self.directory, "back.psr")
+        self.assertEqual(convert(self.path, binary, "binary"), 5)
+        with open(binary, "rb") as f:
+            self.assertEqual(list(read_binary(f)), RESULTS)
+        self.assertEqual(convert(binary, jsonl), 5)
+        self.assertEqual(convert(jsonl, back), 5)
+        self.assertEqual(list(iter_results(back)), RESULTS)
+        with open(self.path, "rb") as original, open(back, "rb") as converted:
+            self.assertEqual(original.read(), converted.read())
+    
+    def test_cli_records_output(self):
+        """Test that scan_cli writes a result file with -f records and refuses stdout"""
+        path = os.path.join(self.directory, "scan.psr")
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            self.assertEqual(scan_cli.main(["127.0.0.1", "-p", "24090-24099", "-t", "0.2",
+                                            "--engine", "concurrent", "--all", "-o", path]), 0)
+            self.assertEqual(scan_cli.main(["127.0.0.1", "-f", "records"]), 2)
+        with ResultFile(path) as results:
+            self.assertEqual(sorted(results.column("port").tolist()), list(range(24090, 24100)))
+
+if __name__ == '__main__':
+    unittest.main()
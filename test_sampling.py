@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+import random
+import unittest
+from port_scanner import PortScanner
+from sampling import SamplingScanner, wilson_interval
+from scan_engine import ScanEngine
+from test_server import TestServer
+
+class FakeHost:
+    """Answers probes from a fixed set of open ports instead of the network"""
+    
+    def __init__(self, open_ports):
+        self.open_ports = set(open_ports)
+    
+    def probe(self, target, ports, timeout):
+        return sorted(port for port in ports if port in self.open_ports)
+
+def sampler_for(open_ports, **options):
+    scanner = PortScanner()
+    scanner.scanning = True
+    sampler = SamplingScanner(scanner, **options)
+    sampler.probe = FakeHost(open_ports).probe
+    return sampler
+
+class TestSampling(unittest.TestCase):
+    
+    def test_wilson_interval(self):
+        """Test the interval against known values, including zero successes"""
+        low, high = wilson_interval(0, 10)
+        self.assertEqual(low, 0.0)
+        self.assertAlmostEqual(high, 0.2775, places=4)
+        low, high = wilson_interval(5, 10)
+        self.assertAlmostEqual(low, 0.2366, places=4)
+        self.assertAlmostEqual(high, 0.7634, places=4)
+    
+    def test_plan_stratifies_by_common_ports(self):
+        """Test that common ports are all probed and the rest sampled at the rate"""
+        sampler = sampler_for([], rate=0.01, min_sample=64, seed=1)
+        common, other = sampler.plan(1, 10000)
+        self.assertEqual(common.sample, sorted(port for port in sampler.scanner.common_ports
+                                               if port <= 10000))
+        self.assertEqual(len(other.sample), 100)
+        self.assertTrue(set(other.sample) <= set(other.ports))
+        self.assertFalse(set(other.sample) & set(common.ports))
+        # Small strata fall back to min_sample
+        self.assertEqual(len(sampler.plan(20000, 20999)[0].sample), 64)
+    
+    def test_quiet_host_is_estimated_not_escalated(self):
+        """Test that a host with only common ports open gets an exact count there and a bound elsewhere"""
+        sampler = sampler_for([22, 80, 443], rate=0.02, seed=2)
+        estimate = sampler.scan_host("10.0.0.1", 1, 65535)
+        self.assertFalse(estimate.escalated)
+        self.assertEqual(estimate.open_ports, [22, 80, 443])
+        self.assertEqual(estimate.estimate, 3)
+        self.assertEqual(estimate.low, 3)
+        self.assertGreater(estimate.high, 3)
+        self.assertLess(estimate.probed * 40, estimate.ports)
+    
+    def test_unexpected_open_port_escalates(self):
+        """Test that an uncommon open port in the sample triggers a full scan"""
+        open_ports = [22] + list(range(30000, 30200))
+        sampler = sampler_for(open_ports, rate=0.05, seed=3)
+        estimate = sampler.scan_host("10.0.0.1", 1, 65535)
+        self.assertTrue(estimate.escalated)
+        self.assertEqual(estimate.open_ports, open_ports)
+        self.assertEqual((estimate.estimate, estimate.low, estimate.high), (201, 201, 201))
+        self.assertEqual(estimate.probed, 65535)
+        
+        sampler = sampler_for(open_ports, rate=0.05, seed=3, escalate=False)
+        self.assertFalse(sampler.scan_host("10.0.0.1", 1, 65535).escalated)
+    
+    def test_interval_coverage(self):
+        """Test that the confidence interval covers the true count in most runs"""
+        rng = random.Random(4)
+        covered = 0
+        for run in range(200):
+            open_ports = rng.sample(range(1025, 20001), 150)
+            sampler = sampler_for(open_ports, rate=0.05, escalate=False, seed=run)
+            estimate = sampler.scan_host("10.0.0.1", 1, 20000)
+            covered += estimate.low <= 150 <= estimate.high
+        self.assertGreaterEqual(covered, 180)
+
+class TestSamplingScan(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = TestServer(verbose=False)
+        cls.server.start_port_range(24700, 3, "Sampled")
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop_all_servers()
+    
+    def test_max_open_escalation_finds_every_port(self):
+        """Test a real sampled scan escalating on its upper bound"""
+        scanner = PortScanner()
+        scanner.scanning = True
+        sampler = SamplingScanner(scanner, ScanEngine(scanner), rate=0.1, min_sample=10,
+                                  max_open=0.5, seed=5)
+        estimates = sampler.scan(["127.0.0.1"], 24650, 24849, 0.5)
+        self.assertEqual(len(estimates), 1)
+        self.assertTrue(estimates[0].escalated)
+        self.assertEqual(estimates[0].open_ports, [24700, 24701, 24702])
+        self.assertEqual(sampler.stats["probes"], 200)
+
+if __name__ == '__main__':
+    unittest.main()
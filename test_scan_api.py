@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+import http.client
+import json
+import socket
+import time
+import unittest
+from unittest.mock import patch
+from scan_api import ScanApiServer, ScanService, parse_request, ApiError
+from test_server import TestServer
+
+class TestScanApi(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.targets = TestServer(verbose=False)
+        cls.targets.start_port_range(24200, 3, "Api")
+        cls.targets.start_blackhole_server(24210)
+        cls.api = ScanApiServer(ScanService(max_concurrent=2, rate=5000), port=0)
+        cls.port = cls.api.start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.api.stop()
+        cls.targets.stop_all_servers()
+    
+    def request(self, method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=10)
+        connection.request(method, path, json.dumps(body) if body is not None else None,
+                           headers or {})
+        response = connection.getresponse()
+        data = response.read()
+        connection.close()
+        return response.status, response.getheader("Content-Type"), data
+    
+    def submit(self, **spec):
+        status, _, data = self.request("POST", "/scans", spec)
+        self.assertEqual(status, 202)
+        return json.loads(data)
+    
+    def wait_for(self, scan_id, states=("done", "cancelled", "failed")):
+        for _ in range(200):
+            status, _, data = self.request("GET", f"/scans/{scan_id}")
+            summary = json.loads(data)
+            if summary["state"] in states:
+                return summary
+            time.sleep(0.02)
+        self.fail(f"scan {scan_id} never reached {states}")
+    
+    def submit_to(self, port):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        connection.request("POST", "/scans", json.dumps({"targets": ["127.0.0.1"],
+                                                         "ports": "24200-24200", "timeout": 0.5}))
+        self.assertEqual(connection.getresponse().status, 202)
+        connection.close()
+    
+    def test_submit_and_poll(self):
+        """Test that a submitted scan runs to completion and reports its open ports"""
+        scan = self.submit(targets=["127.0.0.1"], ports="24195-24209", timeout=0.5)
+        self.assertEqual(scan["state"], "queued")
+        summary = self.wait_for(scan["id"])
+        self.assertEqual(summary["state"], "done")
+        self.assertEqual(summary["open"], 3)
+        self.assertEqual(summary["progress"], 100.0)
+        
+        status, _, data = self.request("GET", "/scans")
+        self.assertIn(scan["id"], [entry["id"] for entry in json.loads(data)])
+    
+    def test_stream_jsonl(self):
+        """Test that results stream as chunked JSONL until the scan finishes"""
+        scan = self.submit(targets="127.0.0.1", ports="24195-24210", timeout=0.3, all=True)
+        status, content_type, data = self.request("GET", f"/scans/{scan['id']}/results")
+        self.assertEqual(status, 200)
+        self.assertEqual(content_type, "application/x-ndjson")
+        results = [json.loads(line) for line in data.decode().splitlines()]
+        self.assertEqual(len(results), 16)
+        by_port = {result["port"]: result["status"] for result in results}
+        self.assertEqual(by_port[24200], "open")
+        self.assertEqual(by_port[24195], "closed")
+        self.assertEqual(by_port[24210], "filtered")
+    
+    def test_stream_sse(self):
+        """Test Server-Sent Events framing with a final end event"""
+        scan = self.submit(targets=["127.0.0.1"], ports="24200-24202", timeout=0.5)
+        status, content_type, data = self.request("GET", f"/scans/{scan['id']}/results?format=sse")
+        self.assertEqual(content_type, "text/event-stream")
+        events = [block.split("\n") for block in data.decode().strip().split("\n\n")]
+        self.assertEqual([event[0] for event in events], ["event: result"] * 3 + ["event: end"])
+        self.assertEqual(json.loads(events[-1][1][len("data: "):])["state"], "done")
+    
+    def test_cancel(self):
+        """Test that DELETE stops a running scan promptly and leaves others alone"""
+        slow = self.submit(targets=["127.0.0.1"], ports="24210-24210", timeout=5)
+        quick = self.submit(targets=["127.0.0.1"], ports="24200-24202", timeout=0.5)
+        self.wait_for(slow["id"], ("running",))
+        started = time.perf_counter()
+        status, _, data = self.request("DELETE", f"/scans/{slow['id']}")
+        self.assertEqual(status, 200)
+        self.assertEqual(self.wait_for(slow["id"])["state"], "cancelled")
+        self.assertLess(time.perf_counter() - started, 2)
+        self.assertEqual(self.wait_for(quick["id"])["open"], 3)
+        
+        # Deleting a finished scan forgets it
+        status, _, _ = self.request("DELETE", f"/scans/{slow['id']}")
+        self.assertEqual(status, 200)
+        self.assertEqual(self.request("GET", f"/scans/{slow['id']}")[0], 404)
+    
+    def test_errors(self):
+        """Test error responses for bad requests and unknown scans"""
+        status, _, data = self.request("POST", "/scans", {"ports": "1-10"})
+        self.assertEqual(status, 400)
+        self.assertIn("targets", json.loads(data)["error"])
+        self.assertEqual(self.request("GET", "/scans/999")[0], 404)
+        self.assertEqual(self.request("GET", "/nothing")[0], 404)
+        self.assertEqual(self.request("PUT", "/scans")[0], 405)
+    
+    def test_invalid_content_length(self):
+        """Test that a malformed or negative Content-Length is a 400, not a dropped connection"""
+        for length in (b"abc", b"-5"):
+            with socket.create_connection(("127.0.0.1", self.port), timeout=10) as connection:
+                connection.sendall(b"POST /scans HTTP/1.1\r\nHost: x\r\nContent-Length: " + length
+                                   + b"\r\n\r\n")
+                reply = b""
+                while chunk := connection.recv(4096):
+                    reply += chunk
+            head, _, body = reply.partition(b"\r\n\r\n")
+            self.assertTrue(head.startswith(b"HTTP/1.1 400"), head)
+            self.assertEqual(json.loads(body)["error"], "Invalid Content-Length")
+    
+    def test_worker_survives_unexpected_error(self):
+        """Test that an unexpected exception fails its scan and leaves the worker serving"""
+        with patch.object(ScanService, "_run", side_effect=RuntimeError("boom")), \
+                self.assertLogs("port_scanner.api", "ERROR"):
+            broken = self.submit(targets=["127.0.0.1"], ports="24200-24200", timeout=0.5)
+            summary = self.wait_for(broken["id"])
+        self.assertEqual(summary["state"], "failed")
+        self.assertEqual(summary["error"], "boom")
+        for _ in range(2):
+            scan = self.submit(targets=["127.0.0.1"], ports="24200-24202", timeout=0.5)
+            self.assertEqual(self.wait_for(scan["id"])["open"], 3)
+    
+    def test_finished_scans_evicted(self):
+        """Test that only the newest max_finished scans are kept, and expired ones are dropped"""
+        service = ScanService(max_concurrent=1, rate=5000, max_finished=2)
+        api = ScanApiServer(service, port=0)
+        api.start()
+        self.addCleanup(api.stop)
+        for _ in range(3):
+            self.submit_to(api.port)
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and list(service.scans) != ["2", "3"]:
+            time.sleep(0.02)
+        self.assertEqual(list(service.scans), ["2", "3"])
+        
+        service.finished_ttl = 0
+        self.submit_to(api.port)
+        self.assertNotIn("2", service.scans)
+        self.assertNotIn("3", service.scans)
+    
+    def test_parse_request(self):
+        """Test defaults and validation of scan requests"""
+        request = parse_request(b'{"targets": ["::1"], "ports": "22"}')
+        self.assertEqual(request["ports"], (22, 22))
+        self.assertEqual(request["protocol"], "tcp")
+        for body in (b"[1]", b"nope", b'{"targets": ["a"], "ports": "9-1"}',
+                     b'{"targets": ["a"], "protocol": "sctp"}'):
+            with self.assertRaises(ApiError):
+                parse_request(body)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+import select
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from port_scanner import PortScanner, PortScannerGUI
+from scan_control import CancelToken, PauseGate
+from scan_engine import ScanEngine
+from test_server import TestServer
+from udp_engine import UdpScanEngine
+
+def readable(obj):
+    return bool(select.select([obj], [], [], 0)[0])
+
+class TestScanControl(unittest.TestCase):
+    
+    def test_cancel_token(self):
+        """Test that a token behaves like an Event and its fileno becomes readable when set"""
+        token = CancelToken()
+        self.assertFalse(token.is_set())
+        self.assertFalse(readable(token))
+        token.set()
+        token.set()
+        self.assertTrue(token.is_set())
+        self.assertTrue(token.wait(0))
+        self.assertTrue(readable(token))
+    
+    def test_pause_gate_signals(self):
+        """Test that the gate's fileno is readable exactly while paused"""
+        gate = PauseGate()
+        self.assertTrue(gate.wait(timeout=0))
+        gate.pause()
+        gate.pause()
+        self.assertTrue(gate.paused)
+        self.assertTrue(readable(gate))
+        self.assertFalse(gate.wait(timeout=0.05))
+        gate.resume()
+        self.assertFalse(readable(gate))
+        self.assertTrue(gate.wait(timeout=0))
+    
+    def test_pause_gate_wait_wakes(self):
+        """Test that a paused wait returns on resume or on any cancel, including plain Events"""
+        gate = PauseGate()
+        gate.pause()
+        threading.Timer(0.05, gate.resume).start()
+        self.assertTrue(gate.wait(timeout=2))
+        
+        gate.pause()
+        for cancel in (CancelToken(), threading.Event()):
+            threading.Timer(0.05, cancel.set).start()
+            started = time.monotonic()
+            self.assertFalse(gate.wait(cancel, timeout=2))
+            self.assertLess(time.monotonic() - started, 1)
+    
+    def test_scanning_flag_drives_the_token(self):
+        """Test that clearing scanning sets the current token and restarting issues a new one"""
+        scanner = PortScanner()
+        self.assertFalse(scanner.scanning)
+        scanner.scanning = True
+        token = scanner.cancel_token
+        scanner.scanning = True
+        self.assertIs(scanner.cancel_token, token)
+        scanner.scanning = False
+        self.assertTrue(token.is_set())
+        scanner.scanning = True
+        self.assertIsNot(scanner.cancel_token, token)
+        self.assertTrue(scanner.scanning)
+
+class TestEngineControl(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = TestServer(verbose=False)
+        cls.server.start_port_range(24500, 3, "Control")
+        cls.server.start_blackhole_server(24510)
+        cls.server.start_udp_server(24520, "Silent", silent=True)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop_all_servers()
+    
+    def setUp(self):
+        self.scanner = PortScanner()
+        self.scanner.scanning = True
+        self.addCleanup(self.scanner.pause_gate.resume)
+    
+    def run_in_thread(self, func, *args, **kwargs):
+        thread = threading.Thread(target=func, args=args, kwargs=kwargs, daemon=True)
+        thread.start()
+        return thread
+    
+    def test_stop_is_immediate(self):
+        """Test that stopping wakes engines blocked on slow probes instead of waiting out the timeout"""
+        tcp = ScanEngine(self.scanner)
+        udp = UdpScanEngine(self.scanner, rate=1000, retransmits=0)
+        threads = [self.run_in_thread(tcp.scan, ["127.0.0.1"], [24510], 10),
+                   self.run_in_thread(udp.scan, ["127.0.0.1"], [24520], 10)]
+        time.sleep(0.2)
+        started = time.monotonic()
+        self.scanner.scanning = False
+        for thread in threads:
+            thread.join(2)
+            self.assertFalse(thread.is_alive())
+        self.assertLess(time.monotonic() - started, 0.5)
+    
+    def test_pause_requeues_and_resume_completes(self):
+        """Test that a pause hands in-flight probes back and resume still reports every port once"""
+        results = []
+        engine = ScanEngine(self.scanner, max_in_flight=8)
+        thread = self.run_in_thread(engine.scan, ["127.0.0.1"], range(24500, 24511), 1.0,
+                                    result_callback=results.append, open_only=False)
+        time.sleep(0.2)
+        self.scanner.pause_gate.pause()
+        time.sleep(0.1)
+        self.assertEqual(engine.stats["pauses"], 1)
+        # The blackholed probe was in flight; it is queued again, not reported
+        self.assertNotIn(24510, [result.port for result in results])
+        self.scanner.pause_gate.resume()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(sorted(result.port for result in results), list(range(24500, 24511)))
+        self.assertEqual(sorted(result.port for result in results if result.status == "open"),
+                         [24500, 24501, 24502])
+    
+    def test_udp_pause_and_resume(self):
+        """Test that the UDP engine requeues silent probes while paused"""
+        results = []
+        engine = UdpScanEngine(self.scanner, rate=1000, retransmits=0)
+        thread = self.run_in_thread(engine.scan, ["127.0.0.1"], [24520], 0.5,
+                                    result_callback=results.append, open_only=False)
+        time.sleep(0.1)
+        self.scanner.pause_gate.pause()
+        time.sleep(0.6)
+        self.assertEqual(results, [])
+        self.scanner.pause_gate.resume()
+        thread.join(5)
+        self.assertEqual([result.status for result in results], ["open|filtered"])
+        self.assertEqual(engine.stats["probes"], 2)
+    
+    def test_serial_scan_waits_while_paused(self):
+        """Test that scan_range holds between ports while paused and stops promptly"""
+        found = []
+        self.scanner.pause_gate.pause()
+        thread = self.run_in_thread(self.scanner.scan_range, "127.0.0.1", 24500, 24502, 0.5,
+                                    lambda value: None, lambda port, service: found.append(port))
+        time.sleep(0.1)
+        self.assertEqual(found, [])
+        self.scanner.scanning = False
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(found, [])
+
+class TestGuiPause(unittest.TestCase):
+    
+    def test_pause_button_toggles_the_gate(self):
+        """Test that the Pause button pauses the scanner's gate and relabels itself"""
+        gui = PortScannerGUI.__new__(PortScannerGUI)
+        gui.scanner = PortScanner()
+        gui.pause_button = MagicMock()
+        gui.status_label = MagicMock()
+        gui.log_message = MagicMock()
+        
+        gui.toggle_pause()
+        self.assertTrue(gui.scanner.pause_gate.paused)
+        gui.pause_button.config.assert_called_with(text="Resume")
+        gui.toggle_pause()
+        self.assertFalse(gui.scanner.pause_gate.paused)
+        gui.pause_button.config.assert_called_with(text="Pause")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import MagicMock
+from exporters import JsonlExporter, open_output
+from port_scanner import PortScanner, PortScannerGUI
+from result_file import ResultFileWriter
+from scan_diff import (ADDED, CHANGED, REMOVED, DiffEvent, ScanSnapshot, diff_snapshots,
+                       format_event, iter_bits, main)
+from scan_engine import CLOSED, OPEN, ProbeResult
+
+YESTERDAY = [
+    ProbeResult("10.0.0.1", 22, OPEN, 0.0, "SSH"),
+    ProbeResult("10.0.0.1", 80, OPEN, 0.0, "HTTP"),
+    ProbeResult("10.0.0.1", 443, CLOSED, 0.0, "HTTPS"),
+    ProbeResult("10.0.0.2", 3306, OPEN, 0.0, "MySQL"),
+    ProbeResult("10.0.0.2", 53, OPEN, 0.0, "DNS", "udp"),
+]
+
+TODAY = [
+    ProbeResult("10.0.0.1", 22, OPEN, 0.0, "SSH"),
+    ProbeResult("10.0.0.1", 80, OPEN, 0.0, "nginx"),
+    ProbeResult("10.0.0.1", 443, OPEN, 0.0, "HTTPS"),
+    ProbeResult("10.0.0.2", 53, OPEN, 0.0, "DNS", "udp"),
+    ProbeResult("10.0.0.3", 8080, OPEN, 0.0, "HTTP-Alt"),
+]
+
+class TestScanDiff(unittest.TestCase):
+    
+    def test_iter_bits(self):
+        """Test that set bits come back as positions in ascending order"""
+        self.assertEqual(list(iter_bits(0)), [])
+        self.assertEqual(list(iter_bits((1 << 65535) | (1 << 80) | 2)), [1, 80, 65535])
+    
+    def test_snapshot_keeps_open_ports_only(self):
+        """Test that snapshots hold one bitmap per host and protocol"""
+        snapshot = ScanSnapshot.from_results(YESTERDAY)
+        self.assertEqual(len(snapshot), 4)
+        self.assertEqual(snapshot.open_ports("10.0.0.1"), [22, 80])
+        self.assertEqual(snapshot.open_ports("10.0.0.2", "udp"), [53])
+    
+    def test_diff_events(self):
+        """Test added, removed and changed-service events in host and port order"""
+        events = list(diff_snapshots(ScanSnapshot.from_results(YESTERDAY),
+                                     ScanSnapshot.from_results(TODAY)))
+        self.assertEqual(events, [
+            DiffEvent(CHANGED, "10.0.0.1", 80, "tcp", "HTTP", "nginx"),
+            DiffEvent(ADDED, "10.0.0.1", 443, "tcp", None, "HTTPS"),
+            DiffEvent(REMOVED, "10.0.0.2", 3306, "tcp", "MySQL", None),
+            DiffEvent(ADDED, "10.0.0.3", 8080, "tcp", None, "HTTP-Alt"),
+        ])
+        self.assertEqual([format_event(event)[0] for event in events], ["~", "+", "-", "+"])
+    
+    def test_identical_runs_have_no_events(self):
+        """Test that comparing a run with itself yields nothing"""
+        snapshot = ScanSnapshot.from_results(TODAY)
+        self.assertEqual(list(diff_snapshots(snapshot, snapshot)), [])
+    
+    def test_restrict(self):
+        """Test limiting a baseline to the hosts, ports and protocol of a live scan"""
+        snapshot = ScanSnapshot.from_results(YESTERDAY).restrict(["10.0.0.1", "10.0.0.2"], 1, 100, "tcp")
+        self.assertEqual(snapshot.bitmaps, {("10.0.0.1", "tcp"): (1 << 22) | (1 << 80)})
+        self.assertEqual(set(snapshot.services), {("10.0.0.1", "tcp", 22), ("10.0.0.1", "tcp", 80)})
+    
+    def test_diff_across_file_formats(self):
+        """Test the scan_diff CLI comparing a JSONL export with a result file"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        baseline = os.path.join(directory, "yesterday.jsonl")
+        current = os.path.join(directory, "today.psr")
+        with JsonlExporter(open_output(baseline)) as exporter:
+            for result in YESTERDAY:
+                exporter.write(result)
+        with ResultFileWriter(current) as writer:
+            for result in TODAY:
+                writer.write(result)
+        
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(main([baseline, current]), 1)
+        # Result files carry no service names, so only open/closed changes show
+        self.assertEqual(output.getvalue().splitlines(), [
+            "+ 10.0.0.1 443/tcp", "- 10.0.0.2 3306/tcp MySQL", "+ 10.0.0.3 8080/tcp"])
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(main([baseline, baseline]), 0)
+
+class TestGuiHighlighting(unittest.TestCase):
+    
+    def test_changes_are_highlighted(self):
+        """Test that the GUI tags new and changed rows and adds rows for closed ports"""
+        gui = PortScannerGUI.__new__(PortScannerGUI)
+        gui.scanner = PortScanner()
+        gui.results_tree = MagicMock()
+        gui.results_tree.insert.side_effect = lambda *args, **kwargs: f"row{kwargs['values'][0]}"
+        gui.log_message = MagicMock()
+        gui.baseline = ScanSnapshot.from_results(YESTERDAY[:2])
+        gui.current = ScanSnapshot()
+        gui.current_target = "10.0.0.1"
+        gui.result_rows = {}
+        
+        gui.add_result(80, "nginx")
+        gui.add_result(443, "HTTPS")
+        gui.results_tree.reset_mock()
+        self.assertEqual(gui.show_changes("10.0.0.1", 1, 1000), 3)
+        
+        tagged = {call.args[0]: call.kwargs["tags"] for call in gui.results_tree.item.call_args_list}
+        self.assertEqual(tagged, {"row80": (CHANGED,), "row443": (ADDED,)})
+        inserted = gui.results_tree.insert.call_args
+        self.assertEqual(inserted.kwargs["values"], (22, "SSH", "Closed (was open)"))
+        self.assertEqual(inserted.kwargs["tags"], (REMOVED,))
+
+if __name__ == '__main__':
+    unittest.main()
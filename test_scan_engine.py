@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+
+import errno
+import socket
+import time
+import unittest
+from unittest.mock import patch
+from fd_budget import FdBudget
+from port_scanner import PortScanner
+from rate_limit import TokenBucket
+import scan_engine
+from scan_engine import CLOSED, FILTERED, OPEN, RetryPolicy, ScanEngine, classify
+from test_server import TestServer
+
+class TestScanEngine(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = TestServer(verbose=False)
+        cls.server.start_port_range(24000, 5, "Engine")
+        cls.server.start_blackhole_server(24010)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop_all_servers()
+    
+    def setUp(self):
+        self.scanner = PortScanner()
+        self.scanner.scanning = True
+        self.progress = []
+    
+    def test_scan_range_matches_serial_results(self):
+        """Test that the concurrent engine finds the same open ports as scan_range"""
+        engine = ScanEngine(self.scanner, max_in_flight=16)
+        found = []
+        open_ports = engine.scan_range("127.0.0.1", 23990, 24009, 0.5,
+                                       self.progress.append, lambda port, service: found.append(port))
+        
+        self.assertEqual([port for port, service in open_ports], list(range(24000, 24005)))
+        self.assertEqual(sorted(found), list(range(24000, 24005)))
+        self.assertAlmostEqual(self.progress[-1], 100.0)
+    
+    def test_statuses_reported_for_all_probes(self):
+        """Test open, closed and filtered classification with open_only=False"""
+        results = {}
+        engine = ScanEngine(self.scanner, max_in_flight=4)
+        engine.scan(["127.0.0.1"], [24000, 24008, 24010], 0.2,
+                    result_callback=lambda result: results.__setitem__(result.port, result.status),
+                    open_only=False)
+        self.assertEqual(results, {24000: OPEN, 24008: CLOSED, 24010: FILTERED})
+    
+    def test_stop_flag_ends_scan(self):
+        """Test that clearing scanning stops the engine and closes sockets"""
+        self.scanner.scanning = False
+        engine = ScanEngine(self.scanner)
+        self.assertEqual(engine.scan(["127.0.0.1"], range(24000, 24005), 0.5), [])
+    
+    def test_fd_exhaustion_is_backpressure_not_closed(self):
+        """Test that EMFILE requeues probes instead of reporting the port closed"""
+        real_socket = socket.socket
+        failures = iter([True, True, False] * 3)
+        
+        def flaky_socket(*args, **kwargs):
+            if 'fileno' not in kwargs and next(failures, False):
+                raise OSError(errno.EMFILE, "Too many open files")
+            return real_socket(*args, **kwargs)
+        
+        engine = ScanEngine(self.scanner, max_in_flight=8)
+        with patch('socket.socket', flaky_socket):
+            open_ports = engine.scan_range("127.0.0.1", 24000, 24004, 0.5,
+                                           lambda value: None, lambda port, service: None)
+        self.assertEqual(len(open_ports), 5)
+        self.assertGreater(engine.stats["fd_backpressure"], 0)
+    
+    def test_rate_tokens_spent_only_on_probes(self):
+        """Test that every rate token taken starts a probe, none are burned on an empty queue"""
+        taken = []
+        
+        class CountingBucket(TokenBucket):
+            def try_acquire(self, tokens=1):
+                wait = super().try_acquire(tokens)
+                if not wait:
+                    taken.append(tokens)
+                return wait
+        
+        engine = ScanEngine(self.scanner, max_in_flight=4, rate_limiter=CountingBucket(500, burst=2))
+        results = []
+        engine.scan(["127.0.0.1"], range(23995, 24005), 0.5, result_callback=results.append,
+                    open_only=False)
+        self.assertEqual(len(results), 10)
+        self.assertGreater(engine.stats["rate_waits"], 0)
+        self.assertEqual(len(taken), engine.stats["probes"])
+    
+    def test_classify(self):
+        """Test errno to status mapping"""
+        self.assertEqual(classify(0), OPEN)
+        self.assertEqual(classify(errno.ECONNREFUSED), CLOSED)
+        self.assertEqual(classify(errno.ETIMEDOUT), FILTERED)
+
+class TestFdBudget(unittest.TestCase):
+    
+    def test_window_clamped_to_available_descriptors(self):
+        """Test that the in-flight window never exceeds the remaining budget"""
+        budget = FdBudget(reserve=10)
+        with patch('fd_budget.get_fd_limits', return_value=(100, 1000)), \
+             patch('fd_budget.count_open_fds', return_value=40):
+            self.assertEqual(budget.available(), 50)
+            self.assertEqual(budget.window(1000), 50)
+            self.assertEqual(budget.window(8), 8)
+        with patch('fd_budget.get_fd_limits', return_value=(100, 1000)), \
+             patch('fd_budget.count_open_fds', return_value=200):
+            self.assertEqual(budget.window(1000), 1)
+    
+    def test_backoffs_bounded_by_max_wait(self):
+        """Test that backoff intervals sum to at most max_wait"""
+        budget = FdBudget(max_wait=1.0)
+        self.assertAlmostEqual(sum(budget.backoffs()), 1.0)
+    
+    @patch('time.sleep')
+    def test_scan_port_waits_out_emfile(self, mock_sleep):
+        """Test that scan_port retries after EMFILE rather than reporting closed"""
+        scanner = PortScanner()
+        real_socket = socket.socket
+        calls = []
+        
+        def flaky_socket(*args, **kwargs):
+            if 'fileno' in kwargs:  # accept() on the test server's side
+                return real_socket(*args, **kwargs)
+            calls.append(1)
+            if len(calls) < 3:
+                raise OSError(errno.EMFILE, "Too many open files")
+            return real_socket(*args, **kwargs)
+        
+        server = TestServer(verbose=False)
+        server.start_server(24020, "Fd")
+        try:
+            with patch('socket.socket', flaky_socket):
+                self.assertTrue(scanner.scan_port("127.0.0.1", 24020, timeout=1))
+        finally:
+            server.stop_all_servers()
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+    
+    @patch('time.sleep')
+    def test_scan_port_raises_when_budget_never_recovers(self, mock_sleep):
+        """Test that persistent EMFILE surfaces as an error, not a closed port"""
+        scanner = PortScanner()
+        scanner.fd_budget = FdBudget(max_wait=0.05)
+        with patch('socket.socket', side_effect=OSError(errno.EMFILE, "Too many open files")):
+            with self.assertRaises(OSError):
+                scanner.scan_port("127.0.0.1", 80)
+
+class TestRetryPolicy(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = TestServer(verbose=False)
+        cls.server.start_port_range(24020, 3, "Retry")
+        cls.server.start_blackhole_server(24030)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop_all_servers()
+    
+    def setUp(self):
+        self.scanner = PortScanner()
+        self.scanner.scanning = True
+    
+    def test_backoff_grows_and_is_capped(self):
+        """Test exponential delays, the max_backoff cap and the jitter bounds"""
+        policy = RetryPolicy(backoff=0.1, multiplier=2, max_backoff=0.3, jitter=0)
+        self.assertEqual([round(policy.delay(n), 3) for n in (1, 2, 3, 4)], [0.1, 0.2, 0.3, 0.3])
+        
+        jittered = RetryPolicy(backoff=1.0, jitter=0.5, seed=7)
+        delays = [jittered.delay(1) for _ in range(50)]
+        self.assertTrue(all(0.5 <= delay <= 1.5 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+    
+    def test_only_listed_statuses_are_retried(self):
+        """Test that should_retry honours statuses and max_attempts"""
+        policy = RetryPolicy(max_attempts=2)
+        self.assertTrue(policy.should_retry(FILTERED, 1))
+        self.assertFalse(policy.should_retry(FILTERED, 2))
+        self.assertFalse(policy.should_retry(CLOSED, 1))
+        self.assertFalse(policy.should_retry(OPEN, 1))
+        with self.assertRaises(ValueError):
+            RetryPolicy(max_attempts=0)
+    
+    def test_filtered_port_is_retried_without_stalling_others(self):
+        """Test that retries are rescheduled while other probes keep completing"""
+        finished = []
+        engine = ScanEngine(self.scanner, max_in_flight=4,
+                            retry_policy=RetryPolicy(max_attempts=3, backoff=0.1, jitter=0))
+        engine.scan(["127.0.0.1"], [24030, 24020, 24021, 24022], 0.2,
+                    result_callback=lambda result: finished.append((result.port, result.status,
+                                                                    time.perf_counter())),
+                    open_only=False)
+        
+        self.assertEqual([(port, status) for port, status, _ in finished],
+                         [(24020, OPEN), (24021, OPEN), (24022, OPEN), (24030, FILTERED)])
+        self.assertEqual(engine.stats["retries"], 2)
+        self.assertEqual(engine.stats["flipped"], 0)
+        # Three 0.2s attempts with 0.1s and 0.2s backoffs in between
+        self.assertGreaterEqual(finished[-1][2] - finished[0][2], 0.8)
+    
+    def test_flipped_results_are_counted(self):
+        """Test that a dropped first probe is retried and counted as flipped"""
+        losses = iter([True, True])
+        real_classify = scan_engine.classify
+        
+        def lossy_classify(code):
+            # The first two answers behave as if their SYN had been lost
+            if code in (0, errno.ECONNREFUSED) and next(losses, False):
+                return FILTERED
+            return real_classify(code)
+        
+        engine = ScanEngine(self.scanner, retry_policy=RetryPolicy(backoff=0.01))
+        with patch('scan_engine.classify', lossy_classify):
+            results = engine.scan(["127.0.0.1"], [24020, 24021, 24025], 0.2)
+        self.assertEqual(sorted(result.port for result in results), [24020, 24021])
+        self.assertEqual(engine.stats["retries"], 2)
+        self.assertEqual(engine.stats["flipped"], 2)
+    
+    def test_without_policy_nothing_is_retried(self):
+        """Test that the default engine reports a filtered port after one probe"""
+        engine = ScanEngine(self.scanner)
+        engine.scan(["127.0.0.1"], [24030], 0.2, open_only=False)
+        self.assertEqual(engine.stats["retries"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+import errno
+import io
+import json
+import logging
+import queue
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest.mock import MagicMock
+import scan_cli
+from port_scanner import PortScanner, PortScannerGUI, panel_log
+from scan_engine import ScanEngine
+from scan_log import (DeferredQueueHandler, JsonFormatter, LogSetup, TraceRing, configure_logging,
+                      parse_levels)
+from test_server import TestServer
+
+class TestLogSetup(unittest.TestCase):
+    
+    def test_parse_levels(self):
+        """Test overall and per-subsystem level specs"""
+        self.assertEqual(parse_levels("info"), {"port_scanner": "INFO"})
+        self.assertEqual(parse_levels("warning, engine=debug,gui=info"),
+                         {"port_scanner": "WARNING", "port_scanner.engine": "DEBUG",
+                          "port_scanner.gui": "INFO"})
+        for spec in ("loud", "engine=loud", "network=debug"):
+            with self.assertRaises(ValueError):
+                parse_levels(spec)
+    
+    def test_json_formatter_keeps_extra_fields(self):
+        """Test that extra= fields become keys of the JSON object"""
+        record = logging.LogRecord("port_scanner.engine", logging.DEBUG, __file__, 1,
+                                   "%s:%d open", ("10.0.0.1", 22), None)
+        record.port = 22
+        data = json.loads(JsonFormatter().format(record))
+        self.assertEqual(data["message"], "10.0.0.1:22 open")
+        self.assertEqual(data["logger"], "port_scanner.engine")
+        self.assertEqual(data["port"], 22)
+    
+    def test_deferred_handler_does_not_format(self):
+        """Test that records are queued with their message still unbuilt"""
+        records = queue.SimpleQueue()
+        handler = DeferredQueueHandler(records)
+        record = logging.LogRecord("port_scanner", logging.INFO, __file__, 1, "%d probes", (5,), None)
+        handler.emit(record)
+        queued = records.get_nowait()
+        self.assertIs(queued, record)
+        self.assertEqual(queued.args, (5,))
+        self.assertFalse(hasattr(queued, "message"))
+    
+    def test_close_restores_loggers(self):
+        """Test that closing a setup removes its handlers and restores levels"""
+        engine_log = logging.getLogger("port_scanner.engine")
+        before = engine_log.level
+        output = io.StringIO()
+        with LogSetup(parse_levels("warning,engine=info"), output):
+            self.assertEqual(engine_log.level, logging.INFO)
+            engine_log.info("queued")
+        self.assertEqual(engine_log.level, before)
+        self.assertEqual(logging.getLogger("port_scanner").handlers, [])
+        self.assertIn("INFO port_scanner.engine: queued", output.getvalue())
+
+class TestEngineLogging(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = TestServer(verbose=False)
+        cls.server.start_port_range(24960, 2, "Log")
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop_all_servers()
+    
+    def scan(self, scanner):
+        scanner.scanning = True
+        return ScanEngine(scanner, max_in_flight=8).scan(["127.0.0.1"], range(24960, 24964), 0.5)
+    
+    def test_debug_logs_each_probe_as_json(self):
+        """Test that engine debug logging writes one structured record per probe"""
+        output = io.StringIO()
+        logs = configure_logging("warning,engine=debug", output, structured=True)
+        try:
+            self.assertEqual(len(self.scan(PortScanner())), 2)
+        finally:
+            logs.close()
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        probes = {record["port"]: record["status"] for record in records if "port" in record}
+        self.assertEqual(probes, {24960: "open", 24961: "open", 24962: "closed", 24963: "closed"})
+    
+    def test_trace_ring_records_probes(self):
+        """Test that an attached ring sees every probe, and detaching removes its hooks"""
+        scanner = PortScanner()
+        ring = TraceRing(64).attach(scanner)
+        self.scan(scanner)
+        ring.detach()
+        self.assertEqual(scanner._hooks, {})
+        outcomes = {port: outcome for _, host, port, outcome in ring.events()}
+        self.assertEqual(outcomes, {24960: "connected", 24961: "connected",
+                                    24962: "ECONNREFUSED", 24963: "ECONNREFUSED"})
+        self.assertIn("127.0.0.1:24962 ECONNREFUSED", "\n".join(ring.format_events()))
+
+class TestTraceRing(unittest.TestCase):
+    
+    def test_ring_keeps_last_events(self):
+        """Test that the ring wraps around, keeping the newest probes in order"""
+        ring = TraceRing(4)
+        for port in range(1, 11):
+            ring.record("10.0.0.1", port, 0)
+        self.assertEqual(len(ring.buffer), 4 * 16)
+        self.assertEqual([event[2] for event in ring.events()], [7, 8, 9, 10])
+        lines = ring.format_events()
+        self.assertEqual(lines[0], "Last 4 of 10 probes (seconds before the last):")
+        self.assertTrue(lines[-1].endswith("10.0.0.1:10 connected"))
+        ring.record("10.0.0.2", 53, errno.ETIMEDOUT)
+        self.assertTrue(ring.format_events()[-1].endswith("10.0.0.2:53 ETIMEDOUT"))
+        self.assertEqual(TraceRing().format_events(), ["No probes traced"])
+    
+    def test_dump_on_error(self):
+        """Test that an error dumps the ring once, and not again until new probes arrive"""
+        ring = TraceRing(8)
+        ring.record("10.0.0.1", 22, 0)
+        output = io.StringIO()
+        with LogSetup(stream=output, trace=ring):
+            logger = logging.getLogger("port_scanner.cli")
+            logger.warning("not dumped")
+            self.assertNotIn("10.0.0.1:22", output.getvalue())
+            logger.error("failed")
+            logger.error("failed again")
+            ring.record("10.0.0.1", 23, 111)
+            logger.critical("failed after a probe")
+        self.assertEqual(output.getvalue().count("10.0.0.1:22 connected"), 2)
+        self.assertEqual(output.getvalue().count("10.0.0.1:23 ECONNREFUSED"), 1)
+
+class TestLoggingFrontends(unittest.TestCase):
+    
+    def make_gui(self):
+        gui = PortScannerGUI.__new__(PortScannerGUI)
+        gui.root = MagicMock()
+        gui.log_text = MagicMock()
+        gui.attach_log_panel()
+        self.addCleanup(panel_log.removeHandler, gui.log_handler)
+        return gui
+    
+    def test_gui_log_drained_in_batches(self):
+        """Test that GUI messages are queued and shown together by the Tk thread"""
+        gui = self.make_gui()
+        gui.log_message("Scan started")
+        gui.log_message("Scan completed")
+        gui.log_text.insert.assert_not_called()
+        gui.drain_log()
+        gui.log_text.insert.assert_called_once()
+        text = gui.log_text.insert.call_args[0][1]
+        self.assertRegex(text, r"^\[\d\d:\d\d:\d\d\] Scan started\n\[\d\d:\d\d:\d\d\] Scan completed\n$")
+        gui.root.after.assert_called_once_with(100, gui.drain_log)
+    
+    def test_gui_messages_respect_console_level(self):
+        """Test that the panel gets INFO messages while the console only shows its configured levels"""
+        gui = self.make_gui()
+        output = io.StringIO()
+        with LogSetup(parse_levels("warning"), output):
+            gui.log_message("Open port found: 80 (HTTP)")
+            logging.getLogger("port_scanner.engine").info("probe")
+        self.assertEqual(output.getvalue(), "")
+        self.assertEqual(gui.log_queue.qsize(), 1)
+        
+        with LogSetup(parse_levels("warning,gui=info"), output):
+            gui.log_message("Open port found: 22 (SSH)")
+        self.assertIn("INFO port_scanner.gui: Open port found: 22 (SSH)", output.getvalue())
+        self.assertEqual(gui.log_queue.qsize(), 2)
+    
+    def test_cli_log_options(self):
+        """Test that the CLI logs per subsystem and rejects unknown levels"""
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()) as errors:
+            self.assertEqual(scan_cli.main(["127.0.0.1", "-p", "1-2", "-t", "0.1",
+                                            "--engine", "concurrent", "--log", "warning,engine=debug",
+                                            "--trace", "16"]), 0)
+        self.assertIn("DEBUG port_scanner.engine: 127.0.0.1:1 closed", errors.getvalue())
+        self.assertEqual(logging.getLogger("port_scanner").handlers, [])
+        
+        with redirect_stderr(io.StringIO()) as errors, self.assertRaises(SystemExit):
+            scan_cli.main(["127.0.0.1", "--log", "engine=loud"])
+        self.assertIn("Unknown log level: loud", errors.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
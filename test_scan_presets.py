@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+import scan_cli
+from port_scanner import PortScanner, PortScannerGUI
+from rate_limit import TokenBucket
+from scan_engine import ScanEngine
+from scan_presets import PresetLibrary, ScanPreset, make_engine, port_set
+from test_server import TestServer
+from udp_engine import UdpScanEngine
+
+COMMON = PortScanner().common_ports
+
+class TestScanPresets(unittest.TestCase):
+    
+    def test_port_set(self):
+        """Test parsing port specs, including the common-port list"""
+        self.assertEqual(port_set("22,80-82"), (1 << 22) | (1 << 80) | (1 << 81) | (1 << 82))
+        self.assertEqual(port_set("common", {22: "SSH", 443: "HTTPS"}), (1 << 22) | (1 << 443))
+        for spec in ("", "0-10", "65530-65536", "http"):
+            with self.assertRaises(ValueError):
+                port_set(spec)
+    
+    def test_compile_expands_orders_and_names(self):
+        """Test that a plan holds merged intervals, the fixed order and resolved names"""
+        preset = ScanPreset("db", ports="5432,3306,3307,27017", order="common-first",
+                            services={"27017": "MongoDB"})
+        plan = preset.compile(COMMON)
+        self.assertEqual(plan.intervals, ((3306, 3307), (5432, 5432), (27017, 27017)))
+        self.assertEqual(plan.ports, (3306, 5432, 3307, 27017))
+        self.assertEqual(dict(plan.services),
+                         {3306: "MySQL", 3307: "Unknown", 5432: "PostgreSQL", 27017: "MongoDB"})
+        with self.assertRaises(TypeError):
+            plan.services[1] = "x"
+        with self.assertRaises(AttributeError):
+            plan.timeout = 2
+    
+    def test_shuffle_is_repeatable(self):
+        """Test that a shuffled preset probes the same permutation every time"""
+        first = ScanPreset("slow", ports="1-1024", order="shuffle").compile(COMMON)
+        second = ScanPreset("slow", ports="1-1024", order="shuffle").compile(COMMON)
+        self.assertEqual(first.ports, second.ports)
+        self.assertNotEqual(first.ports, tuple(range(1, 1025)))
+        self.assertEqual(sorted(first.ports), list(range(1, 1025)))
+    
+    def test_invalid_presets(self):
+        """Test that bad settings are rejected when the preset is read"""
+        for spec in ({"engine": "turbo"}, {"order": "random"}, {"protocol": "sctp"},
+                     {"timeout": 0}):
+            with self.assertRaises(ValueError):
+                ScanPreset.from_dict(dict(spec, name="bad"))
+    
+    def test_library_compiles_once(self):
+        """Test the shipped presets, plan caching and overriding from a later file"""
+        library = PresetLibrary.load(common_ports=COMMON)
+        self.assertEqual(library.names(), ["quick", "full", "web", "db", "stealthy-slow"])
+        plan = library.plan("web")
+        self.assertIs(library.plan("web"), plan)
+        self.assertEqual(library.plan("full").intervals, ((1, 65535),))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "presets.json")
+            with open(path, "w") as f:
+                json.dump({"presets": [{"name": "web", "ports": "80"}]}, f)
+            library = PresetLibrary.load([path], COMMON)
+        self.assertEqual(library.plan("web").ports, (80,))
+        library.add(ScanPreset("web", ports="443"))
+        self.assertEqual(library.plan("web").ports, (443,))
+    
+    def test_make_engine(self):
+        """Test that a plan builds the engine it names, with its limits"""
+        library = PresetLibrary.load(common_ports=COMMON)
+        scanner = PortScanner()
+        engine = make_engine(library.plan("stealthy-slow"), scanner)
+        self.assertIsInstance(engine, ScanEngine)
+        self.assertIsInstance(engine.rate_limiter, TokenBucket)
+        self.assertEqual(engine.max_in_flight, 4)
+        self.assertIsNone(make_engine(ScanPreset("s").compile(COMMON), scanner))
+        self.assertIsInstance(make_engine(ScanPreset("u", protocol="udp").compile(COMMON), scanner),
+                              UdpScanEngine)
+    
+    def test_gui_plan_ports(self):
+        """Test that the GUI scans the plan's ports, narrowed to an edited range"""
+        gui = PortScannerGUI.__new__(PortScannerGUI)
+        gui.plan = ScanPreset("web", ports="80,443,8080").compile(COMMON)
+        self.assertEqual(gui.plan_ports(80, 8080), (80, 443, 8080))
+        self.assertEqual(gui.plan_ports(100, 9000), [443, 8080])
+        gui.plan = None
+        self.assertIsNone(gui.plan_ports(1, 1000))
+
+class TestPresetCli(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = TestServer(verbose=False)
+        cls.server.start_port_range(24900, 2, "Preset")
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop_all_servers()
+    
+    def test_cli_preset(self):
+        """Test scanning with a preset from an extra file, and overriding its ports"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "presets.json")
+            with open(path, "w") as f:
+                json.dump({"presets": [{"name": "lab", "ports": "24900,24901,24905",
+                                        "timeout": 0.5, "engine": "concurrent",
+                                        "services": {"24901": "Lab-API"}}]}, f)
+            output = io.StringIO()
+            with redirect_stdout(output), redirect_stderr(io.StringIO()) as errors:
+                self.assertEqual(scan_cli.main(["127.0.0.1", "--presets", path, "--preset", "lab"]), 0)
+            self.assertEqual(output.getvalue().splitlines(),
+                             ["127.0.0.1 24900/tcp open Unknown", "127.0.0.1 24901/tcp open Lab-API"])
+            self.assertIn("Scanned 3 ports", errors.getvalue())
+            
+            output = io.StringIO()
+            with redirect_stdout(output), redirect_stderr(io.StringIO()):
+                self.assertEqual(scan_cli.main(["127.0.0.1", "--presets", path, "--preset", "lab",
+                                                "-p", "24901-24901", "--engine", "serial"]), 0)
+            self.assertEqual(output.getvalue().splitlines(), ["127.0.0.1 24901/tcp open Lab-API"])
+            
+            with redirect_stderr(io.StringIO()) as errors:
+                self.assertEqual(scan_cli.main(["127.0.0.1", "--preset", "missing"]), 2)
+            self.assertIn("available: quick", errors.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+import port_scanner
+from port_scanner import PortScanner
+from scan_profiler import PhaseTimer, format_import_times, import_times, profile_call
+from scan_cli import main as cli_main
+
+class TestPhaseTimer(unittest.TestCase):
+    
+    def test_phases_recorded_and_detached(self):
+        """Test that the timer attributes time to phases and detaches cleanly"""
+        scanner = PortScanner()
+        timer = PhaseTimer().attach(scanner)
+        scanner.scanning = True
+        scanner.scan_range("127.0.0.1", 1, 3, 0.1, lambda value: None, lambda port, service: None)
+        timer.detach()
+        
+        summary = timer.summary()
+        self.assertIn("classify", summary)
+        self.assertEqual(summary["classify"][1], 3)
+        self.assertEqual(scanner._hooks, {})
+
+class TestProfileCall(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+    
+    def busy(self):
+        end = time.perf_counter() + 0.05
+        while time.perf_counter() < end:
+            pass
+        return "done"
+    
+    def test_cprofile_writes_pstats(self):
+        """Test that cProfile mode writes a loadable pstats file"""
+        path = os.path.join(self.tmpdir.name, "scan.pstats")
+        self.assertEqual(profile_call(self.busy, path), "done")
+        stats = pstats.Stats(path)
+        self.assertTrue(any(func[2] == "busy" for func in stats.stats))
+    
+    def test_sampling_writes_collapsed_stacks(self):
+        """Test that sample mode writes 'stack count' lines"""
+        path = os.path.join(self.tmpdir.name, "scan.folded")
+        profile_call(self.busy, path, mode="sample", interval=0.001)
+        with open(path) as f:
+            lines = f.read().splitlines()
+        self.assertGreater(len(lines), 0)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertIn("busy", stack)
+        self.assertGreater(int(count), 0)
+    
+    def test_unknown_mode_rejected(self):
+        """Test that an unknown profiler mode raises"""
+        with self.assertRaises(ValueError):
+            profile_call(self.busy, os.path.join(self.tmpdir.name, "x"), mode="perf")
+    
+    def test_cli_profile_option(self):
+        """Test that the CLI --profile option wraps the scan"""
+        path = os.path.join(self.tmpdir.name, "cli.pstats")
+        with patch('sys.stderr'):
+            code = cli_main(["127.0.0.1", "-p", "1-2", "-t", "0.1", "--profile", path])
+        self.assertEqual(code, 0)
+        self.assertTrue(os.path.getsize(path) > 0)
+
+class TestStartup(unittest.TestCase):
+    
+    def test_import_times(self):
+        """Test that import times cover only the requested imports and link each to its importer"""
+        times = import_times(["json"])
+        rows = {row.module: row for row in times}
+        self.assertEqual(rows["json"].depth, 0)
+        self.assertIsNone(rows["json"].parent)
+        self.assertEqual(rows["json.decoder"].parent, "json")
+        self.assertNotIn("site", rows)
+        self.assertGreaterEqual(rows["json"].cumulative_us, rows["json.decoder"].cumulative_us)
+        lines = format_import_times(times, top=3)
+        self.assertTrue(lines[0].startswith("Startup imports:"))
+        self.assertEqual(len(lines), 5)
+        with self.assertRaises(RuntimeError):
+            import_times(["no_such_module"])
+    
+    def test_headless_tools_do_not_load_tkinter(self):
+        """Test that the core and CLI modules import without pulling in Tk"""
+        code = ("import sys, scan_cli, scan_engine, udp_engine, sampling, scheduler; "
+                "print(sorted(m for m in sys.modules if m.startswith('tkinter')))")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(port_scanner.__file__)))
+        self.assertEqual(output.stdout.strip(), "[]")
+    
+    def test_startup_profile_options(self):
+        """Test --startup-profile on the GUI and CLI, which exit without scanning"""
+        for main in (port_scanner.main, cli_main):
+            output = io.StringIO()
+            with redirect_stdout(output):
+                self.assertEqual(main(["--startup-profile"]), 0)
+            self.assertIn("Startup imports:", output.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from scan_engine import ScanEngine
+from scheduler import MERGE, SKIP, ScanJob, Scheduler, load_jobs
+from test_server import TestServer
+
+class TestScheduler(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = TestServer(verbose=False)
+        cls.server.start_port_range(24100, 3, "Scheduled")
+        cls.server.start_blackhole_server(24110)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop_all_servers()
+    
+    def run_briefly(self, scheduler, duration):
+        scheduler.run(duration)
+        return scheduler
+    
+    def test_first_runs_are_spread_over_the_interval(self):
+        """Test that jobs with the same interval get different start times inside it"""
+        jobs = [ScanJob(f"job{i}", ["127.0.0.1"], interval=3600) for i in range(20)]
+        scheduler = Scheduler(jobs, seed=1)
+        offsets = sorted(due - time.monotonic() for due, _, _ in scheduler._due)
+        self.assertGreater(offsets[0], -1)
+        self.assertLess(offsets[-1], 3600)
+        self.assertGreater(offsets[-1] - offsets[0], 1800)
+    
+    def test_later_runs_are_jittered(self):
+        """Test that repeat runs land within +/- jitter of the interval"""
+        scheduler = Scheduler(jitter=0.1, seed=2)
+        job = ScanJob("job", ["127.0.0.1"], interval=100)
+        gaps = [scheduler._next_due(job, 0.0) for _ in range(50)]
+        self.assertTrue(all(90 <= gap <= 110 for gap in gaps))
+        self.assertGreater(len(set(gaps)), 1)
+    
+    def test_jobs_run_repeatedly_and_report_results(self):
+        """Test that a job runs on its interval and streams results tagged with the job"""
+        found = []
+        runs = []
+        job = ScanJob("web", ["127.0.0.1"], 24100, 24104, interval=0.2, timeout=0.3)
+        scheduler = Scheduler(on_result=lambda job, result: found.append((job.name, result.port)),
+                              on_run=lambda job, run: runs.append(run["open"]), jitter=0)
+        scheduler.add_job(job, delay=0)
+        self.run_briefly(scheduler, 0.7)
+        
+        self.assertGreaterEqual(job.runs, 3)
+        self.assertEqual(runs[:3], [3, 3, 3])
+        self.assertEqual(sorted(set(found)), [("web", 24100), ("web", 24101), ("web", 24102)])
+    
+    def test_overlapping_runs_are_skipped(self):
+        """Test that a job still running when it comes due again skips that run"""
+        job = ScanJob("slow", ["127.0.0.1"], 24110, 24110, interval=0.1, timeout=0.45, overlap=SKIP)
+        scheduler = Scheduler(jitter=0)
+        scheduler.add_job(job, delay=0)
+        self.run_briefly(scheduler, 1.0)
+        self.assertLessEqual(job.runs, 3)
+        self.assertGreaterEqual(job.skipped, 5)
+    
+    def test_overlapping_runs_are_merged(self):
+        """Test that merge collapses missed occurrences into one follow-up run"""
+        starts = []
+        job = ScanJob("slow", ["127.0.0.1"], 24110, 24110, interval=0.1, timeout=0.3, overlap=MERGE)
+        scheduler = Scheduler(jitter=0, on_run=lambda job, run: starts.append(run["started"]))
+        scheduler.add_job(job, delay=0)
+        self.run_briefly(scheduler, 1.0)
+        self.assertEqual(job.skipped, 0)
+        # Back-to-back runs rather than one per 0.1s interval
+        self.assertGreaterEqual(job.runs, 2)
+        self.assertLessEqual(job.runs, 4)
+        self.assertTrue(all(later - earlier >= 0.29 for earlier, later in zip(starts, starts[1:])))
+    
+    def test_concurrency_limit_and_priority(self):
+        """Test that only max_concurrent jobs run at once and higher priority goes first"""
+        order = []
+        active = []
+        peak = []
+        lock = threading.Lock()
+        real_scan = ScanEngine.scan
+        
+        def tracked_scan(engine, *args, **kwargs):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            try:
+                return real_scan(engine, *args, **kwargs)
+            finally:
+                with lock:
+                    active.pop()
+        
+        scheduler = Scheduler(max_concurrent=1, jitter=0,
+                              on_run=lambda job, run: order.append(job.name))
+        for name, priority in (("low", 0), ("high", 5), ("mid", 2)):
+            scheduler.add_job(ScanJob(name, ["127.0.0.1"], 24110, 24110, interval=60,
+                                      priority=priority, timeout=0.2), delay=0)
+        with patch.object(ScanEngine, "scan", tracked_scan):
+            self.run_briefly(scheduler, 0.9)
+        self.assertEqual(order, ["high", "mid", "low"])
+        self.assertEqual(max(peak), 1)
+    
+    def test_engine_is_shared_between_jobs(self):
+        """Test that every run goes through the scheduler's one engine and scanner"""
+        engines = set()
+        real_scan = ScanEngine.scan
+        
+        def recording_scan(engine, *args, **kwargs):
+            engines.add(id(engine))
+            return real_scan(engine, *args, **kwargs)
+        
+        scheduler = Scheduler(max_concurrent=2, max_in_flight=64, rate=2000, jitter=0)
+        for i in range(4):
+            scheduler.add_job(ScanJob(f"job{i}", ["127.0.0.1"], 24100, 24102, interval=0.2,
+                                      timeout=0.2), delay=0)
+        with patch.object(ScanEngine, "scan", recording_scan):
+            self.run_briefly(scheduler, 0.5)
+        self.assertEqual(engines, {id(scheduler.engine)})
+        self.assertIs(scheduler.engine.rate_limiter, scheduler.rate_limiter)
+        self.assertEqual(scheduler.engine.max_in_flight, 32)
+        self.assertFalse(scheduler.scanner.scanning)
+    
+    def test_concurrent_jobs_keep_their_own_stats(self):
+        """Test that each run's engine counters stay with its job while the engine is shared"""
+        reported = {}
+        scheduler = Scheduler(max_concurrent=2, jitter=0,
+                              on_run=lambda job, run: reported.__setitem__(job.name, run["stats"]))
+        wide = ScanJob("wide", ["127.0.0.1"], 24100, 24109, interval=60, timeout=0.3)
+        slow = ScanJob("slow", ["127.0.0.1"], 24110, 24110, interval=60, timeout=0.4)
+        scheduler.add_job(wide, delay=0)
+        scheduler.add_job(slow, delay=0)
+        self.run_briefly(scheduler, 0.7)
+        self.assertEqual(wide.stats["probes"], 10)
+        self.assertEqual(slow.stats["probes"], 1)
+        self.assertIs(reported["wide"], wide.stats)
+    
+    def test_load_jobs(self):
+        """Test reading jobs and settings from a JSON file"""
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump({"rate": 100, "jobs": [
+                {"name": "web", "targets": ["127.0.0.1"], "ports": "80-443", "interval": 900,
+                 "priority": 2, "overlap": "merge"},
+                {"name": "ssh", "targets": ["::1"], "ports": "22"},
+            ]}, f)
+        self.addCleanup(os.unlink, f.name)
+        jobs, config = load_jobs(f.name)
+        self.assertEqual(config["rate"], 100)
+        self.assertEqual([(job.name, job.start_port, job.end_port, job.interval, job.overlap)
+                          for job in jobs],
+                         [("web", 80, 443, 900.0, MERGE), ("ssh", 22, 22, 3600.0, SKIP)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,57 +1,286 @@
 #!/usr/bin/env python3
 
+import heapq
+import selectors
 import socket
+import struct
 import threading
 import time
 import sys
 from contextlib import contextmanager
+from fd_budget import raise_soft_limit
 
 class TestServer:
-    """A simple test server that opens multiple ports for testing the port scanner"""
+    """A single-threaded selectors-based test server that can hold thousands of listening ports"""
     
-    def __init__(self):
+    def __init__(self, verbose=True, host='127.0.0.1'):
         self.servers = []
         self.running = False
+        self.verbose = verbose
+        self.host = host
+        self._selector = None
+        self._loop_thread = None
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup_recv = None
+        self._wakeup_send = None
+        self._timers = []
+        self._timer_seq = 0
     
-    def start_server(self, port, service_name="Test"):
-        """Start a simple TCP server on the specified port"""
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+    
+    def _ensure_loop(self):
+        """Start the event loop thread on first use"""
+        if self._loop_thread is not None:
+            return
+        self.running = True
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._selector.register(self._wakeup_recv, selectors.EVENT_READ, ('wakeup', None))
+        self._loop_thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._loop_thread.start()
+    
+    def _wakeup(self):
         try:
-            server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            server_socket.bind(('127.0.0.1', port))
-            server_socket.listen(5)
+            self._wakeup_send.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass
+    
+    def _register(self, sock, data, events=selectors.EVENT_READ):
+        """Queue a socket for registration; the selector is only touched by the loop thread"""
+        with self._lock:
+            self._pending.append((sock, events, data))
+        self._wakeup()
+    
+    def _call_later(self, delay, callback, *args):
+        """Schedule a callback on the loop thread; only called from the loop thread"""
+        self._timer_seq += 1
+        heapq.heappush(self._timers, (time.monotonic() + delay, self._timer_seq, callback, args))
+    
+    def _run_loop(self):
+        selector = self._selector
+        while self.running:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            for sock, events, data in pending:
+                selector.register(sock, events, data)
+            
+            timeout = 1.0
+            if self._timers:
+                timeout = max(0.0, min(timeout, self._timers[0][0] - time.monotonic()))
             
-            def handle_connections():
-                while self.running:
+            for key, mask in selector.select(timeout=timeout):
+                kind, info = key.data
+                if kind == 'wakeup':
                     try:
-                        server_socket.settimeout(1.0)  # Non-blocking with timeout
-                        client_socket, addr = server_socket.accept()
-                        # Send a simple response and close
-                        response = f"Hello from {service_name} server on port {port}\n"
-                        client_socket.send(response.encode())
-                        client_socket.close()
-                    except socket.timeout:
-                        continue  # Continue checking if we should stop
-                    except Exception:
-                        break
-                
-                server_socket.close()
+                        while key.fileobj.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                elif kind == 'listener':
+                    self._accept_all(key.fileobj, info)
+                elif kind == 'client':
+                    self._flush_client(key.fileobj, info)
+                elif kind == 'udp':
+                    self._answer_datagrams(key.fileobj, info)
+            
+            now = time.monotonic()
+            while self._timers and self._timers[0][0] <= now:
+                _, _, callback, args = heapq.heappop(self._timers)
+                callback(*args)
+        
+        for key in list(selector.get_map().values()):
+            selector.unregister(key.fileobj)
+            if key.data[0] == 'client':
+                key.fileobj.close()
+        for _, _, callback, args in self._timers:
+            if args and isinstance(args[0], socket.socket):
+                args[0].close()
+        self._timers.clear()
+        selector.close()
+    
+    def _accept_all(self, server_socket, server):
+        banner = f"Hello from {server['service']} server on port {server['port']}\n".encode()
+        while True:
+            try:
+                client_socket, addr = server_socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            client_socket.setblocking(False)
+            
+            if server['reset']:
+                # Abort with RST instead of a FIN
+                client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+                client_socket.close()
+                continue
+            
+            state = {'pending': banner, 'trickle': server['trickle'], 'registered': False}
+            if server['delay']:
+                self._call_later(server['delay'], self._flush_client, client_socket, state)
+            else:
+                self._flush_client(client_socket, state)
+    
+    def _flush_client(self, client_socket, state):
+        """Send what the socket accepts now; trickled banners go out one byte per tick"""
+        chunk = state['pending'][:1] if state['trickle'] else state['pending']
+        try:
+            sent = client_socket.send(chunk)
+            state['pending'] = state['pending'][sent:]
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            state['pending'] = b''
+        
+        if state['pending'] and state['trickle'] and sent:
+            self._set_writable(client_socket, state, False)
+            self._call_later(state['trickle'], self._flush_client, client_socket, state)
+        elif state['pending']:
+            self._set_writable(client_socket, state, True)
+        else:
+            self._set_writable(client_socket, state, False)
+            client_socket.close()
+    
+    def _answer_datagrams(self, server_socket, server):
+        while True:
+            try:
+                data, addr = server_socket.recvfrom(4096)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            if server['silent']:
+                continue
+            response = server['response']
+            if response is None:
+                response = f"Hello from {server['service']} server on port {server['port']}\n".encode()
+            try:
+                server_socket.sendto(response, addr)
+            except OSError:
+                pass
+    
+    def _set_writable(self, client_socket, state, writable):
+        if writable and not state['registered']:
+            self._selector.register(client_socket, selectors.EVENT_WRITE, ('client', state))
+        elif not writable and state['registered']:
+            self._selector.unregister(client_socket)
+        state['registered'] = writable
+    
+    def _listen(self, port, service_name, host=None, backlog=128, delay=0, trickle=0, reset=False):
+        host = host or self.host
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server_socket.bind((host, port))
+            server_socket.listen(backlog)
+            server_socket.setblocking(False)
+        except OSError:
+            server_socket.close()
+            raise
+        
+        self._ensure_loop()
+        server = {
+            'port': port,
+            'host': host,
+            'socket': server_socket,
+            'thread': self._loop_thread,
+            'service': service_name,
+            'delay': delay,
+            'trickle': trickle,
+            'reset': reset
+        }
+        self.servers.append(server)
+        self._register(server_socket, ('listener', server))
+        return server
+    
+    def start_server(self, port, service_name="Test", host=None, **faults):
+        """Start a TCP listener on the specified port that sends a banner and closes
+
+        Optional faults: delay (seconds before responding), trickle (seconds
+        between banner bytes) and reset (abort every connection with a RST).
+        """
+        try:
+            self._listen(port, service_name, host, **faults)
+            self._log(f"✓ Started {service_name} server on port {port}")
+            return True
             
-            thread = threading.Thread(target=handle_connections, daemon=True)
-            thread.start()
+        except Exception as e:
+            self._log(f"✗ Failed to start server on port {port}: {e}")
+            return False
+    
+    def start_udp_server(self, port, service_name="Test", host=None, response=None, silent=False):
+        """Start a UDP responder that answers every datagram (silent ones never answer)"""
+        host = host or self.host
+        try:
+            server_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server_socket.bind((host, port))
+            server_socket.setblocking(False)
+        except OSError as e:
+            self._log(f"✗ Failed to start UDP server on port {port}: {e}")
+            return False
+        
+        self._ensure_loop()
+        server = {
+            'port': port,
+            'host': host,
+            'socket': server_socket,
+            'thread': self._loop_thread,
+            'service': service_name,
+            'protocol': 'udp',
+            'response': response,
+            'silent': silent
+        }
+        self.servers.append(server)
+        self._register(server_socket, ('udp', server))
+        self._log(f"✓ Started {service_name} UDP server on port {port}")
+        return True
+    
+    def start_port_range(self, start_port, count, service_name="Test", hosts=None, **faults):
+        """Start listeners on count consecutive ports on each host (127.0.0.0/8 aliases work)"""
+        hosts = hosts or [self.host]
+        raise_soft_limit(len(hosts) * count + 64)
+        started = 0
+        for host in hosts:
+            for port in range(start_port, start_port + count):
+                try:
+                    self._listen(port, service_name, host, **faults)
+                    started += 1
+                except OSError as e:
+                    self._log(f"✗ Failed to start server on {host}:{port}: {e}")
+        self._log(f"✓ Started {started} {service_name} listeners on {', '.join(hosts)}")
+        return started
+    
+    def start_blackhole_server(self, port):
+        """Listen on a port whose accept queue is full, so new SYNs are silently dropped"""
+        try:
+            server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server_socket.bind((self.host, port))
+            server_socket.listen(0)
+            
+            # Never accept; one queued connection fills a zero-length backlog
+            filler = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            filler.connect((self.host, port))
             
             self.servers.append({
                 'port': port,
+                'host': self.host,
                 'socket': server_socket,
-                'thread': thread,
-                'service': service_name
+                'thread': None,
+                'service': "Blackhole",
+                'fillers': [filler]
             })
             
-            print(f"✓ Started {service_name} server on port {port}")
+            self._log(f"✓ Started blackhole on port {port}")
             return True
             
         except Exception as e:
-            print(f"✗ Failed to start server on port {port}: {e}")
+            self._log(f"✗ Failed to start blackhole on port {port}: {e}")
             return False
     
     def start_multiple_servers(self):
@@ -65,44 +294,48 @@ class TestServer:
             (9999, "Test-Service")
         ]
         
-        self.running = True
         started_count = 0
         
-        print("Starting test servers...")
-        print("-" * 40)
+        self._log("Starting test servers...")
+        self._log("-" * 40)
         
         for port, service in servers_to_start:
             if self.start_server(port, service):
                 started_count += 1
-            time.sleep(0.1)  # Small delay between starts
         
-        print("-" * 40)
-        print(f"Started {started_count}/{len(servers_to_start)} test servers")
-        print(f"Servers running on 127.0.0.1")
-        print("\nYou can now run the port scanner with:")
-        print("Target: 127.0.0.1")
-        print("Ports: 8000-10000")
-        print("Timeout: 1")
+        self._log("-" * 40)
+        self._log(f"Started {started_count}/{len(servers_to_start)} test servers")
+        self._log(f"Servers running on {self.host}")
+        self._log("\nYou can now run the port scanner with:")
+        self._log(f"Target: {self.host}")
+        self._log("Ports: 8000-10000")
+        self._log("Timeout: 1")
         
         return started_count > 0
     
     def stop_all_servers(self):
         """Stop all running test servers"""
-        print("\nStopping test servers...")
+        self._log("\nStopping test servers...")
         self.running = False
         
-        # Give threads time to finish
-        time.sleep(2)
+        if self._loop_thread is not None:
+            self._wakeup()
+            self._loop_thread.join()
+            self._loop_thread = None
+            self._wakeup_recv.close()
+            self._wakeup_send.close()
         
         for server in self.servers:
             try:
+                for filler in server.get('fillers', []):
+                    filler.close()
                 server['socket'].close()
-                print(f"✓ Stopped server on port {server['port']}")
             except:
                 pass
         
+        self._log(f"✓ Stopped {len(self.servers)} servers")
         self.servers.clear()
-        print("All servers stopped.")
+        self._log("All servers stopped.")
     
     def list_running_servers(self):
         """List all currently running servers"""
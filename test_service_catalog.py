@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest.mock import patch
+import scan_cli
+from port_scanner import PortScanner
+from scan_diff import iter_bits
+from scan_presets import port_set
+from service_catalog import (ServiceCatalog, ServiceEntry, ServiceIndex, cache_path, default_catalog,
+                             load_index, parse_catalog)
+from test_server import TestServer
+
+CATALOG = {"services": [
+    {"port": 22, "name": "SSH", "risk": "medium", "tags": ["remote-access", "prod"]},
+    {"port": 23, "name": "Telnet", "risk": "critical", "tags": ["remote-access"]},
+    {"port": 53, "name": "DNS", "protocol": "udp", "risk": "low", "tags": ["prod"]},
+    {"port": 80, "name": "HTTP"},
+]}
+
+class TestServiceIndex(unittest.TestCase):
+    
+    def setUp(self):
+        self.index = ServiceIndex(parse_catalog(json.dumps(CATALOG)))
+    
+    def test_parse_rejects_bad_entries(self):
+        """Test that invalid or duplicate entries are reported"""
+        for spec in ({"port": 0, "name": "x"}, {"port": "22", "name": "x"},
+                     {"port": 22, "name": ""}, {"port": 22, "name": "x", "protocol": "sctp"},
+                     {"port": 22, "name": "x", "risk": "severe"}, {"port": 22, "name": "x", "tags": "prod"}):
+            with self.assertRaises(ValueError):
+                parse_catalog(json.dumps({"services": [spec]}))
+        with self.assertRaises(ValueError):
+            parse_catalog(json.dumps({"services": [{"port": 22, "name": "a"}, {"port": 22, "name": "b"}]}))
+    
+    def test_lookups(self):
+        """Test names, UDP fallback to TCP names, and full entries"""
+        self.assertEqual(self.index.name(22), "SSH")
+        self.assertEqual(self.index.name(53), "Unknown")
+        self.assertEqual(self.index.name(53, "udp"), "DNS")
+        self.assertEqual(self.index.name(22, "udp"), "SSH")
+        self.assertEqual(dict(self.index), {22: "SSH", 23: "Telnet", 80: "HTTP"})
+        self.assertEqual(self.index.entry(22),
+                         ServiceEntry(22, "tcp", "SSH", "medium", ("remote-access", "prod")))
+        self.assertEqual(self.index.entry(80).risk, "low")
+        self.assertIsNone(self.index.entry(53))
+    
+    def test_tags_and_risk(self):
+        """Test the tag and risk bitmaps"""
+        self.assertEqual(list(iter_bits(self.index.tagged("prod"))), [22, 53])
+        self.assertEqual(self.index.tagged("dmz"), 0)
+        self.assertEqual(list(iter_bits(self.index.at_risk("medium"))), [22, 23])
+        self.assertEqual(list(iter_bits(self.index.at_risk("critical"))), [23])
+        with self.assertRaises(ValueError):
+            self.index.at_risk("severe")
+    
+    def test_preset_port_specs(self):
+        """Test that preset port specs can select catalogue ports by tag and risk"""
+        self.assertEqual(list(iter_bits(port_set("tag:remote-access,443", self.index))), [22, 23, 443])
+        self.assertEqual(list(iter_bits(port_set("risk:critical", self.index))), [23])
+        with self.assertRaises(ValueError):
+            port_set("tag:prod", {22: "SSH"})
+
+class TestCatalogCache(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, "services.json")
+        self.cache_dir = os.path.join(self.tmpdir.name, "cache")
+        self.write(CATALOG, 1000)
+    
+    def write(self, catalog, mtime):
+        with open(self.path, "w") as f:
+            json.dump(catalog, f)
+        os.utime(self.path, (mtime, mtime))
+    
+    def test_index_cached_across_runs(self):
+        """Test that the compiled index is reused until the file's content changes"""
+        index, stamp, how = load_index(self.path, self.cache_dir)
+        self.assertEqual(how, "compiled")
+        self.assertTrue(os.path.exists(cache_path(self.path, self.cache_dir)))
+        
+        cached, _, how = load_index(self.path, self.cache_dir)
+        self.assertEqual(how, "cache")
+        self.assertEqual(cached.state(), index.state())
+        
+        # Touched but unchanged: hashed, not recompiled
+        os.utime(self.path, (2000, 2000))
+        self.assertEqual(load_index(self.path, self.cache_dir)[2], "hash")
+        self.assertEqual(load_index(self.path, self.cache_dir)[2], "cache")
+        
+        self.write({"services": [{"port": 22, "name": "OpenSSH"}]}, 3000)
+        index, _, how = load_index(self.path, self.cache_dir)
+        self.assertEqual(how, "compiled")
+        self.assertEqual(index.name(22), "OpenSSH")
+    
+    def test_bad_cache_ignored(self):
+        """Test that an unreadable cache file is recompiled over, and no cache dir works too"""
+        load_index(self.path, self.cache_dir)
+        with open(cache_path(self.path, self.cache_dir), "wb") as f:
+            f.write(b"not marshal data")
+        self.assertEqual(load_index(self.path, self.cache_dir)[2], "compiled")
+        self.assertEqual(load_index(self.path, self.cache_dir)[2], "cache")
+        self.assertEqual(load_index(self.path, None)[2], "compiled")
+    
+    def test_cache_is_opt_in_and_pruned(self):
+        """Test that only an explicit cache_dir writes files, and indexes of deleted catalogues go"""
+        ServiceCatalog(self.path)
+        self.assertFalse(os.path.exists(self.cache_dir))
+        
+        load_index(self.path, self.cache_dir)
+        other = os.path.join(self.tmpdir.name, "other.json")
+        with open(other, "w") as f:
+            json.dump(CATALOG, f)
+        load_index(other, self.cache_dir)
+        stale = os.path.join(self.cache_dir, "services-0000000000000000.idx")
+        with open(stale, "wb") as f:
+            f.write(b"written by an older version")
+        os.remove(self.path)
+        
+        os.utime(other, (2000, 2000))
+        load_index(other, self.cache_dir)
+        self.assertEqual(os.listdir(self.cache_dir),
+                         [os.path.basename(cache_path(other, self.cache_dir))])
+    
+    def test_hot_reload(self):
+        """Test that a scanner sees an edited catalogue after refresh, and a broken edit is ignored"""
+        catalog = ServiceCatalog(self.path, self.cache_dir)
+        scanner = PortScanner(catalog)
+        self.assertEqual(scanner.get_service_name(22), "SSH")
+        self.assertFalse(catalog.refresh())
+        
+        self.write({"services": [{"port": 22, "name": "OpenSSH"}]}, 2000)
+        self.assertTrue(catalog.refresh())
+        self.assertEqual(scanner.get_service_name(22), "OpenSSH")
+        self.assertEqual(scanner.common_ports, {22: "OpenSSH"})
+        
+        with open(self.path, "w") as f:
+            f.write("{broken")
+        with self.assertLogs("port_scanner.catalog", "WARNING"):
+            self.assertFalse(catalog.refresh())
+        self.assertEqual(scanner.get_service_name(22), "OpenSSH")
+    
+    def test_watch(self):
+        """Test that a watching catalogue reloads an edited file by itself"""
+        catalog = ServiceCatalog(self.path, self.cache_dir)
+        catalog.watch(0.02)
+        self.addCleanup(catalog.stop_watching)
+        self.write({"services": [{"port": 80, "name": "Web"}]}, 2000)
+        deadline = time.monotonic() + 2
+        while catalog.index.name(80) != "Web" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(catalog.index.name(80), "Web")
+    
+    def test_default_catalog_shared(self):
+        """Test that scanners share the shipped catalogue"""
+        self.assertIs(PortScanner().catalog, default_catalog())
+        self.assertEqual(default_catalog().index.entry(23).risk, "critical")
+
+class TestCatalogCli(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = TestServer(verbose=False)
+        cls.server.start_port_range(24970, 1, "Catalog")
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop_all_servers()
+    
+    def test_cli_services_file(self):
+        """Test naming ports from a catalogue given on the command line"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "services.json")
+            with open(path, "w") as f:
+                json.dump({"services": [{"port": 24970, "name": "Lab-Queue"}]}, f)
+            output = io.StringIO()
+            with redirect_stdout(output), redirect_stderr(io.StringIO()), \
+                    patch("service_catalog.CACHE_DIR", os.path.join(tmp, "cache")):
+                self.assertEqual(scan_cli.main(["127.0.0.1", "-p", "24970-24971", "-t", "0.5",
+                                                "--services", path]), 0)
+            self.assertEqual(output.getvalue().splitlines(), ["127.0.0.1 24970/tcp open Lab-Queue"])
+            
+            with redirect_stderr(io.StringIO()) as errors:
+                self.assertEqual(scan_cli.main(["127.0.0.1", "--services",
+                                                os.path.join(tmp, "missing.json")]), 2)
+            self.assertIn("cannot load service catalogue", errors.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+import errno
+import os
+import socket
+import struct
+import unittest
+from unittest.mock import MagicMock, patch
+from port_scanner import PortScanner
+from scan_engine import ScanEngine
+from socket_tuning import SourcePool
+from test_server import TestServer
+
+def lingering_count(port):
+    """Count client sockets to 127.0.0.1:port still in FIN_WAIT2 or TIME_WAIT"""
+    remote = f"0100007F:{port:04X}"
+    with open("/proc/net/tcp") as f:
+        return sum(1 for line in f.readlines()[1:]
+                   if line.split()[2] == remote and line.split()[3] in ("05", "06"))
+
+class TestLingerReset(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = TestServer(verbose=False)
+        cls.server.start_port_range(25000, 3, "Linger")
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop_all_servers()
+    
+    @patch('socket.socket')
+    def test_scan_port_sets_linger_on_open_port(self, mock_socket):
+        """Test that linger_reset sets SO_LINGER(1, 0) before closing an open port"""
+        mock_sock = MagicMock()
+        mock_socket.return_value = mock_sock
+        mock_sock.connect_ex.return_value = 0
+        scanner = PortScanner()
+        scanner.linger_reset = True
+        
+        self.assertTrue(scanner.scan_port("127.0.0.1", 80))
+        mock_sock.setsockopt.assert_called_once_with(
+            socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    
+    @unittest.skipUnless(os.path.exists("/proc/net/tcp"), "needs /proc/net/tcp")
+    def test_engine_rescans_leave_no_time_wait(self):
+        """Test that repeated scans with linger_reset leave no half-closed client sockets"""
+        # A listener that never accepts, so the scanner always closes first
+        listener = socket.socket()
+        listener.bind(("127.0.0.1", 25005))
+        listener.listen(128)
+        self.addCleanup(listener.close)
+        
+        scanner = PortScanner()
+        scanner.scanning = True
+        engine = ScanEngine(scanner, max_in_flight=8, linger_reset=True)
+        for _ in range(20):
+            self.assertEqual(len(engine.scan(["127.0.0.1"], [25000, 25001, 25005], 0.5)), 3)
+        self.assertEqual(lingering_count(25005), 0)
+
+class TestSourcePool(unittest.TestCase):
+    
+    def setUp(self):
+        self.listener = socket.socket()
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(("127.0.0.1", 25010))
+        self.listener.listen(16)
+        self.listener.settimeout(1)
+        self.addCleanup(self.listener.close)
+    
+    def peers(self, count):
+        addresses = []
+        for _ in range(count):
+            client, addr = self.listener.accept()
+            addresses.append(addr[0])
+            client.close()
+        return addresses
+    
+    def test_engine_round_robins_source_addresses(self):
+        """Test that probes are spread over every source address in the pool"""
+        scanner = PortScanner()
+        scanner.scanning = True
+        engine = ScanEngine(scanner, max_in_flight=1,
+                            source_pool=SourcePool(["127.0.0.2", "127.0.0.3"]))
+        engine.scan(["127.0.0.1"] * 4, [25010], 0.5)
+        self.assertEqual(sorted(self.peers(4)), ["127.0.0.2"] * 2 + ["127.0.0.3"] * 2)
+    
+    def test_scan_port_uses_source_pool(self):
+        """Test that the serial scanner binds to the pool too"""
+        scanner = PortScanner()
+        scanner.source_pool = SourcePool(["127.0.0.4"])
+        self.assertTrue(scanner.scan_port("127.0.0.1", 25010))
+        self.assertEqual(self.peers(1), ["127.0.0.4"])
+    
+    def test_busy_source_ports_skipped(self):
+        """Test that a source port already in use is skipped"""
+        busy = socket.socket()
+        busy.bind(("127.0.0.1", 25011))
+        busy.listen(1)
+        self.addCleanup(busy.close)
+        pool = SourcePool(["127.0.0.1"], ports=[25011, 25012])
+        with socket.socket() as sock:
+            self.assertEqual(pool.bind(sock), ("127.0.0.1", 25012))
+
+class TestAddressExhaustion(unittest.TestCase):
+    
+    def test_eaddrnotavail_throttles_and_retries(self):
+        """Test that EADDRNOTAVAIL requeues the probe instead of reporting it"""
+        real_socket = socket.socket
+        failures = [2]
+        
+        class ExhaustedSocket(real_socket):
+            def connect_ex(self, address):
+                if failures[0]:
+                    failures[0] -= 1
+                    return errno.EADDRNOTAVAIL
+                return super().connect_ex(address)
+        
+        server = TestServer(verbose=False)
+        server.start_server(25020, "Addr")
+        self.addCleanup(server.stop_all_servers)
+        scanner = PortScanner()
+        scanner.scanning = True
+        engine = ScanEngine(scanner, max_in_flight=4)
+        with patch('socket.socket', ExhaustedSocket), patch('time.sleep'):
+            results = engine.scan(["127.0.0.1"], [25020], 0.5)
+        self.assertEqual([result.port for result in results], [25020])
+        self.assertEqual(engine.stats["addr_backpressure"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
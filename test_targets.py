@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import os
+import socket
+import tempfile
+import unittest
+from port_scanner import PortScanner
+from scan_engine import OPEN, ProbeResult, ScanEngine
+from targets import (Target, address_family, expand_prefix, is_hostname, iter_targets,
+                     load_hitlist, merge_dual_stack, pick_addresses, unique_targets)
+
+def ipv6_available():
+    try:
+        with socket.socket(socket.AF_INET6) as sock:
+            sock.bind(("::1", 0))
+        return True
+    except OSError:
+        return False
+
+class TestTargetParsing(unittest.TestCase):
+    
+    def test_address_family(self):
+        """Test that IPv6 literals map to AF_INET6 and everything else to AF_INET"""
+        self.assertEqual(address_family("::1"), socket.AF_INET6)
+        self.assertEqual(address_family("2001:db8::5"), socket.AF_INET6)
+        self.assertEqual(address_family("127.0.0.1"), socket.AF_INET)
+        self.assertEqual(address_family("example.com"), socket.AF_INET)
+    
+    def test_is_hostname(self):
+        """Test that only specs needing resolution count as hostnames"""
+        self.assertTrue(is_hostname("localhost"))
+        self.assertTrue(is_hostname("www.example.com"))
+        for spec in ("127.0.0.1", "::1", "10.0.0.0/24", "@hosts.txt"):
+            self.assertFalse(is_hostname(spec), spec)
+    
+    def test_expand_prefix(self):
+        """Test that prefixes expand to their hosts and oversized ones are refused"""
+        self.assertEqual(list(expand_prefix("10.0.0.0/30")), ["10.0.0.1", "10.0.0.2"])
+        self.assertEqual(list(expand_prefix("2001:db8::/127")), ["2001:db8::", "2001:db8::1"])
+        self.assertEqual(len(list(expand_prefix("2001:db8::/120"))), 255)
+        with self.assertRaises(ValueError):
+            expand_prefix("2001:db8::/64")
+    
+    def test_load_hitlist(self):
+        """Test that hitlists skip comments and blank lines and reject junk"""
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("# lab hosts\n127.0.0.1\n\n::1  # loopback\n2001:DB8::1\n")
+        self.addCleanup(os.unlink, f.name)
+        self.assertEqual(list(load_hitlist(f.name)), ["127.0.0.1", "::1", "2001:db8::1"])
+        
+        with open(f.name, "a") as out:
+            out.write("not-an-address\n")
+        with self.assertRaises(ValueError):
+            list(load_hitlist(f.name))
+    
+    def test_pick_addresses(self):
+        """Test family preference, fallback and dual-stack selection"""
+        infos = [(socket.AF_INET6, "2001:db8::1"), (socket.AF_INET, "192.0.2.1"),
+                 (socket.AF_INET, "192.0.2.2")]
+        self.assertEqual(pick_addresses(infos, "ipv4"), [(socket.AF_INET, "192.0.2.1")])
+        self.assertEqual(pick_addresses(infos, "ipv6"), [(socket.AF_INET6, "2001:db8::1")])
+        self.assertEqual(pick_addresses(infos, "both"),
+                         [(socket.AF_INET, "192.0.2.1"), (socket.AF_INET6, "2001:db8::1")])
+        self.assertEqual(pick_addresses(infos[1:], "ipv6"), [(socket.AF_INET, "192.0.2.1")])
+    
+    def test_iter_targets(self):
+        """Test literals, prefixes and hostnames resolved through the given resolver"""
+        def resolve(name, prefer):
+            return {"dual.test": [(socket.AF_INET, "192.0.2.1"), (socket.AF_INET6, "2001:db8::1")]
+                    }.get(name, [])
+        
+        targets = list(iter_targets(["::1", "10.0.0.0/31", "dual.test"], "both", resolve))
+        self.assertEqual(targets, [
+            Target("::1", "::1", socket.AF_INET6),
+            Target("10.0.0.0", "10.0.0.0", socket.AF_INET),
+            Target("10.0.0.1", "10.0.0.1", socket.AF_INET),
+            Target("192.0.2.1", "dual.test", socket.AF_INET),
+            Target("2001:db8::1", "dual.test", socket.AF_INET6),
+        ])
+        with self.assertRaises(ValueError):
+            list(iter_targets(["missing.test"], "ipv4", resolve))
+    
+    def test_unique_targets_keeps_first_name(self):
+        """Test that an address given twice is scanned once under its first name"""
+        targets = [Target("127.0.0.1", "127.0.0.1", socket.AF_INET),
+                   Target("127.0.0.1", "localhost", socket.AF_INET)]
+        self.assertEqual(list(unique_targets(targets)), targets[:1])
+    
+    def test_merge_dual_stack(self):
+        """Test that a port open over both families is reported once with both families"""
+        targets = [Target("192.0.2.1", "dual.test", socket.AF_INET),
+                   Target("2001:db8::1", "dual.test", socket.AF_INET6)]
+        results = [ProbeResult("192.0.2.1", 80, OPEN, 0.0, "HTTP"),
+                   ProbeResult("2001:db8::1", 80, OPEN, 0.0, "HTTP"),
+                   ProbeResult("2001:db8::1", 443, OPEN, 0.0, "HTTPS"),
+                   ProbeResult("192.0.2.1", 443, "closed", 0.0, "HTTPS")]
+        merged = merge_dual_stack(results, targets)
+        
+        self.assertEqual(set(merged), {("dual.test", 80), ("dual.test", 443)})
+        self.assertEqual(merged[("dual.test", 80)]["families"], {"ipv4", "ipv6"})
+        self.assertEqual(merged[("dual.test", 443)]["status"], OPEN)
+        self.assertEqual(merged[("dual.test", 443)]["families"], {"ipv6"})
+
+@unittest.skipUnless(ipv6_available(), "needs IPv6 loopback")
+class TestIPv6Scanning(unittest.TestCase):
+    
+    def setUp(self):
+        self.listener = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(("::1", 27000))
+        self.listener.listen(16)
+        self.addCleanup(self.listener.close)
+        self.scanner = PortScanner()
+        self.scanner.scanning = True
+    
+    def test_scan_port_over_ipv6(self):
+        """Test that the serial scanner probes IPv6 literals"""
+        self.assertTrue(self.scanner.scan_port("::1", 27000, 0.5))
+        self.assertFalse(self.scanner.scan_port("::1", 27001, 0.5))
+    
+    def test_engine_over_ipv6(self):
+        """Test that the concurrent engine probes IPv4 and IPv6 targets in one scan"""
+        results = ScanEngine(self.scanner).scan(["::1", "127.0.0.1"], range(27000, 27003), 0.5)
+        self.assertEqual([(result.host, result.port) for result in results], [("::1", 27000)])
+
+if __name__ == '__main__':
+    unittest.main()
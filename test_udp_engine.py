@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import errno
+import socket
+import struct
+import time
+import unittest
+from unittest.mock import patch
+from fd_budget import FdBudget
+from port_scanner import PortScanner
+from rate_limit import TokenBucket
+from scan_engine import CLOSED, OPEN
+from test_server import TestServer
+from udp_engine import OPEN_FILTERED, PAYLOADS, UdpScanEngine
+
+class TestUdpScanEngine(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = TestServer(verbose=False)
+        cls.server.start_udp_server(26053, "DNS-Test")
+        cls.server.start_udp_server(26054, "Silent", silent=True)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop_all_servers()
+    
+    def setUp(self):
+        self.scanner = PortScanner()
+        self.scanner.scanning = True
+    
+    def test_open_closed_and_silent_ports(self):
+        """Test classification from replies, ICMP port-unreachable and silence"""
+        statuses = {}
+        codes = {}
+        self.scanner.add_hook("post_connect", lambda host, port, code: codes.__setitem__(port, code))
+        engine = UdpScanEngine(self.scanner, rate=1000, retransmits=1)
+        open_results = engine.scan(
+            ["127.0.0.1"], [26053, 26054, 26055], timeout=0.2,
+            result_callback=lambda result: statuses.__setitem__(result.port, result.status),
+            open_only=False
+        )
+        self.assertEqual(statuses, {26053: OPEN, 26054: OPEN_FILTERED, 26055: CLOSED})
+        self.assertEqual(codes, {26053: 0, 26054: errno.ETIMEDOUT, 26055: errno.ECONNREFUSED})
+        self.assertEqual(open_results[0].protocol, "udp")
+        self.assertEqual(engine.stats["datagrams"], 4)  # one retransmit to the silent port
+    
+    def test_rate_limit_paces_probes(self):
+        """Test that probes are sent no faster than the configured rate"""
+        engine = UdpScanEngine(self.scanner, rate_limiter=TokenBucket(100, burst=1))
+        start = time.perf_counter()
+        engine.scan(["127.0.0.1"], range(26100, 26121), timeout=0.2)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.19)
+        self.assertGreater(engine.stats["rate_waits"], 0)
+    
+    def test_scan_range_uses_udp_service_names(self):
+        """Test the scan_range adapter and UDP service naming"""
+        engine = UdpScanEngine(self.scanner, rate=1000)
+        found = engine.scan_range("127.0.0.1", 26052, 26053, 0.2, lambda value: None,
+                                  lambda port, service: None)
+        self.assertEqual(found, [(26053, "Unknown")])
+        self.assertEqual(engine.get_service_name(161), "SNMP")
+    
+    def test_fd_exhaustion_is_backpressure_not_error(self):
+        """Test that EMFILE requeues probes within the fd window and keeps hooks paired"""
+        real_socket = socket.socket
+        failures = iter([True, True, False, True])
+        
+        def flaky_socket(*args, **kwargs):
+            if 'fileno' not in kwargs and next(failures, False):
+                raise OSError(errno.EMFILE, "Too many open files")
+            return real_socket(*args, **kwargs)
+        
+        class SmallBudget(FdBudget):
+            def window(self, requested):
+                return 2
+        
+        calls = {"pre_probe": 0, "post_connect": 0}
+        self.scanner.add_hook("pre_probe", lambda host, port: calls.__setitem__(
+            "pre_probe", calls["pre_probe"] + 1))
+        self.scanner.add_hook("post_connect", lambda host, port, code: calls.__setitem__(
+            "post_connect", calls["post_connect"] + 1))
+        statuses = {}
+        engine = UdpScanEngine(self.scanner, rate=1000, retransmits=0, fd_budget=SmallBudget())
+        with patch('socket.socket', flaky_socket):
+            engine.scan(["127.0.0.1"], [26053, 26055], timeout=0.2, open_only=False,
+                        result_callback=lambda result: statuses.__setitem__(result.port, result.status))
+        self.assertEqual(statuses, {26053: OPEN, 26055: CLOSED})
+        self.assertEqual(engine.stats["window"], 2)
+        self.assertEqual(engine.stats["fd_backpressure"], 3)
+        self.assertEqual(calls["pre_probe"], calls["post_connect"])
+    
+    def test_payloads_are_well_formed(self):
+        """Test the DNS and SNMP payload headers"""
+        query_id, flags, qdcount = struct.unpack("!HHH", PAYLOADS[53][:6])
+        self.assertEqual((flags, qdcount), (0x0100, 1))
+        self.assertEqual(PAYLOADS[161][1] + 2, len(PAYLOADS[161]))
+        self.assertEqual(len(PAYLOADS[123]), 48)
+
+class TestTokenBucket(unittest.TestCase):
+    
+    def test_burst_then_wait(self):
+        """Test that a bucket allows its burst and then reports a wait"""
+        bucket = TokenBucket(10, burst=2)
+        self.assertEqual(bucket.try_acquire(), 0.0)
+        self.assertEqual(bucket.try_acquire(), 0.0)
+        self.assertGreater(bucket.try_acquire(), 0.0)
+    
+    def test_invalid_rate(self):
+        """Test that a non-positive rate is rejected"""
+        with self.assertRaises(ValueError):
+            TokenBucket(0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import socket
 import unittest
 import time
 import threading
@@ -15,7 +16,6 @@ class TestPortScannerWithRealPorts(unittest.TestCase):
         print("\nSetting up test servers for integration testing...")
         cls.test_server = TestServer()
         cls.test_server.start_multiple_servers()
-        time.sleep(1)  # Give servers time to start
     
     @classmethod 
     def tearDownClass(cls):
@@ -114,6 +114,38 @@ class TestPortScannerWithRealPorts(unittest.TestCase):
         if self.progress_updates:
             self.assertLess(self.progress_updates[-1], 100.0, "Scan should have been stopped early")
 
+class TestSelectorTestServer(unittest.TestCase):
+    """The event-loop TestServer holding many listeners in one thread"""
+    
+    def test_thousands_of_listeners_on_loopback_aliases(self):
+        """Test that one server thread serves banners on many ports and aliases"""
+        server = TestServer(verbose=False)
+        start = time.perf_counter()
+        started = server.start_port_range(21000, 1000, "Bulk", hosts=["127.0.0.1", "127.0.0.2"])
+        try:
+            self.assertEqual(started, 2000)
+            self.assertEqual(len({s['thread'] for s in server.servers}), 1)
+            
+            for host, port in [("127.0.0.1", 21000), ("127.0.0.2", 21999)]:
+                with socket.create_connection((host, port), timeout=2) as sock:
+                    self.assertEqual(sock.recv(100), f"Hello from Bulk server on port {port}\n".encode())
+        finally:
+            server.stop_all_servers()
+        
+        self.assertLess(time.perf_counter() - start, 5.0)
+        with socket.socket() as sock:
+            sock.settimeout(1)
+            self.assertNotEqual(sock.connect_ex(("127.0.0.1", 21000)), 0)
+    
+    def test_start_and_stop_without_sleeping(self):
+        """Test that a server is reachable immediately and stops in well under a second"""
+        server = TestServer(verbose=False)
+        self.assertTrue(server.start_server(22500, "Quick"))
+        self.assertTrue(PortScanner().scan_port("127.0.0.1", 22500, timeout=1))
+        start = time.perf_counter()
+        server.stop_all_servers()
+        self.assertLess(time.perf_counter() - start, 0.5)
+
 def run_integration_tests():
     """Run integration tests with real servers"""
     print("Running integration tests with real test servers...")
@@ -122,6 +154,7 @@ def run_integration_tests():
     
     # Create test suite
     suite = unittest.TestLoader().loadTestsFromTestCase(TestPortScannerWithRealPorts)
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestSelectorTestServer))
     
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)
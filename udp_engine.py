@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+
+import errno
+import heapq
+import logging
+import selectors
+import socket
+import struct
+import sys
+import time
+from fd_budget import FD_EXHAUSTED
+from port_scanner import PortScanner
+from rate_limit import TokenBucket
+from scan_engine import CANCEL_POLL, CLOSED, ERROR, FILTERED, OPEN, WAKEUP, _RunBase
+from targets import address_family
+
+log = logging.getLogger("port_scanner.udp")
+
+# No reply and no ICMP error: the port may be open and silent, or filtered
+OPEN_FILTERED = "open|filtered"
+
+def classify_udp(code):
+    """Map a probe's errno (0 for a reply, ETIMEDOUT for silence) to a UDP status"""
+    if code == 0:
+        return OPEN
+    if code == errno.ECONNREFUSED:
+        return CLOSED
+    if code == errno.ETIMEDOUT:
+        return OPEN_FILTERED
+    if code in (errno.EHOSTUNREACH, errno.ENETUNREACH):
+        return FILTERED
+    return ERROR
+
+# Linux: report ICMP errors (port/host unreachable) to unprivileged UDP sockets
+_LINUX = sys.platform.startswith("linux")
+IP_RECVERR = getattr(socket, "IP_RECVERR", 11 if _LINUX else None)
+IPV6_RECVERR = getattr(socket, "IPV6_RECVERR", 25 if _LINUX else None)
+
+def _dns_query(query_id=0x5053):
+    """A recursive query for the root NS records; any DNS server answers it somehow"""
+    header = struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 0)
+    return header + b"\x00" + struct.pack("!HH", 2, 1)
+
+def _netbios_status_query():
+    header = struct.pack("!HHHHHH", 0x5053, 0, 1, 0, 0, 0)
+    name = b"\x20" + b"CK" + b"A" * 30 + b"\x00"
+    return header + name + struct.pack("!HH", 0x21, 1)
+
+PAYLOADS = {
+    53: _dns_query(),
+    123: b"\x1b" + b"\x00" * 47,  # NTPv3 client request
+    137: _netbios_status_query(),
+    161: bytes.fromhex(  # SNMPv1 GetRequest sysDescr.0, community "public"
+        "302902010004067075626c6963a01c020400000001020100020100"
+        "300e300c06082b060102010101000500"
+    ),
+    1900: (b"M-SEARCH * HTTP/1.1\r\nHOST: 239.255.255.250:1900\r\n"
+           b"MAN: \"ssdp:discover\"\r\nMX: 1\r\nST: ssdp:all\r\n\r\n"),
+    5353: _dns_query(0),
+}
+
+UDP_SERVICES = {
+    53: "DNS", 67: "DHCP", 69: "TFTP", 123: "NTP", 137: "NetBIOS-NS",
+    161: "SNMP", 500: "IKE", 514: "Syslog", 1900: "SSDP", 5353: "mDNS",
+}
+
+class UdpScanEngine:
+    """Rate-limited UDP scanner sending protocol payloads from non-blocking sockets
+
+    Each probe uses a connected datagram socket so ICMP port-unreachable
+    surfaces as ECONNREFUSED without raw sockets. A reply means open, a
+    refusal means closed, and silence after all retransmits means
+    open|filtered. Like ScanEngine, probes are spread over the targets by a
+    HostQueue, at most max_per_host at a time on one host, and the window
+    is clamped to the descriptors fd_budget says are left.
+    """
+
+    def __init__(self, scanner=None, rate=200, max_in_flight=256, retransmits=1,
+                 payloads=None, rate_limiter=None, max_per_host=None, fd_budget=None):
+        self.scanner = scanner or PortScanner()
+        self.rate_limiter = rate_limiter or TokenBucket(rate)
+        self.max_in_flight = max_in_flight
+        self.fd_budget = fd_budget or self.scanner.fd_budget
+        self.max_per_host = max_per_host
+        self.retransmits = retransmits
+        self.payloads = PAYLOADS if payloads is None else payloads
+        self.stats = {}
+
+    def get_service_name(self, port):
+        # The catalogue's UDP entries win, then the payload table, then the TCP name
+        index = self.scanner.catalog.index
+        return index.udp_names.get(port) or UDP_SERVICES.get(port) or index.name(port)
+
+    def scan(self, targets, ports, timeout=1.0, progress_callback=None,
+             result_callback=None, open_only=True, collect=True, cancel=None):
+        """Probe every (target, port) pair over UDP and return the open ProbeResults"""
+        run = _UdpScanRun(self, list(targets), list(ports), timeout,
+                          progress_callback, result_callback, open_only, collect, cancel)
+        return run.execute()
+
+    def scan_range(self, target, start_port, end_port, timeout, progress_callback, result_callback):
+        results = self.scan(
+            [target], range(start_port, end_port + 1), timeout, progress_callback,
+            lambda result: result_callback(result.port, result.service)
+        )
+        return sorted((result.port, result.service) for result in results)
+
+class _UdpScanRun(_RunBase):
+
+    protocol, port_suffix = "udp", "/udp"
+    log = log
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.target_window = self.engine.fd_budget.window(self.engine.max_in_flight)
+        self.window = self.target_window
+        self.stats = {"probes": 0, "datagrams": 0, "rate_waits": 0, "pauses": 0,
+                      "fd_backpressure": 0, "window": self.window}
+        self.engine.stats = self.stats
+
+    def probe_address(self, probe):
+        return probe["host"], probe["port"]
+
+    def service_name(self, port):
+        return self.engine.get_service_name(port)
+
+    def execute(self):
+        backoffs = None
+        log.debug("Scanning %d probes at %.0f/s, window %d", self.total,
+                  self.engine.rate_limiter.rate, self.window)
+        try:
+            while self.active() and (self.in_flight or self.queue.remaining):
+                if self.pause.paused:
+                    self.hold()
+                    continue
+                rate_wait, stalled = self.send_batch()
+                if stalled and not self.in_flight:
+                    # Nothing of ours to wait on; give descriptors time to clear
+                    if backoffs is None:
+                        backoffs = self.engine.fd_budget.backoffs()
+                    if not self.engine.fd_budget.wait(backoffs):
+                        log.error("Scan stalled: %s persisted", errno.errorcode[stalled])
+                        raise OSError(stalled, f"Scan stalled: {errno.errorcode[stalled]} persisted")
+                    continue
+                backoffs = None
+                self.poll(rate_wait)
+        finally:
+            self.abort_in_flight()
+            self.selector.close()
+            log.debug("Scan finished: %s", self.stats)
+        return self.open_results
+
+    def send_batch(self):
+        """Start as many probes as the window and rate limiter allow
+
+        Returns (seconds to the next rate token or None, the errno if running
+        out of descriptors stalled the batch or None).
+        """
+        while len(self.in_flight) < self.window:
+            item = self.queue.pop()
+            if item is None:
+                break
+            wait = self.engine.rate_limiter.try_acquire()
+            if wait:
+                self.queue.push(item)
+                self.queue.release(item[0])
+                self.stats["rate_waits"] += 1
+                return wait, None
+            stalled = self.start_probe(*item)
+            if stalled:
+                return None, stalled
+        return None, None
+
+    def start_probe(self, host, port):
+        hooks = self.scanner._hooks
+        if "pre_probe" in hooks:
+            self.scanner._fire("pre_probe", host, port)
+        started = time.perf_counter()
+        sock = None
+        try:
+            family = address_family(host)
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            if family == socket.AF_INET6:
+                level, option = socket.IPPROTO_IPV6, IPV6_RECVERR
+            else:
+                level, option = socket.IPPROTO_IP, IP_RECVERR
+            if option is not None:
+                try:
+                    sock.setsockopt(level, option, 1)
+                except OSError:
+                    pass
+            sock.connect((host, port))
+        except OSError as e:
+            if sock is not None:
+                sock.close()
+            code = e.errno or errno.EIO
+            if "post_connect" in hooks:
+                self.scanner._fire("post_connect", host, port, code)
+            if code in FD_EXHAUSTED:
+                # Backpressure, not a verdict: requeue and shrink the window to what is open
+                self.queue.push((host, port))
+                self.queue.release(host)
+                self.window = max(1, len(self.in_flight))
+                self.stats["fd_backpressure"] += 1
+                if self.debug:
+                    log.debug("%s: window down to %d", errno.errorcode[code], self.window)
+                return code
+            self.queue.release(host)
+            self.finish(host, port, ERROR, 0.0)
+            return None
+        self.stats["probes"] += 1
+        probe = {"host": host, "port": port, "started": started,
+                 "attempts_left": self.engine.retransmits}
+        self.in_flight[sock] = probe
+        self.selector.register(sock, selectors.EVENT_READ)
+        self.transmit(sock, probe)
+        return None
+
+    def transmit(self, sock, probe):
+        try:
+            sock.send(self.engine.payloads.get(probe["port"], b""))
+            self.stats["datagrams"] += 1
+        except ConnectionRefusedError:
+            # ICMP port-unreachable from an earlier datagram, reported on this send
+            self.complete(sock, errno.ECONNREFUSED)
+            return
+        except OSError as e:
+            self.complete(sock, e.errno or errno.EIO)
+            return
+        heapq.heappush(self.deadlines,
+                       (time.perf_counter() + self.timeout, next(self.sequence), sock))
+
+    def poll(self, rate_wait):
+        wait = self.timeout
+        if self.deadlines:
+            wait = max(0.0, self.deadlines[0][0] - time.perf_counter())
+        if rate_wait is not None:
+            wait = min(wait, rate_wait)
+        if self.polled:
+            wait = min(wait, CANCEL_POLL)
+        if not self.in_flight and not rate_wait:
+            return
+
+        for key, mask in self.selector.select(timeout=wait):
+            if key.data is WAKEUP:
+                continue
+            sock = key.fileobj
+            try:
+                sock.recv(4096)
+                code = 0
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                code = e.errno or errno.EIO
+            self.complete(sock, code)
+
+        now = time.perf_counter()
+        while self.deadlines and self.deadlines[0][0] <= now:
+            _, _, sock = heapq.heappop(self.deadlines)
+            probe = self.in_flight.get(sock)
+            if probe is None:
+                continue
+            if probe["attempts_left"] > 0:
+                probe["attempts_left"] -= 1
+                self.transmit(sock, probe)
+            else:
+                self.complete(sock, errno.ETIMEDOUT)
+
+    def complete(self, sock, code):
+        probe = self.in_flight.pop(sock)
+        self.selector.unregister(sock)
+        sock.close()
+        self.queue.done(probe["host"], code != errno.ETIMEDOUT)
+        if "post_connect" in self.scanner._hooks:
+            self.scanner._fire("post_connect", probe["host"], probe["port"], code)
+        status = classify_udp(code)
+        self.finish(probe["host"], probe["port"], status, time.perf_counter() - probe["started"])
+        if self.window < self.target_window:
+            self.window += 1